@@ -0,0 +1,100 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.coinbase_pro.models import Match
+from w3rw.cex.coinbase_pro.models import Ticker
+
+import gc
+import json
+import time
+import tracemalloc
+
+__count__: int = 100_000
+
+TICKER = {
+    'type': 'ticker',
+    'sequence': 5928281084,
+    'product_id': 'BTC-USD',
+    'price': '48370.12',
+    'open_24h': '47121.56',
+    'volume_24h': '12345.67891234',
+    'low_24h': '46500.00',
+    'high_24h': '49000.00',
+    'volume_30d': '456789.12345678',
+    'best_bid': '48370.11',
+    'best_ask': '48370.12',
+    'side': 'buy',
+    'time': '2021-10-11T17:56:23.139145Z',
+    'trade_id': 221567898,
+    'last_size': '0.00123456'
+}
+
+MATCH = {
+    'type': 'match',
+    'trade_id': 221567898,
+    'maker_order_id': 'ac928c66-ca53-498f-9c13-a110027a60e8',
+    'taker_order_id': '132fb6ae-456b-4654-b4e0-d681ac05cea1',
+    'side': 'buy',
+    'size': '0.00123456',
+    'price': '48370.12',
+    'product_id': 'BTC-USD',
+    'sequence': 5928281084,
+    'time': '2021-10-11T17:56:23.139145Z'
+}
+
+
+def get_messages(template: dict, count: int) -> list:
+    # NOTE: Decoding every message gives each one its own strings, the same
+    # as messages arriving from a socket
+    payload = json.dumps(template)
+    return [json.loads(payload) for _ in range(count)]
+
+
+def get_throughput(function, messages: list) -> float:
+    start = time.perf_counter()
+    for message in messages:
+        function(message)
+    return len(messages) / (time.perf_counter() - start)
+
+
+def get_memory(function, messages: list) -> float:
+    gc.collect()
+    tracemalloc.start()
+    retained = [function(message) for message in messages]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del retained
+    return size / len(messages)
+
+
+def run(count: int = __count__) -> dict:
+    results = {}
+    for name, model, template in (
+        ('ticker', Ticker, TICKER),
+        ('match', Match, MATCH)
+    ):
+        messages = get_messages(template, count)
+        results[name] = {
+            'dict_per_second': get_throughput(dict, messages),
+            'record_per_second': get_throughput(
+                model.from_message, messages),
+            'dict_bytes': get_memory(dict, messages),
+            'record_bytes': get_memory(model.from_message, messages)
+        }
+    return results
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,283 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from benchmarks import models
+from benchmarks import signing
+
+from benchmarks.server import __pair__
+from benchmarks.server import __product__
+from benchmarks.server import Exchange
+from benchmarks.server import get_book
+from benchmarks.server import get_full
+from benchmarks.server import get_kraken_book
+from benchmarks.server import get_level2
+
+from w3rw.cex.cache import Cache
+
+from w3rw.cex.coinbase.messenger import Auth as CoinbaseAuth
+from w3rw.cex.coinbase.messenger import Messenger as CoinbaseMessenger
+
+from w3rw.cex.coinbase_pro.book import OrderBook
+from w3rw.cex.coinbase_pro.messenger import Auth
+from w3rw.cex.coinbase_pro.messenger import Messenger
+from w3rw.cex.coinbase_pro.socket import Stream
+
+from w3rw.cex.kraken.book import OrderBook as KrakenBook
+from w3rw.cex.kraken.messenger import Auth as KrakenAuth
+from w3rw.cex.kraken.messenger import Messenger as KrakenMessenger
+from w3rw.cex.kraken.socket import Stream as KrakenStream
+
+from w3rw.cex.limiter import Limiter
+
+from w3rw.cex.pool import fan_out
+
+import argparse
+import base64
+import json
+import platform
+import statistics
+import sys
+import time
+import typing
+
+# NOTE: Every suite repeats its measurement and reports the median, which
+# is far less sensitive to a single slow run than the mean
+__repeat__: int = 5
+__requests__: int = 500
+__workers__: int = 8
+
+SECRET = base64.b64encode(b'w3rw-benchmark-secret' * 4).decode()
+
+
+def get_median(function: typing.Callable[[], float],
+               repeat: int = __repeat__) -> float:
+    function()
+    return statistics.median(function() for _ in range(repeat))
+
+
+def get_rate(count: int, function: typing.Callable[[], None]) -> float:
+    start = time.perf_counter()
+    function()
+    return count / (time.perf_counter() - start)
+
+
+def get_messengers(exchange: Exchange) -> dict:
+    # NOTE: The limiters are empty and the caches disabled so that only
+    # the request path itself is measured
+    messengers = {
+        'coinbase_pro': Messenger(
+            Auth('key', SECRET, 'passphrase'),
+            limiter=Limiter({}),
+            cache=Cache({})),
+        'coinbase': CoinbaseMessenger(
+            CoinbaseAuth('key', SECRET),
+            limiter=Limiter({}),
+            cache=Cache({})),
+        'kraken': KrakenMessenger(
+            KrakenAuth('key', SECRET),
+            limiter=Limiter({}),
+            cache=Cache({}))
+    }
+    for messenger in messengers.values():
+        messenger.api.url = exchange.url
+    return messengers
+
+
+def run_rest(exchange: Exchange,
+             count: int = __requests__,
+             repeat: int = __repeat__) -> dict:
+
+    messengers = get_messengers(exchange)
+    requests = {
+        'coinbase_pro': lambda: messengers['coinbase_pro'].get(
+            f'/products/{__product__}/ticker'),
+        'coinbase': lambda: messengers['coinbase'].get('/v2/time'),
+        'kraken': lambda: messengers['kraken'].get('/public/Time')
+    }
+    results = {}
+    for name, request in requests.items():
+        results[name] = {
+            'sequential_per_second': get_median(lambda: get_rate(
+                count, lambda: [request() for _ in range(count)]), repeat),
+            'concurrent_per_second': get_median(lambda: get_rate(
+                count, lambda: fan_out(
+                    lambda _: request(), range(count), __workers__)), repeat)
+        }
+    for messenger in messengers.values():
+        messenger.close()
+    return results
+
+
+def run_pagination(exchange: Exchange, repeat: int = __repeat__) -> dict:
+    messengers = get_messengers(exchange)
+    listings = {
+        'coinbase_pro': lambda: messengers['coinbase_pro'].iter_pages(
+            f'/products/{__product__}/trades'),
+        'coinbase': lambda: messengers['coinbase'].iter_pages(
+            '/v2/accounts'),
+        'kraken': lambda: messengers['kraken'].iter_pages(
+            '/private/TradesHistory')
+    }
+    results = {}
+    for name, listing in listings.items():
+        pages = sum(1 for _ in listing())
+
+        def walk() -> float:
+            start = time.perf_counter()
+            for _ in listing():
+                pass
+            return time.perf_counter() - start
+
+        seconds = get_median(walk, repeat)
+        results[name] = {
+            'pages': pages,
+            'seconds': seconds,
+            'seconds_per_page': seconds / pages
+        }
+    for messenger in messengers.values():
+        messenger.close()
+    return results
+
+
+def run_stream(exchange: Exchange, repeat: int = __repeat__) -> dict:
+    feeds = {
+        'coinbase_pro_full': (Stream, {
+            'type': 'subscribe',
+            'product_ids': [__product__],
+            'channels': ['full']
+        }),
+        'coinbase_pro_ticker': (Stream, {
+            'type': 'subscribe',
+            'product_ids': [__product__],
+            'channels': ['ticker']
+        }),
+        'kraken_book': (KrakenStream, {
+            'event': 'subscribe',
+            'pair': [__pair__],
+            'subscription': {'name': 'book', 'depth': 10}
+        }),
+        'kraken_trade': (KrakenStream, {
+            'event': 'subscribe',
+            'pair': [__pair__],
+            'subscription': {'name': 'trade'}
+        })
+    }
+    count = exchange.messages
+    results = {}
+    for name, (cls, message) in feeds.items():
+        def receive(typed: bool) -> float:
+            stream = cls(url=f'{exchange.ws_url}/?count={count}')
+            stream.connect()
+            stream.send(json.loads(json.dumps(message)))
+            start = time.perf_counter()
+            for _ in range(count):
+                stream.receive(typed)
+            rate = count / (time.perf_counter() - start)
+            stream.disconnect()
+            return rate
+
+        results[name] = {
+            'messages': count,
+            'dict_per_second': get_median(lambda: receive(False), repeat),
+            'record_per_second': get_median(lambda: receive(True), repeat)
+        }
+    return results
+
+
+def run_book(exchange: Exchange, repeat: int = __repeat__) -> dict:
+    # NOTE: Messages are decoded up front, so only the book is measured
+    count = exchange.messages
+    snapshot = get_book(exchange.seed, 3)
+    full = get_full(exchange.seed, count)
+    level2 = get_level2(exchange.seed, count)
+    kraken = get_kraken_book(exchange.seed, count)
+
+    def apply_full() -> float:
+        book = OrderBook(__product__)
+        book.seed(snapshot)
+        return get_rate(count, lambda: [book.apply(m) for m in full])
+
+    def apply_level2() -> float:
+        book = OrderBook(__product__)
+        return get_rate(count, lambda: [book.apply(m) for m in level2])
+
+    def apply_kraken() -> float:
+        book = KrakenBook(__pair__, 10)
+        rate = get_rate(count, lambda: [book.apply(m) for m in kraken])
+        if book.mismatches:
+            raise ValueError('kraken checksum mismatch')
+        return rate
+
+    return {
+        'coinbase_pro_full_per_second': get_median(apply_full, repeat),
+        'coinbase_pro_level2_per_second': get_median(apply_level2, repeat),
+        'kraken_checksum_per_second': get_median(apply_kraken, repeat)
+    }
+
+
+def run(repeat: int = __repeat__,
+        count: int = __requests__,
+        suites: typing.Iterable[str] = None) -> dict:
+
+    selected = set(suites) if suites else {
+        'rest', 'pagination', 'signing', 'stream', 'book', 'models'
+    }
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'requests': count
+        }
+    }
+    with Exchange() as exchange:
+        results['meta']['seed'] = exchange.seed
+        results['meta']['messages'] = exchange.messages
+        if 'rest' in selected:
+            results['rest'] = run_rest(exchange, count, repeat)
+        if 'pagination' in selected:
+            results['pagination'] = run_pagination(exchange, repeat)
+        if 'stream' in selected:
+            results['stream'] = run_stream(exchange, repeat)
+        if 'book' in selected:
+            results['book'] = run_book(exchange, repeat)
+    if 'signing' in selected:
+        results['signing'] = signing.run()
+    if 'models' in selected:
+        results['models'] = models.run()
+    return results
+
+
+def main(argv: typing.List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Runs the w3rw benchmarks against a local mock exchange')
+    parser.add_argument('-o', '--output', help='write the results to a file')
+    parser.add_argument('-r', '--repeat', type=int, default=__repeat__)
+    parser.add_argument('-n', '--requests', type=int, default=__requests__)
+    parser.add_argument('suites', nargs='*', help='suites to run, e.g. rest')
+    args = parser.parse_args(argv)
+    results = run(args.repeat, args.requests, args.suites)
+    payload = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(payload + '\n')
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,557 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+import base64
+import collections
+import functools
+import hashlib
+import json
+import random
+import socket
+import struct
+import threading
+import time
+import typing
+import urllib.parse
+import zlib
+
+# NOTE: A local stand-in for the Coinbase Pro, Coinbase, and Kraken REST
+# and websocket endpoints. Every payload is generated from a fixed seed,
+# so every run serves exactly the same data.
+__seed__: int = 20211018
+
+__guid__: bytes = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+__trades__: int = 1000
+__page__: int = 100
+__messages__: int = 10_000
+
+__product__: str = 'BTC-USD'
+__pair__: str = 'XBT/USD'
+
+# NOTE: The full channel starts right after the level 3 snapshot
+__sequence__: int = 1_000_000
+
+
+def get_price(rng: random.Random, mid: float = 48000.0) -> float:
+    return round(mid + rng.randint(-500, 500) / 100, 2)
+
+
+def get_frame(payload: bytes, opcode: int = 0x1) -> bytes:
+    # NOTE: Server frames are never masked, see RFC 6455 section 5.1
+    size = len(payload)
+    if size < 126:
+        header = struct.pack('!BB', 0x80 | opcode, size)
+    elif size < 1 << 16:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, size)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, size)
+    return header + payload
+
+
+def read_frame(stream: typing.BinaryIO) -> typing.Tuple[int, bytes]:
+    first, second = struct.unpack('!BB', stream.read(2))
+    size = second & 0x7f
+    if 126 == size:
+        size, = struct.unpack('!H', stream.read(2))
+    elif 127 == size:
+        size, = struct.unpack('!Q', stream.read(8))
+    mask = stream.read(4) if second & 0x80 else b'\0\0\0\0'
+    data = stream.read(size)
+    payload = bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+    return first & 0x0f, payload
+
+
+def get_trades(seed: int, count: int) -> typing.List[dict]:
+    # NOTE: Listed newest first, the same as /products/<id>/trades
+    rng = random.Random(seed)
+    return [{
+        'time': f'2021-10-18T12:{(count - i) // 60 % 60:02d}:'
+                f'{(count - i) % 60:02d}.{rng.randint(0, 999999):06d}Z',
+        'trade_id': count - i,
+        'price': f'{get_price(rng):.2f}',
+        'size': f'{rng.randint(1, 100000) / 1e5:.8f}',
+        'side': rng.choice(('buy', 'sell'))
+    } for i in range(count)]
+
+
+def get_book(seed: int, level: int) -> dict:
+    rng = random.Random(seed)
+    book = {'sequence': __sequence__, 'bids': [], 'asks': []}
+    for key, sign in (('bids', -1), ('asks', 1)):
+        for tick in range(1, 51):
+            price = f'{48000 + sign * tick / 100:.2f}'
+            size = f'{rng.randint(1, 100000) / 1e5:.8f}'
+            if 3 == level:
+                book[key].append([price, size, f'{key}-{tick}'])
+            else:
+                book[key].append([price, size, rng.randint(1, 5)])
+    return book
+
+
+def get_full(seed: int, count: int) -> typing.List[dict]:
+    # NOTE: The orders of the level 3 snapshot are opened, filled, and
+    # closed in sequence, the same as on the full channel
+    rng = random.Random(seed)
+    book = get_book(seed, 3)
+    orders = {
+        order_id: ('buy' if 'bids' == key else 'sell', float(size))
+        for key in ('bids', 'asks')
+        for _, size, order_id in book[key]
+    }
+    messages = []
+    sequence = __sequence__
+    while len(messages) < count:
+        sequence += 1
+        kind = rng.random()
+        message = {
+            'product_id': __product__,
+            'sequence': sequence,
+            'time': '2021-10-18T12:00:00.000000Z'
+        }
+        if kind < 0.4 or not orders:
+            order_id = f'order-{sequence}'
+            side = rng.choice(('buy', 'sell'))
+            size = rng.randint(1, 100000) / 1e5
+            orders[order_id] = (side, size)
+            offset = rng.randint(1, 50) / 100
+            price = 48000 - offset if 'buy' == side else 48000 + offset
+            message.update({
+                'type': 'open',
+                'order_id': order_id,
+                'side': side,
+                'price': f'{price:.2f}',
+                'remaining_size': f'{size:.8f}'
+            })
+        elif kind < 0.7:
+            order_id = rng.choice(sorted(orders))
+            side, size = orders[order_id]
+            fill = round(size * rng.random(), 8)
+            orders[order_id] = (side, size - fill)
+            message.update({
+                'type': 'match',
+                'maker_order_id': order_id,
+                'taker_order_id': f'taker-{sequence}',
+                'side': side,
+                'size': f'{fill:.8f}',
+                'price': '48000.00'
+            })
+        else:
+            order_id = rng.choice(sorted(orders))
+            side, _ = orders.pop(order_id)
+            message.update({
+                'type': 'done',
+                'order_id': order_id,
+                'side': side,
+                'reason': 'canceled'
+            })
+        messages.append(message)
+    return messages
+
+
+def get_level2(seed: int, count: int) -> typing.List[dict]:
+    rng = random.Random(seed)
+    book = get_book(seed, 2)
+    messages = [{
+        'type': 'snapshot',
+        'product_id': __product__,
+        'bids': [level[:2] for level in book['bids']],
+        'asks': [level[:2] for level in book['asks']]
+    }]
+    while len(messages) < count:
+        side = rng.choice(('buy', 'sell'))
+        offset = rng.randint(1, 60) / 100
+        price = 48000 - offset if 'buy' == side else 48000 + offset
+        size = 0.0 if rng.random() < 0.2 else rng.randint(1, 100000) / 1e5
+        messages.append({
+            'type': 'l2update',
+            'product_id': __product__,
+            'changes': [[side, f'{price:.2f}', f'{size:.8f}']],
+            'time': '2021-10-18T12:00:00.000000Z'
+        })
+    return messages
+
+
+def get_ticker(seed: int, count: int) -> typing.List[dict]:
+    rng = random.Random(seed)
+    return [{
+        'type': 'ticker',
+        'sequence': __sequence__ + i,
+        'product_id': __product__,
+        'price': f'{get_price(rng):.2f}',
+        'best_bid': '47999.99',
+        'best_ask': '48000.01',
+        'side': rng.choice(('buy', 'sell')),
+        'time': '2021-10-18T12:00:00.000000Z',
+        'trade_id': i,
+        'last_size': f'{rng.randint(1, 100000) / 1e5:.8f}'
+    } for i in range(count)]
+
+
+def get_checksum(asks: typing.Dict[str, str],
+                 bids: typing.Dict[str, str]) -> int:
+    # NOTE: https://docs.kraken.com/websockets/#book-checksum computed on
+    # its own, so that the checksum never depends on the book being tested
+    def text(price: str, volume: str) -> str:
+        return (price.replace('.', '').lstrip('0')
+                + volume.replace('.', '').lstrip('0'))
+
+    best = [(p, asks[p]) for p in sorted(asks, key=float)[:10]]
+    best += [(p, bids[p]) for p in sorted(bids, key=float, reverse=True)[:10]]
+    return zlib.crc32(''.join(text(*level) for level in best).encode())
+
+
+def get_kraken_book(seed: int, count: int) -> typing.List[list]:
+    # NOTE: A mirror book applies every update so that each message can
+    # carry the checksum the real feed would send
+    rng = random.Random(seed)
+    mirror = {'a': {}, 'b': {}}
+
+    def level(price: float) -> list:
+        volume = f'{rng.randint(1, 100000) / 1e5:.8f}'
+        return [f'{price:.5f}', volume, '1634558400.000000']
+
+    def apply(key: str, price: str, volume: str) -> None:
+        side = mirror[key]
+        if float(volume):
+            side[price] = volume
+        else:
+            side.pop(price, None)
+        best = sorted(side, key=float, reverse='b' == key)
+        for stale in best[10:]:
+            del side[stale]
+
+    snapshot = [42, {
+        'as': [level(48000 + tick / 10) for tick in range(1, 11)],
+        'bs': [level(48000 - tick / 10) for tick in range(1, 11)]
+    }, 'book-10', __pair__]
+    for key in ('a', 'b'):
+        for price, volume, _ in snapshot[1][key + 's']:
+            apply(key, price, volume)
+    messages = [snapshot]
+    while len(messages) < count:
+        key = rng.choice(('a', 'b'))
+        sign = 1 if 'a' == key else -1
+        price = 48000 + sign * rng.randint(1, 12) / 10
+        change = level(price)
+        if rng.random() < 0.2:
+            change[1] = '0.00000000'
+        message = [42, {key: [change]}, 'book-10', __pair__]
+        apply(key, change[0], change[1])
+        message[1]['c'] = str(get_checksum(mirror['a'], mirror['b']))
+        messages.append(message)
+    return messages
+
+
+def get_kraken_trades(seed: int, count: int) -> typing.List[list]:
+    rng = random.Random(seed)
+    return [[0, [[
+        f'{get_price(rng):.5f}',
+        f'{rng.randint(1, 100000) / 1e5:.8f}',
+        f'{1634558400 + i / 1000:.6f}',
+        rng.choice(('b', 's')),
+        'l',
+        ''
+    ]], 'trade', __pair__] for i in range(count)]
+
+
+@functools.lru_cache(maxsize=None)
+def get_feed(name: str, seed: int, count: int) -> typing.Tuple[bytes, ...]:
+    # NOTE: Frames are encoded once, so the server is never the bottleneck
+    feeds = {
+        'full': get_full,
+        'level2': get_level2,
+        'ticker': get_ticker,
+        'book': get_kraken_book,
+        'trade': get_kraken_trades
+    }
+    return tuple(
+        get_frame(json.dumps(message).encode())
+        for message in feeds[name](seed, count)
+    )
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    exchange: 'Exchange' = None
+
+    def setup(self) -> None:
+        # NOTE: Headers and body are written separately, so Nagle's
+        # algorithm would hold back every body until the client's ACK
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def reply(self, status: int, body: object, headers: dict = None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def parse(self) -> typing.Tuple[str, dict]:
+        url = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        size = int(self.headers.get('Content-Length') or 0)
+        if size:
+            body = self.rfile.read(size).decode()
+            if body.startswith('{'):
+                query.update(json.loads(body))
+            else:
+                query.update(urllib.parse.parse_qsl(body))
+        return url.path, query
+
+    def do_GET(self) -> None:
+        if 'websocket' == self.headers.get('Upgrade', '').lower():
+            return self.stream()
+        self.route('GET')
+
+    def do_POST(self) -> None:
+        self.route('POST')
+
+    def do_DELETE(self) -> None:
+        self.route('DELETE')
+
+    def route(self, method: str) -> None:
+        path, query = self.parse()
+        fault = self.exchange.hit(path)
+        if fault is not None:
+            status, body, headers, delay = fault
+            time.sleep(delay)
+            return self.reply(status, body, headers)
+        if path.startswith('/0/'):
+            return self.kraken(path, query)
+        if path.startswith('/v2/'):
+            return self.coinbase(path, query)
+        return self.coinbase_pro(method, path, query)
+
+    def coinbase_pro(self, method: str, path: str, query: dict) -> None:
+        parts = path.strip('/').split('/')
+        exchange = self.exchange
+        if ['products'] == parts:
+            return self.reply(200, [{'id': __product__, 'status': 'online'}])
+        if 3 == len(parts) and 'products' == parts[0]:
+            if 'ticker' == parts[2]:
+                return self.reply(200, get_ticker(exchange.seed, 1)[0])
+            if 'book' == parts[2]:
+                level = int(query.get('level', 1))
+                return self.reply(200, get_book(exchange.seed, level))
+            if 'trades' == parts[2]:
+                return self.page(query)
+            if 'candles' == parts[2]:
+                return self.reply(200, [
+                    [1634558400 - 60 * i, 1, 2, 1, 2, 10] for i in range(300)
+                ])
+        if ['accounts'] == parts:
+            return self.reply(200, [{'id': 'account', 'currency': 'USD'}])
+        if ['orders'] == parts and 'POST' == method:
+            return self.reply(200, {
+                'id': 'order', 'client_oid': query.get('client_oid')})
+        return self.reply(404, {'message': 'NotFound'})
+
+    def page(self, query: dict) -> None:
+        # NOTE: CB-AFTER is the cursor for older trades and is only sent
+        # while there are more of them
+        trades = self.exchange.trades
+        after = int(query.get('after', len(trades) + 1))
+        limit = int(query.get('limit', self.exchange.limit))
+        items = [t for t in trades if t['trade_id'] < after][:limit]
+        headers = {}
+        if items:
+            headers['CB-BEFORE'] = str(items[0]['trade_id'])
+            if items[-1]['trade_id'] > 1:
+                headers['CB-AFTER'] = str(items[-1]['trade_id'])
+        return self.reply(200, items, headers)
+
+    def coinbase(self, path: str, query: dict) -> None:
+        if '/v2/time' == path:
+            return self.reply(200, {'data': {'epoch': 1634558400}})
+        if '/v2/accounts' == path:
+            trades = self.exchange.trades
+            after = int(query.get('starting_after', len(trades) + 1))
+            limit = int(query.get('limit', self.exchange.limit))
+            items = [
+                {'id': str(t['trade_id']), 'currency': 'BTC'}
+                for t in trades if t['trade_id'] < after
+            ][:limit]
+            more = bool(items) and '1' != items[-1]['id']
+            return self.reply(200, {
+                'pagination': {
+                    'next_uri': '/v2/accounts' if more else None,
+                    'next_starting_after': items[-1]['id'] if more else None
+                },
+                'data': items
+            })
+        return self.reply(404, {'errors': [
+            {'id': 'not_found', 'message': 'Not found'}]})
+
+    def kraken(self, path: str, query: dict) -> None:
+        name = path.rsplit('/', 1)[-1]
+        if 'Time' == name:
+            return self.reply(200, {'error': [], 'result': {
+                'unixtime': 1634558400, 'rfc1123': ''}})
+        if 'Depth' == name:
+            book = self.exchange.kraken_book[0][1]
+            return self.reply(200, {'error': [], 'result': {
+                'XXBTZUSD': {'asks': book['as'], 'bids': book['bs']}}})
+        if 'Balance' == name:
+            return self.reply(200, {'error': [], 'result': {
+                'ZUSD': '1000.0000', 'XXBT': '0.5000000000'}})
+        if 'TradesHistory' == name:
+            trades = self.exchange.trades
+            ofs = int(query.get('ofs', 0))
+            items = trades[ofs:ofs + 50]
+            return self.reply(200, {'error': [], 'result': {
+                'trades': {f'T{t["trade_id"]}': t for t in items},
+                'count': len(trades)
+            }})
+        return self.reply(200, {'error': ['EGeneral:Unknown method']})
+
+    def stream(self) -> None:
+        # NOTE: A minimal RFC 6455 server. The first frame from the client
+        # must be a subscription, which selects the feed that is sent.
+        key = self.headers['Sec-WebSocket-Key'].encode()
+        accept = base64.b64encode(hashlib.sha1(key + __guid__).digest())
+        self.send_response(101)
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', accept.decode())
+        self.end_headers()
+        self.wfile.flush()
+        query = dict(urllib.parse.parse_qsl(
+            urllib.parse.urlsplit(self.path).query))
+        count = int(query.get('count', self.exchange.messages))
+        _, payload = read_frame(self.rfile)
+        message = json.loads(payload)
+        if 'subscription' in message:
+            name = message['subscription']['name']
+        else:
+            channel = message['channels'][0]
+            name = channel['name'] if isinstance(channel, dict) else channel
+        for frame in get_feed(name, self.exchange.seed, count):
+            self.wfile.write(frame)
+        self.wfile.write(get_frame(struct.pack('!H', 1000), 0x8))
+        self.wfile.flush()
+        self.close_connection = True
+
+
+class Exchange(object):
+    def __init__(self,
+                 seed: int = __seed__,
+                 trades: int = __trades__,
+                 limit: int = __page__,
+                 messages: int = __messages__):
+
+        self.__seed: int = seed
+        self.__limit: int = limit
+        self.__messages: int = messages
+        self.__trades: typing.List[dict] = get_trades(seed, trades)
+        self.__kraken_book: typing.List[list] = get_kraken_book(seed, 1)
+        self.__faults: typing.Dict[str, collections.deque] = {}
+        self.__hits: collections.Counter = collections.Counter()
+        self.__lock: threading.Lock = threading.Lock()
+        handler = type('Handler', (Handler,), {'exchange': self})
+        self.__server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.__server.daemon_threads = True
+        self.__thread: threading.Thread = None
+
+    @property
+    def seed(self) -> int:
+        return self.__seed
+
+    @property
+    def limit(self) -> int:
+        return self.__limit
+
+    @property
+    def messages(self) -> int:
+        return self.__messages
+
+    @property
+    def trades(self) -> typing.List[dict]:
+        return self.__trades
+
+    @property
+    def kraken_book(self) -> typing.List[list]:
+        return self.__kraken_book
+
+    @property
+    def hits(self) -> typing.Dict[str, int]:
+        with self.__lock:
+            return dict(self.__hits)
+
+    def fault(self,
+              path: str,
+              status: int = 500,
+              body: object = None,
+              headers: dict = None,
+              delay: float = 0.0,
+              times: int = 1) -> None:
+
+        # NOTE: The next `times` REST requests to `path` are answered with
+        # `status` after `delay` seconds, e.g. to outlast a read timeout
+        fault = (status, {} if body is None else body, headers, delay)
+        with self.__lock:
+            self.__faults.setdefault(
+                path, collections.deque()).extend([fault] * times)
+
+    def hit(self, path: str) -> typing.Optional[tuple]:
+        with self.__lock:
+            self.__hits[path] += 1
+            faults = self.__faults.get(path)
+            return faults.popleft() if faults else None
+
+    def reset(self) -> None:
+        with self.__lock:
+            self.__faults.clear()
+            self.__hits.clear()
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.__server.server_port}'
+
+    @property
+    def ws_url(self) -> str:
+        return f'ws://127.0.0.1:{self.__server.server_port}'
+
+    def start(self) -> 'Exchange':
+        self.__thread = threading.Thread(
+            target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def __enter__(self) -> 'Exchange':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+
+if __name__ == '__main__':
+    with Exchange() as exchange:
+        print(json.dumps({'url': exchange.url, 'ws_url': exchange.ws_url}))
+        threading.Event().wait()
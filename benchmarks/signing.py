@@ -0,0 +1,84 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.coinbase_pro.messenger import Auth as CoinbaseProAuth
+
+from w3rw.cex.kraken.messenger import Auth as KrakenAuth
+
+import base64
+import hashlib
+import hmac
+import json
+import time
+import urllib
+
+__count__: int = 100_000
+
+KEY = 'a6d2f3f1e6c0495ba1e3a5b1c3d7e9f2'
+SECRET = base64.b64encode(b'w3rw-benchmark-secret' * 4).decode()
+PASSPHRASE = 'passphrase'
+MESSAGE = '1634057783.139145POST/orders{"product_id": "BTC-USD"}'
+ENDPOINT = '/0/private/AddOrder'
+DATA = {'nonce': '1634057783139', 'pair': 'XBTUSD', 'volume': '0.01'}
+
+
+def get_coinbase_pro(message: str) -> str:
+    # NOTE: The signature as it was computed before the key was cached
+    key = base64.b64decode(SECRET)
+    sig = hmac.new(key, message.encode('ascii'), hashlib.sha256)
+    return base64.b64encode(sig.digest()).decode('utf-8')
+
+
+def get_kraken(endpoint: str, data: dict) -> str:
+    key = base64.b64decode(SECRET)
+    post = urllib.parse.urlencode(data)
+    encoded = (str(data['nonce']) + post).encode()
+    message = endpoint.encode() + hashlib.sha256(encoded).digest()
+    mac = hmac.new(key, message, hashlib.sha512)
+    return base64.b64encode(mac.digest()).decode()
+
+
+def get_latency(function, *args, count: int = __count__) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        function(*args)
+    return 1e9 * (time.perf_counter() - start) / count
+
+
+def run(count: int = __count__) -> dict:
+    coinbase_pro = CoinbaseProAuth(KEY, SECRET, PASSPHRASE)
+    kraken = KrakenAuth(KEY, SECRET)
+    assert coinbase_pro.signature(MESSAGE) == get_coinbase_pro(MESSAGE)
+    assert kraken.signature(ENDPOINT, DATA) == get_kraken(ENDPOINT, DATA)
+    return {
+        'coinbase_pro': {
+            'fresh_ns': get_latency(get_coinbase_pro, MESSAGE, count=count),
+            'cached_ns': get_latency(
+                coinbase_pro.signature, MESSAGE, count=count),
+            'headers_ns': get_latency(
+                coinbase_pro.headers, '1634057783.139145', MESSAGE,
+                count=count)
+        },
+        'kraken': {
+            'fresh_ns': get_latency(get_kraken, ENDPOINT, DATA, count=count),
+            'cached_ns': get_latency(
+                kraken.signature, ENDPOINT, DATA, count=count),
+            'headers_ns': get_latency(kraken, ENDPOINT, DATA, count=count)
+        }
+    }
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
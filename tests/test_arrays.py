@@ -0,0 +1,88 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.arrays import get_array
+from w3rw.cex.arrays import get_epoch
+
+from w3rw.cex.coinbase_pro import arrays
+
+from w3rw.cex.kraken import arrays as kraken
+
+import numpy
+
+
+def test_candles_round_trip():
+    rows = [
+        [1634558460, 47990.1, 48010.25, 48000.5, 48005.75, 12.5],
+        [1634558400, 47980.0, 48000.0, 47990.0, 48000.0, 3.25]
+    ]
+    candles = arrays.get_candles(rows)
+    assert arrays.CANDLE == candles.dtype
+    assert [tuple(row) for row in rows] == candles.tolist()
+    assert numpy.int64 == candles['time'].dtype
+    # NOTE: Saving and loading keeps the fields and their types
+    assert numpy.array_equal(candles, numpy.frombuffer(
+        candles.tobytes(), dtype=arrays.CANDLE))
+
+
+def test_strings_are_parsed():
+    rows = [['48000.10', '0.5', 3], ['47999.90', '1.25', 1]]
+    levels = arrays.get_levels(rows)
+    assert [(48000.1, 0.5, 3), (47999.9, 1.25, 1)] == levels.tolist()
+
+
+def test_level3_book():
+    book = {
+        'bids': [['48000.10', '0.5', 'order-a']],
+        'asks': [['48000.20', '0.25', 'order-b'], ['48000.30', '1', 'c']]
+    }
+    bids, asks = arrays.get_book(book, level=3)
+    assert [(48000.1, 0.5, 1)] == bids.tolist()
+    assert [1, 1] == asks['num_orders'].tolist()
+    bids, asks = arrays.get_book({})
+    assert 0 == len(bids) and arrays.LEVEL == asks.dtype
+
+
+def test_trades():
+    trades = [{
+        'time': '2021-10-18T12:00:00.250000Z',
+        'trade_id': 7,
+        'price': '48000.10',
+        'size': '0.00100000',
+        'side': 'buy'
+    }]
+    array = arrays.get_trades(trades)
+    assert [(7, 1634558400.25, 48000.1, 0.001, b'buy')] == array.tolist()
+    assert 0 == len(arrays.get_trades([]))
+
+
+def test_kraken_round_trip():
+    ohlc = [[1634558400, '48000.1', '48010.0', '47990.0', '48005.0',
+             '48001.2', '1.5', 12]]
+    assert [(1634558400, 48000.1, 48010.0, 47990.0, 48005.0, 48001.2, 1.5,
+             12)] == kraken.get_ohlc(ohlc).tolist()
+    trades = [['48000.1', '0.5', 1634558400.1234, 'b', 'l', '', 9]]
+    assert [(48000.1, 0.5, 1634558400.1234, b'b', b'l')] == (
+        kraken.get_trades(trades).tolist())
+    bids, asks = kraken.get_book({'asks': [['48000.1', '0.5', 1634558400]]})
+    assert [(48000.1, 0.5, 1634558400.0)] == asks.tolist()
+    assert kraken.LEVEL == bids.dtype
+
+
+def test_get_array_fields():
+    dtype = numpy.dtype([('a', 'i8'), ('b', 'f8'), ('c', 'S2')])
+    array = get_array([(1, '2.5')], dtype, ('a', 'b'))
+    assert [(1, 2.5, b'')] == array.tolist()
+    assert [1634558400.5] == get_epoch(['2021-10-18T12:00:00.5Z']).tolist()
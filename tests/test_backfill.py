@@ -0,0 +1,92 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.coinbase_pro.backfill import Backfill
+from w3rw.cex.coinbase_pro.backfill import get_timestamp
+from w3rw.cex.coinbase_pro.backfill import get_windows
+
+import datetime
+import threading
+
+
+class Product(object):
+    # NOTE: Answers like /products/<id>/candles, newest first and with
+    # both bounds inclusive, and records every window it was asked for
+    def __init__(self, fail: int = 0):
+        self.windows = []
+        self.fail = fail
+        self.lock = threading.Lock()
+
+    def candles(self, product_id: str, data: dict) -> list:
+        start = get_epoch(data['start'])
+        end = get_epoch(data['end'])
+        granularity = data['granularity']
+        with self.lock:
+            self.windows.append((start, end))
+            if self.fail:
+                self.fail -= 1
+                return {'message': 'Internal server error'}
+        assert (end - start) // granularity < 300
+        return [
+            [t, 1.0, 2.0, 1.5, 1.5, 10.0]
+            for t in range(end, start - 1, -granularity)
+        ]
+
+
+def get_epoch(value: str) -> int:
+    moment = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return int(moment.timestamp())
+
+
+def test_exact_windows():
+    assert [(0, 18000), (18000, 36000)] == get_windows(0, 36000, 60)
+    assert [(0, 300)] == get_windows(0, 300, 1)
+    assert [] == get_windows(600, 600, 60)
+
+
+def test_partial_last_window():
+    assert [(0, 18000), (18000, 18600)] == get_windows(0, 18600, 60)
+    assert [(0, 60)] == get_windows(0, 60, 60)
+
+
+def test_timestamp():
+    assert '2021-10-18T12:00:00Z' == get_timestamp(1634558400)
+
+
+def test_run_exact_multiple():
+    product = Product()
+    candles = Backfill(product, workers=4).run('BTC-USD', 0, 36000, 60)
+    # NOTE: The end of each window is the last candle before the next one
+    assert [(0, 17940), (18000, 35940)] == sorted(product.windows)
+    assert 600 == len(candles)
+    assert list(range(0, 36000, 60)) == candles['time'].tolist()
+
+
+def test_run_partial_window():
+    product = Product()
+    # NOTE: The start is aligned down to the granularity
+    candles = Backfill(product).run('BTC-USD', 30, 18630, 60)
+    assert [(0, 17940), (18000, 18600)] == sorted(product.windows)
+    assert list(range(0, 18660, 60)) == candles['time'].tolist()
+
+
+def test_run_many_retries():
+    product = Product(fail=1)
+    backfill = Backfill(product, workers=1, backoff=0)
+    candles = backfill.run_many(['BTC-USD', 'ETH-USD'], 0, 600, 60)
+    assert {'BTC-USD', 'ETH-USD'} == set(candles)
+    assert all(10 == len(array) for array in candles.values())
+    assert 3 == len(product.windows)
+    assert [] == backfill.failed
@@ -0,0 +1,113 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from benchmarks.server import __product__
+from benchmarks.server import get_book
+from benchmarks.server import get_full
+
+from w3rw.cex.coinbase_pro.book import OrderBook
+
+import typing
+
+__seed__: int = 7
+
+
+class Product(object):
+    # NOTE: Serves the level 3 snapshots in order and counts the requests
+    def __init__(self, *sequences: int):
+        self.sequences: typing.List[int] = list(sequences)
+        self.requests: int = 0
+
+    def book(self, product_id: str, data: dict = None) -> dict:
+        self.requests += 1
+        return {
+            'sequence': self.sequences.pop(0),
+            'bids': [['100.00', '1.0', 'bid']],
+            'asks': [['101.00', '1.0', 'ask']]
+        }
+
+
+def get_open(sequence: int, price: str = '99.00') -> dict:
+    return {
+        'type': 'open',
+        'product_id': __product__,
+        'sequence': sequence,
+        'order_id': f'order-{sequence}',
+        'side': 'buy',
+        'price': price,
+        'remaining_size': '1.0'
+    }
+
+
+def test_matches_snapshot_replay():
+    snapshot = get_book(__seed__, 3)
+    messages = get_full(__seed__, 500)
+    book = OrderBook(__product__)
+    book.seed(snapshot)
+    assert all(book.apply(message) for message in messages)
+    assert messages[-1]['sequence'] == book.sequence
+    assert not book.syncing
+
+
+def test_stale_messages_are_skipped():
+    book = OrderBook(__product__, Product(10))
+    assert book.resync()
+    assert not book.apply(get_open(10))
+    assert book.apply(get_open(11))
+    assert 11 == book.sequence
+
+
+def test_gap_buffers_and_replays():
+    product = Product(12)
+    book = OrderBook(__product__, product, delay=0)
+    book.seed({'sequence': 10, 'bids': [], 'asks': []})
+    assert book.apply(get_open(12))
+    assert 1 == product.requests
+    assert 12 == book.sequence
+    assert not book.syncing
+    assert book.apply(get_open(13))
+
+
+def test_lagging_snapshot_is_fetched_once():
+    product = Product(10, 20)
+    book = OrderBook(__product__, product, delay=60)
+    results = [book.apply(get_open(sequence)) for sequence in range(15, 20)]
+    assert not any(results)
+    assert 1 == product.requests
+    assert book.syncing
+    assert 5 == book.pending
+
+
+def test_buffer_is_replayed_past_the_snapshot():
+    product = Product(10, 16)
+    book = OrderBook(__product__, product, delay=0)
+    assert not book.apply(get_open(15))
+    assert book.syncing
+    for sequence in range(16, 20):
+        book.apply(get_open(sequence))
+    assert 2 == product.requests
+    assert 19 == book.sequence
+    assert not book.syncing
+    assert 0 == book.pending
+    # NOTE: Orders 17 to 19 were replayed on top of the snapshot
+    assert 3.0 == book.bids.get(99.0)
+    assert (100.0, 1.0) == book.best_bid()
+
+
+def test_gap_without_product_waits():
+    book = OrderBook(__product__)
+    assert not book.apply(get_open(5))
+    assert book.syncing
+    assert 1 == book.pending
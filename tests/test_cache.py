@@ -0,0 +1,115 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from benchmarks.server import Exchange
+
+from w3rw.cex.cache import Cache
+
+from w3rw.cex.coinbase_pro.messenger import Messenger
+
+import requests
+import time
+
+
+class Fetch(object):
+    # NOTE: Answers with the given status and records the headers it got
+    def __init__(self, status: int = 200, etag: str = None):
+        self.status: int = status
+        self.etag: str = etag
+        self.headers: list = []
+
+    def __call__(self, headers: dict = None) -> requests.Response:
+        self.headers.append(headers)
+        response = requests.Response()
+        response.status_code = self.status
+        if self.etag:
+            response.headers['ETag'] = self.etag
+        response._content = str(len(self.headers)).encode()
+        return response
+
+
+def test_hit():
+    cache, fetch = Cache({r'/products': 60}), Fetch()
+    first = cache.fetch('/products', None, fetch)
+    assert first is cache.fetch('/products', None, fetch)
+    assert 1 == len(fetch.headers)
+    assert {'hits': 1, 'misses': 1} == {
+        k: v for k, v in cache.stats.items() if k in ('hits', 'misses')}
+
+
+def test_params_are_part_of_the_key():
+    cache, fetch = Cache({r'/products': 60}), Fetch()
+    cache.fetch('/products', {'a': 1}, fetch)
+    cache.fetch('/products', {'a': 2}, fetch)
+    cache.fetch('/products', {'a': 1, 'nonce': 5}, fetch)
+    assert 2 == len(fetch.headers)
+
+
+def test_expiry():
+    cache, fetch = Cache({r'/products': 0.05}), Fetch()
+    cache.fetch('/products', None, fetch)
+    time.sleep(0.1)
+    assert b'2' == cache.fetch('/products', None, fetch).content
+    assert 2 == cache.stats['misses']
+
+
+def test_eviction():
+    cache, fetch = Cache({r'/products/[^/]+': 60}, size=2), Fetch()
+    for product in ('a', 'b', 'a', 'c'):
+        cache.fetch(f'/products/{product}', None, fetch)
+    assert 1 == cache.stats['evictions']
+    assert 2 == cache.stats['entries']
+    # NOTE: 'a' was used after 'b', so 'b' was the one evicted
+    cache.fetch('/products/a', None, fetch)
+    assert 3 == len(fetch.headers)
+    cache.fetch('/products/b', None, fetch)
+    assert 4 == len(fetch.headers)
+
+
+def test_revalidation():
+    cache = Cache({r'/products': 0.05})
+    first = cache.fetch('/products', None, Fetch(etag='"v1"'))
+    time.sleep(0.1)
+    fetch = Fetch(304)
+    assert first is cache.fetch('/products', None, fetch)
+    assert [{'If-None-Match': '"v1"'}] == fetch.headers
+    assert 1 == cache.stats['revalidations']
+    assert first is cache.fetch('/products', None, fetch)
+    assert 1 == len(fetch.headers)
+
+
+def test_errors_are_not_cached():
+    cache, fetch = Cache({r'/products': 60}), Fetch(500)
+    cache.fetch('/products', None, fetch)
+    cache.fetch('/products', None, fetch)
+    assert 2 == len(fetch.headers)
+    assert 0 == cache.stats['entries']
+
+
+def test_unmatched_endpoints_bypass_the_cache():
+    cache, fetch = Cache({r'/products': 60}), Fetch()
+    cache.fetch('/products/BTC-USD', None, fetch)
+    cache.fetch('/products/BTC-USD', None, fetch)
+    assert [None, None] == fetch.headers
+
+
+def test_private_endpoints_bypass_the_cache(exchange: Exchange):
+    messenger = Messenger(cache=Cache({r'.*': 60}))
+    messenger.api.url = exchange.url
+    for _ in range(2):
+        messenger.get('/accounts')
+        messenger.get('/products')
+    assert 2 == exchange.hits['/accounts']
+    assert 1 == exchange.hits['/products']
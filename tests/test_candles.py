@@ -0,0 +1,97 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.candles import Aggregator
+from w3rw.cex.candles import Bar
+from w3rw.cex.candles import Series
+
+
+def test_bucketing():
+    series = Series(60)
+    series.update(120.0, 10.0, 1.0)
+    series.update(150.5, 12.0, 2.0)
+    series.update(179.9, 9.0, 0.5)
+    series.update(180.0, 11.0, 1.0)
+    assert [Bar(120, 10.0, 12.0, 9.0, 9.0, 3.5, 3),
+            Bar(180, 11.0, 11.0, 11.0, 11.0, 1.0, 1)] == series.bars()
+    assert 180 == series.latest
+    assert series.get(61) is None
+    assert 120 == series.get(179).time
+
+
+def test_out_of_order_trades():
+    # NOTE: The open and close follow the trade time, not arrival order
+    series = Series(60)
+    series.update(130.0, 10.0, 1.0)
+    series.update(125.0, 8.0, 1.0)
+    series.update(170.0, 13.0, 1.0)
+    series.update(150.0, 12.0, 1.0)
+    assert Bar(120, 8.0, 13.0, 8.0, 13.0, 4.0, 4) == series.last()
+
+
+def test_late_trades():
+    series = Series(60, size=3)
+    series.update(600.0, 10.0, 1.0)
+    # NOTE: A trade in an earlier bar that is still in the window is kept
+    assert series.update(485.0, 9.0, 1.0)
+    assert 480 == series.get(480).time
+    assert 600 == series.latest
+    # NOTE: Anything older than the window is dropped and counted
+    assert not series.update(420.0, 8.0, 1.0)
+    assert 1 == series.late
+    assert series.get(420) is None
+
+
+def test_ring_wrap_around():
+    series = Series(1, size=4)
+    for moment in range(10):
+        series.update(float(moment), float(moment), 1.0)
+    assert 4 == len(series)
+    assert [6, 7, 8, 9] == [bar.time for bar in series.bars()]
+    assert [8, 9] == [bar.time for bar in series.bars(2)]
+    assert [] == series.bars(0)
+    # NOTE: Slot 1 held the bar at 1 and 5 before the bar at 9
+    assert series.get(5) is None
+    assert 1 == series.get(9).trades
+
+
+def test_gaps_have_no_bar():
+    series = Series(60, size=10)
+    series.update(0.0, 1.0, 1.0)
+    series.update(600.0, 2.0, 1.0)
+    series.update(300.0, 3.0, 1.0)
+    assert [300, 600] == [bar.time for bar in series.bars()]
+    assert series.get(0) is None
+
+
+def test_seed():
+    series = Series(60)
+    assert series.seed(120, 10.0, 12.0, 9.0, 11.0, 5.0, 7)
+    series.update(125.0, 13.0, 1.0)
+    # NOTE: A trade within a seeded bar moves its close, never its open
+    assert Bar(120, 10.0, 13.0, 9.0, 13.0, 6.0, 8) == series.last()
+
+
+def test_aggregator():
+    aggregator = Aggregator((300, 60, 60))
+    assert [60, 300] == aggregator.granularities
+    assert 60 in aggregator and 1 not in aggregator
+    for moment in (0.0, 59.0, 60.0, 299.0, 300.0):
+        assert aggregator.update(moment, moment, 1.0)
+    assert [0, 60, 240, 300] == [b.time for b in aggregator.bars(60)]
+    assert [(0, 4), (300, 1)] == [
+        (b.time, b.trades) for b in aggregator.bars(300)]
+    assert 0 == aggregator.late
+    assert aggregator[300].last().close == 300.0
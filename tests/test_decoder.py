@@ -0,0 +1,74 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex import decoder
+
+from w3rw.cex.decoder import Decoder
+
+import decimal
+import pytest
+
+
+def test_fallback_without_orjson(monkeypatch):
+    monkeypatch.setattr(decoder, 'orjson', None)
+    assert 'json' == Decoder().backend
+    with pytest.raises(ValueError):
+        Decoder(backend='orjson')
+    assert {'type': 'match'} == Decoder().decode(b'{"type": "match"}')
+
+
+def test_decimal_requires_json():
+    assert 'json' == Decoder(decimal=True).backend
+    with pytest.raises(ValueError):
+        Decoder(decimal=True, backend='orjson')
+
+
+def test_decimal_prices():
+    # NOTE: Candles carry their prices as JSON numbers
+    candles = Decoder(decimal=True).decode(
+        b'[[1634558400, 47990.1, 48010.25, 48000.5, 48005.75, 12.5]]')
+    assert all(isinstance(v, decimal.Decimal) for v in candles[0][1:])
+    assert decimal.Decimal('48010.25') == candles[0][2]
+    assert isinstance(Decoder().decode(b'[1.5]')[0], float)
+
+
+def test_string_prices_are_untouched():
+    message = Decoder(decimal=True).decode(b'{"price": "48000.10"}')
+    assert '48000.10' == message['price']
+
+
+def test_peek():
+    decoder = Decoder()
+    assert 'l2update' == decoder.peek(b'{"type": "l2update", "changes": []}')
+    assert 'BTC-USD' == decoder.peek(
+        '{"type": "match", "product_id": "BTC-USD"}', 'product_id')
+    assert 'book-10' == decoder.peek(b'[42, {"a": []}, "book-10", "XBT/USD"]')
+    assert decoder.peek(b'{"sequence": 1}') is None
+
+
+def test_ignored_types_are_not_parsed():
+    # NOTE: The payload is not valid JSON, so it could only be returned
+    # without an error if it was never parsed
+    decoder = Decoder(ignore=['heartbeat'], backend='json')
+    assert decoder.decode(b'{"type": "heartbeat", "sequence": ') is None
+    with pytest.raises(ValueError):
+        decoder.decode(b'{"type": "match", "sequence": ')
+    assert {'type': 'match'} == decoder.decode(b'{"type": "match"}')
+
+
+def test_memoryview_and_empty_payloads():
+    decoder = Decoder(backend='json')
+    assert [1] == decoder.decode(memoryview(b'[1]'))
+    assert decoder.decode(b'') is None
@@ -0,0 +1,79 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from benchmarks.server import __product__
+from benchmarks.server import get_book
+from benchmarks.server import get_full
+
+from w3rw.cex.coinbase_pro.shared import Ingest
+from w3rw.cex.coinbase_pro.socket import Stream
+
+from w3rw.cex.shared import Reader
+
+import os
+import pytest
+
+__seed__: int = 7
+
+
+class Product(object):
+    def __init__(self, snapshot: dict):
+        self.snapshot: dict = snapshot
+
+    def book(self, product_id: str, data: dict = None) -> dict:
+        return self.snapshot
+
+
+@pytest.fixture
+def ingest() -> Ingest:
+    snapshot = get_book(__seed__, 3)
+    ingest = Ingest(
+        Stream(), [__product__], Product(snapshot),
+        prefix=f'w3rw-test-{os.getpid()}-')
+    yield ingest
+    ingest.close()
+
+
+def test_trades_are_published_while_resyncing(ingest: Ingest):
+    # NOTE: The match is far past the snapshot, so the book stays out of
+    # sync and buffers it
+    book = ingest.books[__product__]
+    matches = [m for m in get_full(__seed__, 2000) if 'match' == m['type']]
+    match = dict(matches[0], sequence=10 ** 9)
+    assert not ingest.apply(match)
+    assert book.syncing
+    publisher = ingest.publishers[__product__]
+    with Reader(publisher.name) as reader:
+        count, ticks = reader.trades()
+        assert 1 == count
+        assert float(match['price']) == ticks[0].price
+
+
+def test_book_is_only_published_when_the_top_changes(ingest: Ingest):
+    messages = get_full(__seed__, 500)
+    publisher = ingest.publishers[__product__]
+    published = 0
+    for message in messages:
+        sequence = publisher.sequence
+        changed = ingest.apply(message)
+        assert changed == (publisher.sequence != sequence)
+        published += changed
+    received = sum(1 for m in messages if 'received' == m['type'])
+    assert 0 < published <= len(messages) - received
+    with Reader(publisher.name) as reader:
+        snapshot = reader.book()
+        levels = ingest.books[__product__].depth(reader.depth)
+        assert levels['bids'] == snapshot.bids
+        assert levels['asks'] == snapshot.asks
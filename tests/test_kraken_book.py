@@ -0,0 +1,99 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.kraken.book import OrderBook
+from w3rw.cex.kraken.book import OrderBooks
+from w3rw.cex.kraken.book import get_fragment
+
+from w3rw.cex.kraken.socket import Stream
+
+import zlib
+
+__pair__: str = 'XBT/USD'
+
+__asks__: list = [
+    '0.05005', '0.05010', '0.05015', '0.05020', '0.05025',
+    '0.05030', '0.05035', '0.05040', '0.05045', '0.05050'
+]
+
+__bids__: list = [
+    '0.05000', '0.04995', '0.04990', '0.04985', '0.04980',
+    '0.04975', '0.04970', '0.04965', '0.04960', '0.04955'
+]
+
+# NOTE: https://docs.kraken.com/websockets/#book-checksum, i.e. the best
+# 10 asks then the best 10 bids, each price and volume with the decimal
+# point and leading zeros removed, concatenated and fed to CRC32
+__text__: str = (
+    '5005500501050050155005020500502550050305005035500504050050455005050'
+    '5005000500499550049905004985500498050049755004970500496550049605004'
+    '955500'
+)
+__checksum__: int = 2726735196
+
+
+def get_snapshot() -> list:
+    def level(price: str) -> list:
+        return [price, '0.00000500', '1582905487.684110']
+
+    return [0, {
+        'as': [level(price) for price in __asks__],
+        'bs': [level(price) for price in __bids__]
+    }, 'book-10', __pair__]
+
+
+def get_update(checksum: int) -> list:
+    return [0, {
+        'a': [['0.05005', '0.00000500', '1582905487.684110']],
+        'c': str(checksum)
+    }, 'book-10', __pair__]
+
+
+def test_fragment():
+    assert b'5005500' == get_fragment('0.05005', '0.00000500')
+    assert b'48000112345' == get_fragment('48000.1', '0.0012345')
+
+
+def test_checksum_matches_the_spec():
+    assert __checksum__ == zlib.crc32(__text__.encode())
+    book = OrderBook(__pair__, 10)
+    assert book.apply(get_snapshot())
+    assert __checksum__ == book.checksum()
+    assert book.apply(get_update(__checksum__))
+    assert 0 == book.mismatches
+
+
+def test_mismatch_clears_the_book():
+    book = OrderBook(__pair__, 10)
+    book.apply(get_snapshot())
+    assert not book.apply(get_update(__checksum__ ^ 1))
+    assert 1 == book.mismatches
+    assert not book.ready
+    assert book.best_ask() is None
+
+
+def test_mismatch_resubscribes_without_recording():
+    stream = Stream()
+    books = OrderBooks(stream, 10)
+    books.subscribe([__pair__])
+    assert 1 == len(stream.subscriptions)
+    books.apply(get_snapshot())
+    sent = []
+    stream.send = lambda params, record=True: sent.append((params, record))
+    books.apply(get_update(__checksum__ ^ 1))
+    assert [('unsubscribe', False), ('subscribe', False)] == [
+        (params['event'], record) for params, record in sent
+    ]
+    assert 1 == len(stream.subscriptions)
@@ -0,0 +1,121 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex import limiter
+
+from w3rw.cex.abstract import AbstractMessenger
+
+from w3rw.cex.limiter import Bucket
+from w3rw.cex.limiter import Counter
+from w3rw.cex.limiter import Limiter
+
+import pytest
+
+
+class Clock(object):
+    # NOTE: Stands in for the time module, so sleeping advances the clock
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, delay):
+        self.slept.append(delay)
+        self.now += delay
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(limiter, 'time', clock)
+    return clock
+
+
+def test_burst(clock: Clock):
+    bucket = Bucket(2, 5)
+    assert [0.0] * 5 == [bucket.reserve() for _ in range(5)]
+    # NOTE: Once the burst is spent each request waits for its own token
+    assert 0.5 == bucket.reserve()
+    assert 1.0 == bucket.reserve()
+    assert -2.0 == bucket.tokens
+
+
+def test_refill(clock: Clock):
+    bucket = Bucket(2, 5)
+    bucket.reserve(5)
+    clock.now += 1.0
+    assert 2.0 == bucket.tokens
+    # NOTE: Refilling stops at the capacity
+    clock.now += 60.0
+    assert 5.0 == bucket.tokens
+
+
+def test_acquire_sleeps(clock: Clock):
+    bucket = Bucket(4, 1)
+    assert 0.0 == bucket.acquire()
+    assert 0.5 == bucket.acquire(2)
+    assert [0.5] == clock.slept
+    assert 0.25 == bucket.acquire()
+
+
+def test_counter_decay(clock: Clock):
+    counter = Counter(15, 0.33)
+    assert 15 == counter.limit
+    assert 0.33 == counter.decay
+    for _ in range(10):
+        counter.reserve()
+    assert 10.0 == counter.counter
+    clock.now += 10.0
+    assert 6.7 == pytest.approx(counter.counter)
+    # NOTE: A counter at its limit waits for a whole call to decay
+    counter.reserve(8.3)
+    assert 1 / 0.33 == pytest.approx(counter.reserve())
+    clock.now += 100.0
+    assert 0.0 == counter.counter
+
+
+def test_limiter_scopes(clock: Clock):
+    shared = Bucket(1, 1)
+    limits = Limiter({'private': shared, 'order': shared})
+    assert shared is limits.bucket('order')
+    assert 0.0 == limits.acquire('private')
+    assert 1.0 == limits.reserve('order')
+    # NOTE: A scope without a bucket is never throttled
+    assert 0.0 == limits.reserve('public', 100)
+    assert limits.bucket('public') is None
+
+
+def test_limiter_defaults_to_none():
+    class Messenger(AbstractMessenger):
+        def __init__(self, auth=None):
+            pass
+
+        api = auth = session = timeout = None
+
+        def get(self, endpoint, data=None):
+            pass
+
+        def post(self, endpoint, data=None):
+            pass
+
+        def page(self, endpoint, data=None):
+            pass
+
+        def close(self):
+            pass
+
+    assert Messenger().limiter is None
@@ -0,0 +1,124 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.metrics import Histogram
+from w3rw.cex.metrics import Metrics
+from w3rw.cex.metrics import get_index
+from w3rw.cex.metrics import get_route
+from w3rw.cex.metrics import get_value
+
+import random
+import re
+import requests
+
+# NOTE: One sample of the text format, e.g. name{labels} value
+__sample__ = re.compile(r'^([a-z_]+)(\{[^}]*\})? (\S+)$')
+
+
+def get_response(status: int, content: bytes) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response._content = content
+    return response
+
+
+def test_index_round_trip():
+    for value in range(64):
+        assert value == get_value(get_index(value))
+    rng = random.Random(7)
+    for value in [rng.randint(64, 10 ** 9) for _ in range(10000)]:
+        upper = get_value(get_index(value))
+        assert value <= upper
+        assert (upper - value) / value < 1 / 32
+    # NOTE: Indexes grow with the value, so buckets sort in order
+    indexes = [get_index(value) for value in range(100000)]
+    assert indexes == sorted(indexes)
+
+
+def test_quantiles():
+    histogram = Histogram()
+    for millis in range(1, 1001):
+        histogram.record(millis / 1000)
+    assert 1000 == histogram.count
+    assert 0.001 == histogram.min
+    assert 1.0 == histogram.max
+    assert 0.5005 == histogram.mean
+    for q in (0.5, 0.9, 0.99, 0.999):
+        assert abs(histogram.quantile(q) - q) <= q * 0.03
+    assert 1.0 == histogram.quantile(1.0)
+    assert 0.0 == Histogram().quantile(0.5)
+    assert {'count', 'total', 'min', 'max', 'mean', 'p50', 'p90', 'p99',
+            'p99.9'} == set(histogram.as_dict())
+
+
+def test_get_route():
+    assert '/orders/:id' == get_route(
+        '/orders/68e6a28f-ae28-4788-8d4f-5ab4e5e5ae08')
+    assert '/products/BTC-USD/book' == get_route(
+        '/products/BTC-USD/book?level=2')
+    assert '/v2/accounts/:id/buys' == get_route('/v2/accounts/1234/buys')
+    assert '/0/public/Depth' == get_route('/0/public/Depth')
+
+
+def test_as_dict():
+    metrics = Metrics()
+    seen = []
+    metrics.on_response(lambda *args: seen.append(args[:2]))
+    response = get_response(200, b'{"id": "a"}')
+    metrics.after('GET', '/orders/12345', response, {'network': 0.01})
+    metrics.after('GET', '/orders/67890', response, {'network': 0.02})
+    metrics.message('match', 120, 0.005)
+    metrics.message(None, 10)
+    result = metrics.as_dict()
+    assert [{'method': 'GET', 'route': '/orders/:id', 'status': 200,
+             'count': 2}] == result['requests']
+    assert 22 == result['routes']['/orders/:id']['bytes']
+    assert 2 == result['routes']['/orders/:id']['network']['count']
+    assert 120 == result['streams']['match']['bytes']
+    assert result['streams']['unknown']['lag'] is None
+    assert [('GET', '/orders/12345'), ('GET', '/orders/67890')] == seen
+
+
+def test_prometheus():
+    metrics = Metrics()
+    metrics.after('GET', '/orders/12345', get_response(200, b'{}'), {
+        'network': 0.01, 'total': 0.02})
+    metrics.after('POST', '/orders', get_response(400, b'{}'), {
+        'total': 0.03})
+    metrics.message('match', 120, 0.005)
+    text = metrics.as_prometheus('test')
+    assert text.endswith('\n')
+    lines = text.splitlines()
+    assert ('test_requests_total{method="GET",route="/orders/:id",'
+            'status="200"} 1') in lines
+    assert ('test_request_seconds{route="/orders/:id",phase="network",'
+            'quantile="0.5"} 0.01') in lines
+    assert 'test_request_seconds_count{route="/orders",phase="total"} 1' in (
+        lines)
+    assert 'test_messages_total{channel="match"} 1' in lines
+    # NOTE: Each family is one group that starts with its TYPE line
+    families = []
+    for line in lines:
+        if line.startswith('# TYPE '):
+            _, _, name, kind = line.split()
+            assert kind in ('counter', 'summary')
+            assert name not in families
+            families.append(name)
+            continue
+        name, _, value = __sample__.match(line).groups()
+        float(value)
+        family = re.sub(r'_(sum|count)$', '', name)
+        assert families[-1] in (name, family)
+    assert 6 == len(families)
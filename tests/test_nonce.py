@@ -0,0 +1,69 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.kraken.nonce import Nonce
+from w3rw.cex.kraken.nonce import get_nonce
+
+from w3rw.cex.pool import fan_out
+
+import multiprocessing
+import time
+
+
+def get_values(nonce: Nonce, count: int) -> list:
+    return [nonce() for _ in range(count)]
+
+
+def get_shared(path: str, count: int) -> list:
+    return get_values(Nonce(path), count)
+
+
+def test_values_are_microseconds():
+    value = Nonce()()
+    assert abs(value - time.time() * 1e6) < 1e6
+
+
+def test_values_increase_across_threads():
+    # NOTE: Each thread's values come back in the order it drew them, so
+    # every thread sees a strictly increasing run, and no value repeats
+    nonce = Nonce()
+    results = fan_out(lambda _: get_values(nonce, 2000), range(8), 8)
+    runs = [result.value for result in results]
+    for run in runs:
+        assert all(a < b for a, b in zip(run, run[1:]))
+    values = [value for run in runs for value in run]
+    assert len(values) == len(set(values))
+    assert max(values) == nonce.last
+
+
+def test_get_nonce_is_shared():
+    assert get_nonce() is get_nonce()
+
+
+def test_shared_file_never_repeats(tmp_path):
+    path = str(tmp_path / 'kraken.nonce')
+    first, second = Nonce(path), Nonce(path)
+    values = fan_out(
+        lambda nonce: get_values(nonce, 1000), [first, second, first], 3)
+    values = [value for result in values for value in result.value]
+    assert len(values) == len(set(values))
+
+
+def test_shared_file_across_processes(tmp_path):
+    path = str(tmp_path / 'kraken.nonce')
+    with multiprocessing.get_context('spawn').Pool(2) as pool:
+        runs = pool.starmap(get_shared, [(path, 500), (path, 500)])
+    values = [value for run in runs for value in run]
+    assert len(values) == len(set(values))
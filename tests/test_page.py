@@ -0,0 +1,151 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from benchmarks.server import __product__
+from benchmarks.server import Exchange
+
+from w3rw import __offset__
+
+from w3rw.cex.coinbase.messenger import Auth as CoinbaseAuth
+from w3rw.cex.coinbase.messenger import Messenger as CoinbaseMessenger
+
+from w3rw.cex.coinbase_pro.client import get_client
+
+from w3rw.cex.kraken.messenger import Auth as KrakenAuth
+from w3rw.cex.kraken.messenger import Messenger as KrakenMessenger
+
+from w3rw.cex.page import Page
+from w3rw.cex.page import read_ahead
+
+import base64
+import itertools
+import pytest
+import requests
+import threading
+import time
+
+__trades__: str = f'/products/{__product__}/trades'
+
+
+@pytest.fixture
+def product(exchange: Exchange):
+    client = get_client()
+    client.product.messenger.api.url = exchange.url
+    return client.product
+
+
+def test_cb_after(exchange: Exchange, product):
+    pages = list(product.iter_trades(__product__))
+    assert len(exchange.trades) // exchange.limit == len(pages)
+    assert all(isinstance(page, Page) for page in pages)
+    # NOTE: Each cursor is the oldest trade of its page
+    assert str(pages[0].items[-1]['trade_id']) == pages[0].cursor
+    assert pages[-1].cursor is None
+    ids = [item['trade_id'] for page in pages for item in page.items]
+    assert list(range(len(exchange.trades), 0, -1)) == ids
+
+
+def test_cb_after_resumes(exchange: Exchange, product):
+    pages = product.iter_trades(__product__, cursor='151')
+    assert 100 == len(next(pages).items)
+    assert 50 == len(next(pages).items)
+    with pytest.raises(StopIteration):
+        next(pages)
+    assert 2 == exchange.hits[__trades__]
+
+
+def test_pages_are_fetched_lazily(exchange: Exchange, product):
+    pages = product.iter_trades(__product__)
+    assert 0 == exchange.hits.get(__trades__, 0)
+    next(pages)
+    assert 1 == exchange.hits[__trades__]
+
+
+def test_errors_are_raised(exchange: Exchange, product):
+    exchange.fault(__trades__, 400, {'message': 'Invalid'})
+    with pytest.raises(requests.HTTPError):
+        next(product.iter_trades(__product__))
+
+
+def test_next_starting_after(exchange: Exchange):
+    messenger = CoinbaseMessenger(CoinbaseAuth())
+    messenger.api.url = exchange.url
+    pages = list(messenger.iter_pages('/accounts'))
+    assert len(exchange.trades) // __offset__ == len(pages)
+    assert pages[0].items[-1]['id'] == pages[0].cursor
+    assert pages[-1].cursor is None
+    items = list(messenger.iter_items('/accounts', cursor='3'))
+    assert ['2', '1'] == [item['id'] for item in items]
+
+
+def test_kraken_ofs(exchange: Exchange):
+    secret = base64.b64encode(b'secret').decode()
+    messenger = KrakenMessenger(KrakenAuth('key', secret))
+    messenger.api.url = exchange.url
+    endpoint = '/private/TradesHistory'
+    pages = list(itertools.islice(messenger.iter_pages(endpoint), 2))
+    assert [50, 100] == [page.cursor for page in pages]
+    assert ('T1000', exchange.trades[0]) == pages[0].items[0]
+    # NOTE: The cursor is None once the offset reaches the count
+    pages = list(messenger.iter_pages(endpoint, cursor=950))
+    assert [None] == [page.cursor for page in pages]
+    assert 'T50' == pages[0].items[0][0]
+
+
+def test_read_ahead_prefetches(exchange: Exchange, product):
+    pages = product.iter_trades(__product__, prefetch=2)
+    first = next(pages)
+    assert 100 == len(first.items)
+    # NOTE: The worker fetches ahead while the first page is being used
+    for _ in range(50):
+        if 3 < exchange.hits[__trades__]:
+            break
+        time.sleep(0.02)
+    assert 4 == exchange.hits[__trades__]
+    assert 9 == len(list(pages))
+
+
+def test_read_ahead_raises_errors():
+    def pages():
+        yield Page([1], 'a')
+        raise ValueError('broken')
+
+    pages = read_ahead(pages())
+    assert [1] == next(pages).items
+    with pytest.raises(ValueError):
+        next(pages)
+
+
+def test_read_ahead_raises_http_errors(exchange: Exchange, product):
+    exchange.fault(__trades__, 400, {'message': 'Invalid'})
+    with pytest.raises(requests.HTTPError):
+        list(product.iter_trades(__product__, prefetch=1))
+
+
+def test_read_ahead_closes_early():
+    closed = threading.Event()
+
+    def pages():
+        try:
+            for index in itertools.count():
+                yield Page([index], index)
+        finally:
+            closed.set()
+
+    pages = read_ahead(pages(), depth=2)
+    assert [0] == next(pages).items
+    pages.close()
+    # NOTE: Closing the consumer stops the worker and closes the source
+    assert closed.wait(5)
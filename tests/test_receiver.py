@@ -0,0 +1,163 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from benchmarks.server import Exchange
+
+from w3rw.cex.coinbase_pro.socket import Stream
+
+from w3rw.cex.receiver import Receiver
+
+import pytest
+import threading
+import time
+
+__subscribe__: dict = {
+    'type': 'subscribe',
+    'product_ids': ['BTC-USD'],
+    'channels': ['full']
+}
+
+
+class Socket(object):
+    # NOTE: Reads block until a frame is queued or the socket is closed
+    def __init__(self):
+        self.frames: list = []
+        self.closed: bool = False
+        self.condition: threading.Condition = threading.Condition()
+
+    def push(self, *frames) -> None:
+        with self.condition:
+            self.frames.extend(frames)
+            self.condition.notify_all()
+
+    def close(self) -> None:
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def read(self) -> object:
+        with self.condition:
+            while not self.frames and not self.closed:
+                self.condition.wait()
+            if self.closed:
+                raise ConnectionError('closed')
+            return self.frames.pop(0)
+
+
+def wait_for(predicate, timeout: float = 2) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        Receiver(Socket().read, policy='wait')
+
+
+def test_start_and_stop():
+    socket = Socket()
+    receiver = Receiver(socket.read, 8)
+    receiver.start()
+    socket.push(1, 2, 3)
+    assert [1, 2, 3] == [p for _, p in receiver.get_many(3, timeout=1)]
+    receiver.stop()
+    assert not receiver.running
+    socket.close()
+    receiver.join(2)
+    assert receiver.error is None
+    assert [] == receiver.get_many(1, timeout=0)
+
+
+def test_restart():
+    socket = Socket()
+    receiver = Receiver(socket.read, 8)
+    receiver.start()
+    receiver.stop()
+    socket.close()
+    receiver.join(2)
+    socket.closed = False
+    receiver.start()
+    assert receiver.running
+    socket.push('frame')
+    assert ['frame'] == [p for _, p in receiver.get_many(1, timeout=1)]
+    receiver.stop()
+    socket.close()
+    receiver.join(2)
+    assert not receiver.running
+    assert receiver.error is None
+
+
+def test_error_is_recorded():
+    socket = Socket()
+    receiver = Receiver(socket.read, 8)
+    receiver.start()
+    socket.close()
+    receiver.join(2)
+    assert not receiver.running
+    assert isinstance(receiver.error, ConnectionError)
+
+
+def test_drop_policy():
+    socket = Socket()
+    receiver = Receiver(socket.read, 4, 'drop')
+    socket.push(*range(10))
+    receiver.start()
+    assert wait_for(lambda: 10 == receiver.stats['received'])
+    assert [6, 7, 8, 9] == [p for _, p in receiver.get_many(10)]
+    assert 6 == receiver.stats['dropped']
+    receiver.stop()
+    socket.close()
+    receiver.join(2)
+
+
+def test_block_policy_stops_when_full():
+    socket = Socket()
+    receiver = Receiver(socket.read, 4, 'block')
+    socket.push(*range(10))
+    receiver.start()
+    assert wait_for(lambda: 1 == receiver.stats['blocked'])
+    receiver.stop()
+    receiver.join(2)
+    assert not receiver.running
+    assert [0, 1, 2, 3] == [p for _, p in receiver.get_many(10)]
+    assert receiver.error is None
+
+
+def test_stream_disconnect_with_full_buffer(exchange: Exchange):
+    stream = Stream(url=f'{exchange.ws_url}/?count=1000')
+    stream.connect()
+    stream.send(__subscribe__)
+    receiver = stream.start(4, 'block')
+    assert wait_for(lambda: 1 == receiver.stats['blocked'])
+    stream.disconnect()
+    assert not receiver.running
+    assert receiver.error is None
+    assert 4 == len(stream.receive_many(10, timeout=0))
+
+
+def test_stream_stop(exchange: Exchange):
+    stream = Stream(url=f'{exchange.ws_url}/?count=1000')
+    stream.connect()
+    stream.send(__subscribe__)
+    receiver = stream.start(64)
+    assert stream.receive_many(1, timeout=2)
+    stream.stop()
+    assert stream.receiver is None
+    assert not receiver.running
+    assert not stream.connected
@@ -0,0 +1,146 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from benchmarks.server import Exchange
+
+from w3rw.cex.coinbase_pro.messenger import Messenger
+
+from w3rw.cex.kraken.messenger import Auth as KrakenAuth
+from w3rw.cex.kraken.messenger import Messenger as KrakenMessenger
+from w3rw.cex.kraken.messenger import get_retry as get_kraken_retry
+from w3rw.cex.kraken.messenger import is_refused
+
+from w3rw.cex.retry import Retry
+from w3rw.cex.retry import get_retry_after
+
+import base64
+import pytest
+import requests
+
+
+def get_response(status: int, headers: dict = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return response
+
+
+def get_messenger(exchange: Exchange, retry: Retry) -> Messenger:
+    messenger = Messenger(retry=retry, timeout=(1, 0.2))
+    messenger.api.url = exchange.url
+    return messenger
+
+
+def get_fast_retry(**kwargs) -> Retry:
+    return Retry(attempts=3, backoff=0.001, limit=0.01, **kwargs)
+
+
+def test_retry_after_on_error_status():
+    for status in (429, 503):
+        response = get_response(status, {'Retry-After': '5'})
+        assert 5.0 == get_retry_after(response)
+    assert get_retry_after(get_response(429)) is None
+    assert get_retry_after(None) is None
+
+
+def test_retry_after_is_capped():
+    response = get_response(429, {'Retry-After': '86400'})
+    assert 30 == Retry().delay(0, response)
+    assert 2 == Retry(limit=2).delay(0, response)
+
+
+def test_classification():
+    retry = get_fast_retry()
+    assert retry.refused(get_response(429))
+    assert not retry.refused(get_response(503))
+    assert retry.transient(get_response(503))
+    assert retry.transient(None)
+    assert not retry.transient(get_response(400))
+    for method in ('GET', 'PUT', 'DELETE'):
+        assert not retry.ambiguous(method, '/withdrawals/crypto')
+    assert retry.ambiguous('POST', '/withdrawals/crypto')
+    assert retry.ambiguous('POST', '/orders', get_response(503))
+    assert not retry.ambiguous('POST', '/orders', get_response(429))
+
+
+def test_kraken_classification():
+    retry = get_kraken_retry()
+    assert retry.idempotent('POST', '/0/private/Balance')
+    assert retry.idempotent('POST', '/0/private/CancelOrder')
+    assert not retry.idempotent('POST', '/0/private/AddOrder')
+    assert not retry.idempotent('POST', '/0/private/Withdraw')
+    response = get_response(200)
+    response._content = b'{"error":["EAPI:Invalid nonce"]}'
+    assert retry.refused(response)
+
+
+def test_get_is_retried(exchange: Exchange):
+    exchange.fault('/products', 503, times=2)
+    messenger = get_messenger(exchange, get_fast_retry())
+    messenger.cache.clear()
+    assert 200 == messenger.get('/products').status_code
+    assert 3 == exchange.hits['/products']
+
+
+def test_get_honors_retry_after(exchange: Exchange):
+    exchange.fault('/accounts', 429, headers={'Retry-After': '0'})
+    retry = Retry(attempts=1, backoff=10, limit=10)
+    messenger = get_messenger(exchange, retry)
+    assert 200 == messenger.get('/accounts').status_code
+    assert 1 == retry.retries
+
+
+def test_post_is_not_resent_after_timeout(exchange: Exchange):
+    exchange.fault('/withdrawals/crypto', 200, delay=0.5)
+    messenger = get_messenger(exchange, get_fast_retry())
+    with pytest.raises(requests.ReadTimeout):
+        messenger.post('/withdrawals/crypto', {'amount': '1'})
+    assert 1 == exchange.hits['/withdrawals/crypto']
+
+
+def test_post_is_not_resent_after_server_error(exchange: Exchange):
+    exchange.fault('/withdrawals/crypto', 503)
+    messenger = get_messenger(exchange, get_fast_retry())
+    response = messenger.post('/withdrawals/crypto', {'amount': '1'})
+    assert 503 == response.status_code
+    assert 1 == exchange.hits['/withdrawals/crypto']
+
+
+def test_refused_post_is_resent(exchange: Exchange):
+    exchange.fault('/withdrawals/crypto', 429)
+    messenger = get_messenger(exchange, get_fast_retry())
+    messenger.post('/withdrawals/crypto', {'amount': '1'})
+    assert 2 == exchange.hits['/withdrawals/crypto']
+
+
+def test_order_is_recovered(exchange: Exchange):
+    exchange.fault('/orders', 503)
+    exchange.fault('/orders/client:abc', 200, {'id': 'order'})
+    messenger = get_messenger(exchange, get_fast_retry())
+    response = messenger.post('/orders', {'client_oid': 'abc'})
+    assert {'id': 'order'} == response.json()
+    assert 1 == exchange.hits['/orders']
+
+
+def test_kraken_invalid_nonce_is_resent(exchange: Exchange):
+    exchange.fault(
+        '/0/private/AddOrder', 200, {'error': ['EAPI:Invalid nonce']})
+    secret = base64.b64encode(b'secret').decode()
+    messenger = KrakenMessenger(
+        KrakenAuth('key', secret),
+        retry=get_fast_retry(refused=is_refused))
+    messenger.api.url = exchange.url
+    messenger.post('/private/AddOrder', {'pair': 'XBTUSD'})
+    assert 2 == exchange.hits['/0/private/AddOrder']
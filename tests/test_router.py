@@ -0,0 +1,110 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.coinbase_pro.models import Match
+from w3rw.cex.coinbase_pro.router import Router
+
+from w3rw.cex.kraken.router import Router as KrakenRouter
+
+__match__: dict = {
+    'type': 'match',
+    'trade_id': 1,
+    'sequence': 50,
+    'maker_order_id': 'a',
+    'taker_order_id': 'b',
+    'time': '2021-10-18T00:00:00.000000Z',
+    'product_id': 'BTC-USD',
+    'size': '0.5',
+    'price': '48000.00',
+    'side': 'buy'
+}
+
+
+def test_dispatch_by_channel_and_product():
+    router = Router()
+    seen = {'btc': [], 'match': [], 'all': []}
+    router.add(seen['btc'].append, 'match', 'BTC-USD')
+    router.add(seen['match'].append, 'match')
+    router.add(seen['all'].append)
+    assert 3 == router.dispatch(__match__)
+    assert 2 == router.dispatch(dict(__match__, product_id='ETH-USD'))
+    assert 1 == router.dispatch({'type': 'heartbeat'})
+    assert 1 == len(seen['btc'])
+    assert 2 == len(seen['match'])
+    assert 3 == len(seen['all'])
+
+
+def test_table_is_precomputed():
+    router = Router()
+    router.add(print, 'match', 'BTC-USD')
+    router.add(repr, 'match')
+    assert (print, repr) == router.handlers(('match', 'BTC-USD'))
+    # NOTE: A resolved key is served from the table by identity
+    handlers = router.handlers(('match', 'BTC-USD'))
+    assert handlers is router.handlers(('match', 'BTC-USD'))
+    assert 1 == router.stats['keys']
+    # NOTE: Registering a handler invalidates the table
+    router.add(str, None, 'BTC-USD')
+    assert 0 == router.stats['keys']
+    assert (print, repr, str) == router.handlers(('match', 'BTC-USD'))
+    router.remove(repr, 'match')
+    assert (print, str) == router.handlers(('match', 'BTC-USD'))
+    assert 2 == router.stats['routes']
+
+
+def test_unknown_channel():
+    router = Router()
+    seen = []
+    router.add(seen.append, 'match', 'BTC-USD')
+    assert 0 == router.dispatch({'type': 'l2update', 'product_id': 'BTC-USD'})
+    assert 0 == router.dispatch({'type': 'unknown'})
+    assert 0 == router.dispatch([1, 2, 3])
+    assert [] == seen
+    assert {'routes': 1, 'keys': 3, 'dispatched': 0, 'unrouted': 3} == (
+        router.stats)
+
+
+def test_typed_records():
+    router = Router(typed=True)
+    seen = []
+    router.add(seen.append, 'match')
+    router.dispatch(__match__)
+    assert isinstance(seen[0], Match)
+
+
+def test_kraken_channel_ids():
+    router = KrakenRouter()
+    seen = []
+    router.add(seen.append, 'book', 'XBT/USD')
+    assert ('heartbeat', None) == router.key({'event': 'heartbeat'})
+    # NOTE: Before its subscriptionStatus a message is keyed by its name
+    message = [42, {'a': []}, 'book-10', 'XBT/USD']
+    assert ('book', 'XBT/USD') == router.key(message)
+    router.dispatch({
+        'event': 'subscriptionStatus',
+        'status': 'subscribed',
+        'channelID': 7,
+        'pair': 'XBT/USD',
+        'subscription': {'name': 'book'}
+    })
+    assert {7: ('book', 'XBT/USD')} == router.channels
+    assert 1 == router.dispatch([7, {'a': []}, 'book-10', 'XBT/USD'])
+    assert ('ownTrades', None) == router.key([[{}], 'ownTrades', {}])
+    router.status({'event': 'subscriptionStatus', 'status': 'unsubscribed',
+                   'channelID': 7})
+    assert {} == router.channels
+    # NOTE: A channel the router has never seen is unrouted, not an error
+    assert 0 == router.dispatch([9, [], 'spread', 'ETH/USD'])
+    assert 1 == len(seen)
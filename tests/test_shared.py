@@ -0,0 +1,85 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.shared import Publisher
+from w3rw.cex.shared import Reader
+
+from multiprocessing import shared_memory
+
+import os
+import pytest
+
+
+@pytest.fixture
+def publisher() -> Publisher:
+    with Publisher(f'w3rw-test-{os.getpid()}', 2, 4) as publisher:
+        yield publisher
+
+
+def test_book(publisher: Publisher):
+    with Reader(publisher.name) as reader:
+        publisher.publish({
+            'bids': [(99.0, 1.0), (98.0, 2.0), (97.0, 3.0)],
+            'asks': [(101.0, 1.0)]
+        }, 1.5)
+        snapshot = reader.book()
+        assert publisher.sequence == snapshot.sequence
+        assert 1.5 == snapshot.time
+        assert [(99.0, 1.0), (98.0, 2.0)] == snapshot.bids
+        assert [(101.0, 1.0)] == snapshot.asks
+        assert ((99.0, 1.0), (101.0, 1.0)) == reader.top()
+
+
+def test_trades(publisher: Publisher):
+    with Reader(publisher.name) as reader:
+        for moment in range(3):
+            publisher.trade(moment, 100.0, 1.0, 'buy')
+        count, ticks = reader.trades()
+        assert 3 == count
+        assert [0.0, 1.0, 2.0] == [tick.time for tick in ticks]
+        assert {'buy'} == {tick.side for tick in ticks}
+        publisher.trade(3, 100.0, 1.0, 'sell')
+        count, ticks = reader.trades(count)
+        assert 4 == count
+        assert [(3.0, 'sell')] == [(tick.time, tick.side) for tick in ticks]
+        assert 0 == reader.missed
+
+
+def test_wraparound(publisher: Publisher):
+    # NOTE: The oldest slot is the one the publisher writes next, so only
+    # capacity - 1 ticks can ever be read back
+    with Reader(publisher.name) as reader:
+        for moment in range(10):
+            publisher.trade(moment, 100.0, 1.0, 'buy')
+        count, ticks = reader.trades(0)
+        assert 10 == count
+        assert [7.0, 8.0, 9.0] == [tick.time for tick in ticks]
+        assert 7 == reader.missed
+        for moment in range(10, 14):
+            publisher.trade(moment, 100.0, 1.0, 'buy')
+        count, ticks = reader.trades(count)
+        assert [11.0, 12.0, 13.0] == [tick.time for tick in ticks]
+        assert 8 == reader.missed
+
+
+def test_not_a_board():
+    memory = shared_memory.SharedMemory(
+        f'w3rw-test-{os.getpid()}-other', create=True, size=64)
+    try:
+        with pytest.raises(ValueError):
+            Reader(memory.name)
+    finally:
+        memory.close()
+        memory.unlink()
@@ -0,0 +1,49 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from benchmarks.server import __product__
+from benchmarks.server import Exchange
+
+from w3rw.cex.coinbase_pro.client import get_client
+from w3rw.cex.coinbase_pro.store import Store
+
+import pytest
+
+__trades__: str = f'/products/{__product__}/trades'
+
+
+@pytest.fixture
+def store(exchange: Exchange) -> Store:
+    client = get_client()
+    client.product.messenger.api.url = exchange.url
+    return Store(':memory:', client.product)
+
+
+def test_first_sync_fetches_one_page(exchange: Exchange, store: Store):
+    assert exchange.limit == store.sync_trades(__product__)
+    assert 1 == exchange.hits[__trades__]
+
+
+def test_sync_only_catches_up_forward(exchange: Exchange, store: Store):
+    store.sync_trades(__product__)
+    assert 0 == store.sync_trades(__product__)
+    assert 2 == exchange.hits[__trades__]
+
+
+def test_pages_extend_the_history(exchange: Exchange, store: Store):
+    store.sync_trades(__product__)
+    assert 2 * exchange.limit == store.sync_trades(__product__, pages=2)
+    trades = store.trades(__product__, 0, float('inf'))
+    assert 3 * exchange.limit == len(trades)
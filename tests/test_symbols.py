@@ -0,0 +1,137 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.registry import Quote
+from w3rw.cex.registry import Registry
+
+from w3rw.cex.symbols import Symbols
+from w3rw.cex.symbols import get_asset
+from w3rw.cex.symbols import parse_symbol
+
+import threading
+
+
+class Venue(object):
+    # NOTE: A client for the Registry. Every call waits on a barrier shared
+    # by all of the venues, so a query only returns if they run at once.
+    def __init__(self, label, markets, bid, ask, balances, barrier=None):
+        self.label = label
+        self.barrier = barrier
+        self.natives = []
+        self.__markets = markets
+        self.__bid = bid
+        self.__ask = ask
+        self.__balances = balances
+
+    def wait(self):
+        if self.barrier is not None:
+            self.barrier.wait()
+
+    def markets(self):
+        self.wait()
+        return self.__markets
+
+    def quote(self, native):
+        self.wait()
+        self.natives.append(native)
+        return Quote(self.label, native, self.__bid, self.__ask, None, None)
+
+    def balances(self):
+        self.wait()
+        return self.__balances
+
+
+def test_parse_symbol():
+    assert 'BTC-USD' == parse_symbol('XXBTZUSD')
+    assert 'BTC-USD' == parse_symbol('XBTUSD')
+    assert 'BTC-USD' == parse_symbol('XBT/USD')
+    assert 'BTC-USD' == parse_symbol('btc-usd')
+    assert 'ETH-EUR' == parse_symbol('XETHZEUR')
+    assert parse_symbol('BTCUSDT2') is None
+    assert 'BTC' == get_asset('XXBT')
+    assert 'BTC' == get_asset('xbt')
+    assert 'BTC' == get_asset('BTC')
+
+
+def test_symbols():
+    symbols = Symbols()
+    assert 0 == len(symbols)
+    assert 1 == symbols.load('kraken', {'XXBTZUSD': ('XXBT', 'ZUSD')})
+    assert 'BTC-USD' == symbols.symbol('kraken', 'XXBTZUSD')
+    assert 'XXBTZUSD' == symbols.native('kraken', 'BTC-USD')
+    # NOTE: Other names of a market parse to the same symbol, but the
+    # loaded name is still the one sent back to the exchange
+    assert 'BTC-USD' == symbols.symbol('kraken', 'XBT/USD')
+    assert 'XXBTZUSD' == symbols.native('kraken', 'BTC-USD')
+    assert 1 == len(symbols)
+
+
+def test_guessed_natives():
+    symbols = Symbols()
+    assert 'XBTEUR' == symbols.native('kraken', 'BTC-EUR')
+    assert 'BTC-EUR' == symbols.native('coinbase_pro', 'BTC-EUR')
+    assert 'BTC-EUR' == symbols.symbol('kraken', 'XBTEUR')
+    # NOTE: Loading the market later replaces the guess
+    symbols.load('kraken', {'XXBTZEUR': ('XXBT', 'ZEUR')})
+    assert 'XXBTZEUR' == symbols.native('kraken', 'BTC-EUR')
+
+
+def test_empty_symbols_are_kept():
+    # NOTE: An empty Symbols is falsy, and must not be replaced by a new one
+    symbols = Symbols()
+    registry = Registry(symbols=symbols)
+    assert registry.symbols is symbols
+    assert isinstance(Registry().symbols, Symbols)
+
+
+def test_registry_fan_out():
+    barrier = threading.Barrier(2, timeout=5)
+    kraken = Venue(
+        'kraken', {'XXBTZUSD': ('XXBT', 'ZUSD')}, 48000.0, 48010.0,
+        {'XXBT': 1.0, 'XBT.M': 0.5, 'ZUSD': 100.0}, barrier)
+    coinbase_pro = Venue(
+        'coinbase_pro', {'BTC-USD': ('BTC', 'USD')}, 48005.0, 48020.0,
+        {'BTC': 2.0, 'USD': 50.0}, barrier)
+    registry = Registry([kraken, coinbase_pro])
+    assert 2 == registry.load()
+    quotes = registry.quotes('BTC-USD')
+    assert ['XXBTZUSD'] == kraken.natives
+    assert ['BTC-USD'] == coinbase_pro.natives
+    assert {'kraken', 'coinbase_pro'} == set(quotes)
+    assert all('BTC-USD' == quote.symbol for quote in quotes.values())
+    best = registry.best('BTC-USD')
+    assert 'coinbase_pro' == best['bid'].exchange
+    assert 'kraken' == best['ask'].exchange
+    balances = registry.balances()
+    assert {'BTC': 1.0, 'XBT.M': 0.5, 'USD': 100.0} == balances['kraken']
+    assert {'BTC': 2.0, 'USD': 50.0} == balances['coinbase_pro']
+    assert [] == registry.failed
+
+
+def test_registry_failures():
+    def fail():
+        raise ValueError('down')
+
+    kraken = Venue('kraken', {}, 1.0, 2.0, {})
+    broken = Venue('coinbase_pro', {}, 1.0, 2.0, {})
+    broken.balances = fail
+    registry = Registry([kraken, broken])
+    assert {'kraken'} == set(registry.balances())
+    assert 1 == len(registry.failed)
+    assert isinstance(registry.failed[0].error, ValueError)
+    # NOTE: Only the clients with the method take part in a query
+    assert {} == registry.books('BTC-USD')
+    quotes = registry.quotes('BTC-USD', ['coinbase_pro'])
+    assert {'coinbase_pro'} == set(quotes)
@@ -73,6 +73,12 @@ class AbstractMessenger(abc.ABC):
     def timeout(self) -> int:
         pass
 
+    @property
+    def limiter(self) -> object:
+        # NOTE: A messenger without a limiter is never throttled, so
+        # subclasses written before the limiter existed still work
+        return None
+
     @abc.abstractmethod
     def get(self, endpoint: str, data: dict = None) -> Response:
         pass
@@ -0,0 +1,39 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import numpy
+import typing
+
+
+def get_array(rows: typing.Sequence[typing.Sequence],
+              dtype: numpy.dtype,
+              fields: typing.Sequence[str] = None) -> numpy.ndarray:
+
+    # NOTE: The rows are transposed once and every column is parsed in
+    # bulk by NumPy straight into the type of its field, so no value is
+    # converted in Python. The leading columns of the rows fill `fields`
+    # in order, which defaults to every field of the dtype.
+    array = numpy.zeros(len(rows), dtype=dtype)
+    for name, column in zip(fields or dtype.names, zip(*rows)):
+        array[name] = numpy.array(column, dtype=dtype[name])
+    return array
+
+
+def get_epoch(values: numpy.ndarray) -> numpy.ndarray:
+    # NOTE: Parses ISO 8601 UTC strings into decimal seconds since the
+    # Unix Epoch. NumPy rejects the zone suffix, so it is removed first.
+    values = numpy.char.rstrip(numpy.asarray(values, dtype=str), 'Z')
+    stamps = values.astype('datetime64[us]').astype('i8')
+    return stamps / 1e6
@@ -0,0 +1,85 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import bisect
+import typing
+
+
+class Ladder(object):
+    # NOTE: Price levels are kept in a sorted list with a dict beside it.
+    # Lookups are O(1), finding a level is O(log n), and inserts only pay
+    # a memmove inside the list, which stays cheap for deep books.
+    def __init__(self, descending: bool = False):
+        self.__descending: bool = descending
+        self.__prices: typing.List[float] = []
+        self.__levels: typing.Dict[float, object] = {}
+
+    def __len__(self) -> int:
+        return len(self.__prices)
+
+    def __contains__(self, price: float) -> bool:
+        return price in self.__levels
+
+    def __iter__(self) -> typing.Iterator[typing.Tuple[float, object]]:
+        prices = self.__prices
+        ordered = reversed(prices) if self.__descending else iter(prices)
+        return ((price, self.__levels[price]) for price in ordered)
+
+    @property
+    def descending(self) -> bool:
+        return self.__descending
+
+    def get(self, price: float, default: object = None) -> object:
+        return self.__levels.get(price, default)
+
+    def set(self, price: float, value: object) -> None:
+        if price not in self.__levels:
+            bisect.insort(self.__prices, price)
+        self.__levels[price] = value
+
+    def remove(self, price: float) -> None:
+        if price in self.__levels:
+            del self.__levels[price]
+            del self.__prices[bisect.bisect_left(self.__prices, price)]
+
+    def clear(self) -> None:
+        self.__prices.clear()
+        self.__levels.clear()
+
+    def best(self) -> typing.Optional[typing.Tuple[float, object]]:
+        if not self.__prices:
+            return None
+        price = self.__prices[-1] if self.__descending else self.__prices[0]
+        return price, self.__levels[price]
+
+    def top(self, n: int) -> typing.List[typing.Tuple[float, object]]:
+        if self.__descending:
+            prices = self.__prices[:-n - 1:-1] if n > 0 else []
+        else:
+            prices = self.__prices[:n]
+        return [(price, self.__levels[price]) for price in prices]
+
+    def truncate(self, n: int) -> None:
+        # NOTE: Drops every level beyond the best `n`
+        if len(self.__prices) <= n:
+            return
+        if self.__descending:
+            dropped = self.__prices[:len(self.__prices) - n]
+            del self.__prices[:len(self.__prices) - n]
+        else:
+            dropped = self.__prices[n:]
+            del self.__prices[n:]
+        for price in dropped:
+            del self.__levels[price]
@@ -0,0 +1,111 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw import Response
+
+import collections
+import re
+import threading
+import time
+import typing
+
+Key = typing.Tuple[str, tuple]
+
+
+class Cache(object):
+    # NOTE: Only endpoints matching one of the rules are cached, each with
+    # its own time to live in seconds. Messengers only consult the cache
+    # for GET requests to public endpoints, so private and mutating
+    # requests never reach it.
+    def __init__(self, rules: typing.Dict[str, float], size: int = 256):
+        self.__rules: list = [
+            (re.compile(pattern), ttl) for pattern, ttl in rules.items()
+        ]
+        self.__size: int = size
+        self.__entries: collections.OrderedDict = collections.OrderedDict()
+        self.__lock: threading.Lock = threading.Lock()
+        self.__hits: int = 0
+        self.__misses: int = 0
+        self.__revalidations: int = 0
+        self.__evictions: int = 0
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @property
+    def stats(self) -> typing.Dict[str, int]:
+        with self.__lock:
+            return {
+                'hits': self.__hits,
+                'misses': self.__misses,
+                'revalidations': self.__revalidations,
+                'evictions': self.__evictions,
+                'entries': len(self.__entries)
+            }
+
+    def ttl(self, endpoint: str) -> typing.Optional[float]:
+        for pattern, ttl in self.__rules:
+            if pattern.fullmatch(endpoint):
+                return ttl
+        return None
+
+    def key(self, endpoint: str, data: dict = None) -> Key:
+        # NOTE: Kraken adds a nonce to every request, which is not part of
+        # the resource being requested
+        params = tuple(sorted(
+            (k, str(v)) for k, v in (data or {}).items() if 'nonce' != k
+        ))
+        return endpoint, params
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+
+    def fetch(self,
+              endpoint: str,
+              data: dict,
+              send: typing.Callable[[dict], Response]) -> Response:
+
+        ttl = self.ttl(endpoint)
+        if ttl is None:
+            return send(None)
+        key = self.key(endpoint, data)
+        now = time.monotonic()
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.__entries.move_to_end(key)
+                self.__hits += 1
+                return entry[1]
+            self.__misses += 1
+        headers = None
+        etag = None if entry is None else entry[1].headers.get('ETag')
+        if etag:
+            headers = {'If-None-Match': etag}
+        response = send(headers)
+        if 304 == response.status_code and entry is not None:
+            with self.__lock:
+                self.__revalidations += 1
+            response = entry[1]
+        elif 200 != response.status_code:
+            return response
+        with self.__lock:
+            self.__entries[key] = (time.monotonic() + ttl, response)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__size:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+        return response
@@ -0,0 +1,211 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import array
+import math
+import typing
+
+# NOTE: Granularities are in seconds, i.e. 1s, 1m, 5m, and 1h bars
+__granularities__: typing.Tuple[int, ...] = (1, 60, 300, 3600)
+__size__: int = 1440
+
+
+class Bar(typing.NamedTuple):
+    time: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    trades: int
+
+
+class Series(object):
+    # NOTE: Bars live in fixed size ring arrays, one per field, indexed by
+    # (time // granularity) % size. A slot holds the start time of its bar,
+    # so a stale slot from an earlier lap is told apart without clearing
+    # it. The time of the earliest and latest trade in each bar is kept
+    # beside it, so trades that arrive out of order still leave the right
+    # open and close.
+    def __init__(self, granularity: int, size: int = __size__):
+        self.__granularity: int = granularity
+        self.__size: int = max(1, size)
+        self.__times: array.array = array.array('q', [-1]) * self.__size
+        self.__open: array.array = array.array('d', [0.0]) * self.__size
+        self.__high: array.array = array.array('d', [0.0]) * self.__size
+        self.__low: array.array = array.array('d', [0.0]) * self.__size
+        self.__close: array.array = array.array('d', [0.0]) * self.__size
+        self.__volume: array.array = array.array('d', [0.0]) * self.__size
+        self.__trades: array.array = array.array('q', [0]) * self.__size
+        self.__first: array.array = array.array('d', [0.0]) * self.__size
+        self.__last: array.array = array.array('d', [0.0]) * self.__size
+        self.__latest: int = -1
+        self.__late: int = 0
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.__slots())
+
+    @property
+    def granularity(self) -> int:
+        return self.__granularity
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @property
+    def latest(self) -> int:
+        return self.__latest
+
+    @property
+    def late(self) -> int:
+        return self.__late
+
+    def update(self, moment: float, price: float, size: float) -> bool:
+        # NOTE: Returns False for a trade that is older than the window
+        start = int(moment // self.__granularity) * self.__granularity
+        if start > self.__latest:
+            self.__latest = start
+        elif start <= self.__latest - self.__size * self.__granularity:
+            self.__late += 1
+            return False
+        slot = (start // self.__granularity) % self.__size
+        if self.__times[slot] != start:
+            self.__times[slot] = start
+            self.__open[slot] = self.__high[slot] = price
+            self.__low[slot] = self.__close[slot] = price
+            self.__volume[slot] = size
+            self.__trades[slot] = 1
+            self.__first[slot] = self.__last[slot] = moment
+            return True
+        if price > self.__high[slot]:
+            self.__high[slot] = price
+        if price < self.__low[slot]:
+            self.__low[slot] = price
+        if moment < self.__first[slot]:
+            self.__first[slot] = moment
+            self.__open[slot] = price
+        if moment >= self.__last[slot]:
+            self.__last[slot] = moment
+            self.__close[slot] = price
+        self.__volume[slot] += size
+        self.__trades[slot] += 1
+        return True
+
+    def seed(self,
+             start: int,
+             open: float,
+             high: float,
+             low: float,
+             close: float,
+             volume: float,
+             trades: int = 0) -> bool:
+
+        # NOTE: A seeded bar spans its whole period, so any trade streamed
+        # into it afterwards moves its close but never its open
+        start = int(start // self.__granularity) * self.__granularity
+        if start <= self.__latest - self.__size * self.__granularity:
+            return False
+        if start > self.__latest:
+            self.__latest = start
+        slot = (start // self.__granularity) % self.__size
+        self.__times[slot] = start
+        self.__open[slot] = open
+        self.__high[slot] = high
+        self.__low[slot] = low
+        self.__close[slot] = close
+        self.__volume[slot] = volume
+        self.__trades[slot] = trades
+        self.__first[slot] = -math.inf
+        self.__last[slot] = start
+        return True
+
+    def get(self, start: int) -> typing.Optional[Bar]:
+        start = int(start // self.__granularity) * self.__granularity
+        slot = (start // self.__granularity) % self.__size
+        if self.__times[slot] != start or self.__expired(start):
+            return None
+        return self.__bar(slot)
+
+    def last(self) -> typing.Optional[Bar]:
+        return None if self.__latest < 0 else self.get(self.__latest)
+
+    def bars(self, count: int = None) -> typing.List[Bar]:
+        # NOTE: Returns the most recent bars, oldest first. Periods without
+        # a single trade have no bar, as with the REST candles.
+        bars = [self.__bar(slot) for slot in self.__slots()]
+        if count is None:
+            return bars
+        return bars[-count:] if count > 0 else []
+
+    def __expired(self, start: int) -> bool:
+        return start <= self.__latest - self.__size * self.__granularity
+
+    def __slots(self) -> typing.Iterator[int]:
+        if self.__latest < 0:
+            return
+        first = self.__latest - (self.__size - 1) * self.__granularity
+        for start in range(first, self.__latest + 1, self.__granularity):
+            slot = (start // self.__granularity) % self.__size
+            if self.__times[slot] == start:
+                yield slot
+
+    def __bar(self, slot: int) -> Bar:
+        return Bar(
+            self.__times[slot],
+            self.__open[slot],
+            self.__high[slot],
+            self.__low[slot],
+            self.__close[slot],
+            self.__volume[slot],
+            self.__trades[slot])
+
+
+class Aggregator(object):
+    # NOTE: Keeps one Series per granularity and feeds every trade to each
+    # of them, so all of the granularities are always up to date
+    def __init__(self,
+                 granularities: typing.Iterable[int] = __granularities__,
+                 size: int = __size__):
+
+        self.__series: typing.Dict[int, Series] = {
+            granularity: Series(granularity, size)
+            for granularity in sorted(set(granularities))
+        }
+
+    def __getitem__(self, granularity: int) -> Series:
+        return self.__series[granularity]
+
+    def __contains__(self, granularity: int) -> bool:
+        return granularity in self.__series
+
+    @property
+    def granularities(self) -> typing.List[int]:
+        return list(self.__series)
+
+    @property
+    def late(self) -> int:
+        return sum(series.late for series in self.__series.values())
+
+    def update(self, moment: float, price: float, size: float) -> bool:
+        updated = False
+        for series in self.__series.values():
+            updated = series.update(moment, price, size) or updated
+        return updated
+
+    def bars(self,
+             granularity: int,
+             count: int = None) -> typing.List[Bar]:
+        return self.__series[granularity].bars(count)
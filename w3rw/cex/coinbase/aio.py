@@ -0,0 +1,174 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw import __offset__
+
+from w3rw.cex.abstract import AbstractAPI
+from w3rw.cex.abstract import AbstractAuth
+from w3rw.cex.abstract import AbstractMessenger
+
+from w3rw.cex.coinbase.messenger import API
+from w3rw.cex.coinbase.messenger import get_limiter
+from w3rw.cex.coinbase.messenger import get_scope
+
+from w3rw.cex.decoder import Decoder
+
+from w3rw.cex.limiter import Limiter
+
+from w3rw.cex.page import Page
+
+import asyncio
+import httpx
+import requests
+import typing
+
+
+class AsyncMessenger(AbstractMessenger):
+    def __init__(self,
+                 auth: AbstractAuth,
+                 limiter: Limiter = None,
+                 decoder: Decoder = None,
+                 connections: int = 100):
+
+        self.__auth: AbstractAuth = auth
+        self.__api: AbstractAPI = API()
+        self.__timeout: int = 30
+        self.__limiter: Limiter = limiter if limiter else get_limiter()
+        self.__decoder: Decoder = decoder if decoder else Decoder()
+        self.__session: httpx.AsyncClient = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=connections,
+                max_keepalive_connections=connections
+            ),
+            timeout=self.__timeout
+        )
+
+    @property
+    def auth(self) -> AbstractAuth:
+        return self.__auth
+
+    @property
+    def api(self) -> AbstractAPI:
+        return self.__api
+
+    @property
+    def timeout(self) -> int:
+        return self.__timeout
+
+    @property
+    def session(self) -> httpx.AsyncClient:
+        return self.__session
+
+    @property
+    def limiter(self) -> Limiter:
+        return self.__limiter
+
+    @property
+    def decoder(self) -> Decoder:
+        return self.__decoder
+
+    async def throttle(self, method: str, endpoint: str) -> float:
+        scope = get_scope(method, self.api.endpoint(endpoint))
+        delay = self.limiter.reserve(scope)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    async def request(self,
+                      method: str,
+                      endpoint: str,
+                      data: dict = None) -> httpx.Response:
+
+        await self.throttle(method, endpoint)
+        # NOTE: Auth signs a requests.PreparedRequest, so the request is
+        # prepared by requests and then sent as is through httpx.
+        request = requests.Request(
+            method,
+            self.api.path(endpoint),
+            params=data if 'GET' == method else None,
+            json=None if 'GET' == method else data
+        ).prepare()
+        if self.auth:
+            request = self.auth(request)
+        return await self.session.request(
+            method,
+            request.url,
+            headers=dict(request.headers),
+            content=request.body
+        )
+
+    async def get(self, endpoint: str, data: dict = None) -> httpx.Response:
+        return await self.request('GET', endpoint, data)
+
+    async def post(self, endpoint: str, data: dict = None) -> httpx.Response:
+        return await self.request('POST', endpoint, data)
+
+    async def page(self, endpoint: str, data: dict = None) -> list:
+        responses = []
+        if not data:
+            data = {'limit': __offset__}
+        while True:
+            response = await self.get(endpoint, data)
+            if 200 != response.status_code:
+                return [response]
+            if not response.json():
+                break
+            responses.append(response)
+            page = response.json()['pagination']
+            if not page['next_uri']:
+                break
+            data['starting_after'] = page['next_starting_after']
+        return responses
+
+    async def iter_pages(self,
+                         endpoint: str,
+                         data: dict = None,
+                         cursor: str = None) -> typing.AsyncIterator[Page]:
+
+        data = dict(data) if data else {'limit': __offset__}
+        if cursor:
+            data['starting_after'] = cursor
+        while True:
+            response = await self.get(endpoint, data)
+            if 200 != response.status_code:
+                raise httpx.HTTPStatusError(
+                    response.text, request=response.request, response=response)
+            payload = self.decoder.decode(response.content)
+            if not payload.get('data'):
+                break
+            page = payload['pagination']
+            cursor = page['next_starting_after'] if page['next_uri'] else None
+            yield Page(payload['data'], cursor)
+            if not cursor:
+                break
+            data['starting_after'] = cursor
+
+    async def iter_items(self,
+                         endpoint: str,
+                         data: dict = None,
+                         cursor: str = None) -> typing.AsyncIterator[dict]:
+
+        async for page in self.iter_pages(endpoint, data, cursor):
+            for item in page.items:
+                yield item
+
+    async def close(self) -> None:
+        await self.session.aclose()
+
+    async def __aenter__(self) -> 'AsyncMessenger':
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
@@ -0,0 +1,114 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw import Dict
+
+from w3rw.cex.abstract import AbstractClient
+
+from w3rw.cex.coinbase.messenger import Auth
+from w3rw.cex.coinbase.messenger import Messenger
+from w3rw.cex.coinbase.messenger import Subscriber
+
+from w3rw.cex.page import Page
+
+from w3rw.cex.pool import fan_out
+
+from w3rw.cex.registry import Quote
+
+import typing
+
+
+class Account(Subscriber):
+    def list(self, data: dict = None) -> Dict:
+        return self.decode(self.messenger.get('/accounts', data))
+
+    def get(self, account_id: str) -> Dict:
+        return self.decode(self.messenger.get(f'/accounts/{account_id}'))
+
+    def iter_accounts(self,
+                      data: dict = None,
+                      cursor: str = None) -> typing.Iterator[Page]:
+        return self.messenger.iter_pages('/accounts', data, cursor)
+
+
+class Price(Subscriber):
+    # NOTE: The buy price is what it costs to buy, i.e. the ask, and the
+    # sell price is what selling pays, i.e. the bid
+    def buy(self, pair: str) -> Dict:
+        return self.decode(self.messenger.get(f'/prices/{pair}/buy'))
+
+    def sell(self, pair: str) -> Dict:
+        return self.decode(self.messenger.get(f'/prices/{pair}/sell'))
+
+    def spot(self, pair: str, data: dict = None) -> Dict:
+        return self.decode(self.messenger.get(f'/prices/{pair}/spot', data))
+
+
+class Time(Subscriber):
+    def get(self) -> Dict:
+        return self.decode(self.messenger.get('/time'))
+
+
+def get_amount(payload: Dict) -> float:
+    if not isinstance(payload, dict) or 'data' not in payload:
+        raise ValueError(payload)
+    return float(payload['data']['amount'])
+
+
+class Client(AbstractClient):
+    def __init__(self, messenger: Messenger):
+        self.__messenger = messenger
+
+        self.account = Account(messenger)
+        self.price = Price(messenger)
+        self.time = Time(messenger)
+
+    @property
+    def label(self):
+        return 'coinbase'
+
+    @property
+    def messenger(self):
+        return self.__messenger
+
+    def quote(self, pair: str) -> Quote:
+        # NOTE: The bid and ask are separate requests, so both are sent
+        # at once
+        bid, ask = fan_out(lambda f: get_amount(f(pair)), (
+            self.price.sell, self.price.buy))
+        for result in (bid, ask):
+            if not result.ok:
+                raise result.error
+        return Quote(
+            self.label, pair, bid.value, ask.value,
+            (bid.value + ask.value) / 2, None)
+
+    def balances(self) -> typing.Dict[str, float]:
+        balances = {}
+        for page in self.account.iter_accounts():
+            for account in page.items:
+                balance = account['balance']
+                currency = balance['currency']
+                balances[currency] = balances.get(currency, 0.0) + float(
+                    balance['amount'])
+        return balances
+
+
+def get_messenger(key: str = None, secret: str = None) -> Messenger:
+    return Messenger(Auth(key, secret))
+
+
+def get_client(key: str = None, secret: str = None) -> Client:
+    return Client(Messenger(Auth(key, secret)))
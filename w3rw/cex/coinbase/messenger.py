@@ -16,8 +16,8 @@
 from w3rw import __agent__
 from w3rw import __source__
 from w3rw import __version__
-from w3rw import __timeout__
 from w3rw import __offset__
+from w3rw import Dict
 from w3rw import Response
 
 from w3rw.cex.abstract import AbstractAPI
@@ -25,6 +25,26 @@ from w3rw.cex.abstract import AbstractAuth
 from w3rw.cex.abstract import AbstractMessenger
 from w3rw.cex.abstract import AbstractSubscriber
 
+from w3rw.cex.cache import Cache
+
+from w3rw.cex.decoder import Decoder
+
+from w3rw.cex.limiter import Bucket
+from w3rw.cex.limiter import Limiter
+
+from w3rw.cex.metrics import Metrics
+
+from w3rw.cex.page import Page
+
+from w3rw.cex.retry import Retry
+
+from w3rw.cex.session import __timeout__
+from w3rw.cex.session import Timeout
+from w3rw.cex.session import get_connections
+from w3rw.cex.session import get_session
+
+from requests import HTTPError
+from requests import Request
 from requests import Session
 from requests.auth import AuthBase
 from requests.models import PreparedRequest
@@ -33,6 +53,8 @@ import dataclasses
 import hmac
 import hashlib
 import time
+import typing
+import urllib
 
 
 @dataclasses.dataclass
@@ -62,9 +84,18 @@ class API(AbstractAPI):
 
 
 class Auth(AbstractAuth, AuthBase):
+    # NOTE: The keyed HMAC and the constant headers are built once. The
+    # HMAC is only ever copied, so signing is safe across threads.
     def __init__(self, key: str = None, secret: str = None):
-        self.__key = key
-        self.__secret = secret
+        self.__key = key if key else ''
+        self.__secret = secret if secret else ''
+        self.__hmac = hmac.new(
+            self.__secret.encode('ascii'), digestmod=hashlib.sha256)
+        self.__headers = {
+            'User-Agent': f'{__agent__}/{__version__} {__source__}',
+            'CB-ACCESS-KEY': self.__key,
+            'Content-Type': 'application/json'
+        }
 
     def __call__(self, request: PreparedRequest) -> PreparedRequest:
         timestamp = str(int(time.time()))
@@ -75,26 +106,71 @@ class Auth(AbstractAuth, AuthBase):
         return request
 
     def signature(self, message: str) -> str:
-        key = self.__secret.encode('ascii')
-        msg = message.encode('ascii')
-        return hmac.new(key, msg, hashlib.sha256).hexdigest()
+        sig = self.__hmac.copy()
+        sig.update(message.encode('ascii'))
+        return sig.hexdigest()
 
     def headers(self, timestamp: str, message: str) -> dict:
         return {
-            'User-Agent': f'{__agent__}/{__version__} {__source__}',
-            'CB-ACCESS-KEY': self.__key,
+            **self.__headers,
             'CB-ACCESS-SIGN': self.signature(message),
-            'CB-ACCESS-TIMESTAMP': timestamp,
-            'Content-Type': 'application/json'
+            'CB-ACCESS-TIMESTAMP': timestamp
         }
 
 
+def get_scope(method: str, endpoint: str) -> str:
+    # NOTE: https://developers.coinbase.com/api/v2#rate-limiting
+    public = ('/v2/currencies', '/v2/exchange-rates', '/v2/prices', '/v2/time')
+    if endpoint.startswith(public):
+        return 'public'
+    if '/buys' in endpoint or '/sells' in endpoint:
+        return 'order' if 'POST' == method else 'private'
+    return 'private'
+
+
+def get_limiter() -> Limiter:
+    # NOTE: Coinbase allows 10,000 requests per hour for each API key and
+    # the same again for each IP address. Orders share the key's budget.
+    private = Bucket(10000 / 3600, 25)
+    return Limiter({
+        'public': Bucket(10000 / 3600, 25),
+        'private': private,
+        'order': private
+    })
+
+
+def get_cache() -> Cache:
+    # NOTE: Reference data rarely changes, so it is cached per endpoint
+    return Cache({
+        r'/v2/currencies': 3600,
+        r'/v2/time': 1
+    })
+
+
+def get_retry() -> Retry:
+    return Retry()
+
+
 class Messenger(AbstractMessenger):
-    def __init__(self, auth: AbstractAuth):
+    def __init__(self,
+                 auth: AbstractAuth,
+                 limiter: Limiter = None,
+                 decoder: Decoder = None,
+                 cache: Cache = None,
+                 retry: Retry = None,
+                 session: Session = None,
+                 timeout: Timeout = None,
+                 metrics: Metrics = None):
+
         self.__auth: AbstractAuth = auth
         self.__api: AbstractAPI = API()
-        self.__session: Session = Session()
-        self.__timeout: int = 30
+        self.__session: Session = session if session else get_session()
+        self.__limiter: Limiter = limiter if limiter else get_limiter()
+        self.__decoder: Decoder = decoder if decoder else Decoder()
+        self.__cache: Cache = cache if cache else get_cache()
+        self.__retry: Retry = retry if retry else get_retry()
+        self.__timeout: Timeout = timeout if timeout else __timeout__
+        self.__metrics: Metrics = metrics
 
     @property
     def auth(self) -> AbstractAuth:
@@ -105,30 +181,102 @@ class Messenger(AbstractMessenger):
         return self.__api
 
     @property
-    def timeout(self) -> int:
+    def timeout(self) -> Timeout:
         return self.__timeout
 
     @property
     def session(self) -> Session:
         return self.__session
 
+    @property
+    def limiter(self) -> Limiter:
+        return self.__limiter
+
+    @property
+    def decoder(self) -> Decoder:
+        return self.__decoder
+
+    @property
+    def cache(self) -> Cache:
+        return self.__cache
+
+    @property
+    def retry(self) -> Retry:
+        return self.__retry
+
+    @property
+    def metrics(self) -> Metrics:
+        return self.__metrics
+
+    def throttle(self, method: str, endpoint: str) -> float:
+        scope = get_scope(method, self.api.endpoint(endpoint))
+        return self.limiter.acquire(scope)
+
     def get(self, endpoint: str, data: dict = None) -> Response:
-        time.sleep(__timeout__)
-        return self.session.get(
+        endpoint = self.api.endpoint(endpoint)
+        if 'public' == get_scope('GET', endpoint):
+            return self.cache.fetch(
+                endpoint, data, lambda headers: self.__get(
+                    endpoint, data, headers))
+        return self.__get(endpoint, data)
+
+    def __get(self,
+              endpoint: str,
+              data: dict = None,
+              headers: dict = None) -> Response:
+
+        return self.retry.call(
+            'GET', endpoint, lambda: self.__send(
+                'GET', endpoint, params=data, headers=headers))
+
+    def __send(self, method: str, endpoint: str, **kwargs) -> Response:
+        if self.metrics is not None:
+            return self.__measure(method, endpoint, **kwargs)
+        self.throttle(method, endpoint)
+        return self.session.request(
+            method,
             self.api.path(endpoint),
-            params=data,
             auth=self.auth,
-            timeout=self.timeout
+            timeout=self.timeout,
+            **kwargs
         )
 
+    def __measure(self, method: str, endpoint: str, **kwargs) -> Response:
+        # NOTE: The same request as __send, prepared and signed in separate
+        # steps so that each phase can be timed
+        self.metrics.before(
+            method, endpoint, kwargs.get('params', kwargs.get('json')))
+        response = None
+        start = time.perf_counter()
+        self.throttle(method, endpoint)
+        waited = signed = time.perf_counter()
+        try:
+            request = self.session.prepare_request(Request(
+                method, self.api.path(endpoint), **kwargs))
+            if self.auth:
+                request = self.auth(request)
+            signed = time.perf_counter()
+            settings = self.session.merge_environment_settings(
+                request.url, {}, None, None, None)
+            response = self.session.send(
+                request, timeout=self.timeout, **settings)
+            return response
+        finally:
+            end = time.perf_counter()
+            self.metrics.after(method, endpoint, response, {
+                'wait': waited - start,
+                'sign': signed - waited,
+                'network': end - signed,
+                'total': end - start
+            })
+
     def post(self, endpoint: str, data: dict = None) -> Response:
-        time.sleep(__timeout__)
-        return self.session.post(
-            self.api.path(endpoint),
-            json=data,
-            auth=self.auth,
-            timeout=self.timeout
-        )
+        # NOTE: Coinbase has no client order id to look an order up by, so
+        # a buy or sell is only sent again after it was refused
+        endpoint = self.api.endpoint(endpoint)
+        return self.retry.call(
+            'POST', endpoint, lambda: self.__send(
+                'POST', endpoint, json=data))
 
     def page(self, endpoint: str, data: dict = None) -> Response:
         responses = []
@@ -147,6 +295,49 @@ class Messenger(AbstractMessenger):
             data['starting_after'] = page['next_starting_after']
         return responses
 
+    def iter_pages(self,
+                   endpoint: str,
+                   data: dict = None,
+                   cursor: str = None) -> typing.Iterator[Page]:
+
+        data = dict(data) if data else {'limit': __offset__}
+        if cursor:
+            data['starting_after'] = cursor
+        while True:
+            response = self.get(endpoint, data)
+            if 200 != response.status_code:
+                raise HTTPError(response.text, response=response)
+            payload = self.decode(response)
+            if not payload.get('data'):
+                break
+            page = payload['pagination']
+            cursor = page['next_starting_after'] if page['next_uri'] else None
+            yield Page(payload['data'], cursor)
+            if not cursor:
+                break
+            data['starting_after'] = cursor
+
+    def iter_items(self,
+                   endpoint: str,
+                   data: dict = None,
+                   cursor: str = None) -> typing.Iterator[dict]:
+
+        for page in self.iter_pages(endpoint, data, cursor):
+            yield from page.items
+
+    def decode(self, response: Response) -> object:
+        if self.metrics is None:
+            return self.decoder.decode(response.content)
+        start = time.perf_counter()
+        payload = self.decoder.decode(response.content)
+        self.metrics.decode(
+            urllib.parse.urlsplit(response.url).path,
+            time.perf_counter() - start)
+        return payload
+
+    def connections(self) -> typing.Dict[str, dict]:
+        return get_connections(self.session)
+
     def close(self):
         self.session.close()
 
@@ -159,5 +350,8 @@ class Subscriber(AbstractSubscriber):
     def messenger(self) -> AbstractMessenger:
         return self.__messenger
 
+    def decode(self, response: Response) -> Dict:
+        return self.messenger.decode(response)
+
     def error(self, response: Response) -> bool:
         return 200 != response.status_code
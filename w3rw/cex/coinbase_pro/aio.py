@@ -0,0 +1,429 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw import Dict
+
+from w3rw.cex.abstract import AbstractAPI
+from w3rw.cex.abstract import AbstractAuth
+from w3rw.cex.abstract import AbstractClient
+from w3rw.cex.abstract import AbstractMessenger
+from w3rw.cex.abstract import AbstractSubscriber
+
+from w3rw.cex.coinbase_pro.messenger import API
+from w3rw.cex.coinbase_pro.messenger import Auth
+from w3rw.cex.coinbase_pro.messenger import get_limiter
+from w3rw.cex.coinbase_pro.messenger import get_scope
+
+from w3rw.cex.decoder import Decoder
+
+from w3rw.cex.limiter import Limiter
+
+from w3rw.cex.page import Page
+
+import asyncio
+import httpx
+import requests
+import typing
+
+
+class AsyncMessenger(AbstractMessenger):
+    def __init__(self,
+                 auth: AbstractAuth = None,
+                 limiter: Limiter = None,
+                 decoder: Decoder = None,
+                 connections: int = 100):
+
+        self.__auth: AbstractAuth = auth
+        self.__api: AbstractAPI = API()
+        self.__timeout: int = 30
+        self.__limiter: Limiter = limiter if limiter else get_limiter()
+        self.__decoder: Decoder = decoder if decoder else Decoder()
+        self.__session: httpx.AsyncClient = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=connections,
+                max_keepalive_connections=connections
+            ),
+            timeout=self.__timeout
+        )
+
+    @property
+    def auth(self) -> AbstractAuth:
+        return self.__auth
+
+    @property
+    def api(self) -> AbstractAPI:
+        return self.__api
+
+    @property
+    def timeout(self) -> int:
+        return self.__timeout
+
+    @property
+    def session(self) -> httpx.AsyncClient:
+        return self.__session
+
+    @property
+    def limiter(self) -> Limiter:
+        return self.__limiter
+
+    @property
+    def decoder(self) -> Decoder:
+        return self.__decoder
+
+    async def throttle(self, method: str, endpoint: str) -> float:
+        scope = get_scope(method, self.api.endpoint(endpoint))
+        delay = self.limiter.reserve(scope)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    async def request(self,
+                      method: str,
+                      endpoint: str,
+                      data: dict = None) -> httpx.Response:
+
+        await self.throttle(method, endpoint)
+        # NOTE: Auth signs a requests.PreparedRequest, so the request is
+        # prepared by requests and then sent as is through httpx.
+        request = requests.Request(
+            method,
+            self.api.path(endpoint),
+            params=data if 'GET' == method else None,
+            json=None if 'GET' == method else data
+        ).prepare()
+        if self.auth:
+            request = self.auth(request)
+        return await self.session.request(
+            method,
+            request.url,
+            headers=dict(request.headers),
+            content=request.body
+        )
+
+    async def get(self, endpoint: str, data: dict = None) -> httpx.Response:
+        return await self.request('GET', endpoint, data)
+
+    async def post(self, endpoint: str, data: dict = None) -> httpx.Response:
+        return await self.request('POST', endpoint, data)
+
+    async def put(self, endpoint: str, data: dict = None) -> httpx.Response:
+        return await self.request('PUT', endpoint, data)
+
+    async def delete(self, endpoint: str, data: dict = None) -> httpx.Response:
+        return await self.request('DELETE', endpoint, data)
+
+    async def page(self, endpoint: str, data: dict = None) -> list:
+        responses = []
+        if not data:
+            data = {}
+        while True:
+            response = await self.get(endpoint, data)
+            if 200 != response.status_code:
+                return [response]
+            if not response.json():
+                break
+            responses.append(response)
+            if not response.headers.get('CB-AFTER'):
+                break
+            data['after'] = response.headers.get('CB-AFTER')
+        return responses
+
+    async def iter_pages(self,
+                         endpoint: str,
+                         data: dict = None,
+                         cursor: str = None) -> typing.AsyncIterator[Page]:
+
+        data = dict(data) if data else {}
+        if cursor:
+            data['after'] = cursor
+        while True:
+            response = await self.get(endpoint, data)
+            if 200 != response.status_code:
+                raise httpx.HTTPStatusError(
+                    response.text, request=response.request, response=response)
+            items = self.decoder.decode(response.content)
+            if not items:
+                break
+            cursor = response.headers.get('CB-AFTER')
+            yield Page(items, cursor)
+            if not cursor:
+                break
+            data['after'] = cursor
+
+    async def iter_items(self,
+                         endpoint: str,
+                         data: dict = None,
+                         cursor: str = None) -> typing.AsyncIterator[dict]:
+
+        async for page in self.iter_pages(endpoint, data, cursor):
+            for item in page.items:
+                yield item
+
+    async def close(self) -> None:
+        await self.session.aclose()
+
+    async def __aenter__(self) -> 'AsyncMessenger':
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+
+class AsyncSubscriber(AbstractSubscriber):
+    def __init__(self, messenger: AsyncMessenger):
+        self.__messenger = messenger
+
+    @property
+    def messenger(self) -> AsyncMessenger:
+        return self.__messenger
+
+    def decode(self, response: httpx.Response) -> Dict:
+        return self.messenger.decoder.decode(response.content)
+
+    def error(self, response: httpx.Response) -> bool:
+        return 200 != response.status_code
+
+
+class Account(AsyncSubscriber):
+    async def list(self) -> Dict:
+        return self.decode(await self.messenger.get('/accounts'))
+
+    async def get(self, account_id: str) -> Dict:
+        return self.decode(await self.messenger.get(f'/accounts/{account_id}'))
+
+    async def holds(self, account_id: str, data: dict = None) -> Dict:
+        return self.decode(await self.messenger.get(
+            f'/accounts/{account_id}/holds', data))
+
+    async def ledger(self, account_id: str, data: dict = None) -> Dict:
+        return self.decode(await self.messenger.get(
+            f'/accounts/{account_id}/ledger', data))
+
+    async def transfers(self, account_id: str, data: dict = None) -> Dict:
+        return self.decode(await self.messenger.get(
+            f'/accounts/{account_id}/transfers', data))
+
+
+class Coinbase(AsyncSubscriber):
+    async def wallets(self) -> Dict:
+        return self.decode(await self.messenger.get('/coinbase-accounts'))
+
+    async def generate_address(self, account_id: str) -> Dict:
+        return self.decode(await self.messenger.post(
+            f'/coinbase-accounts/{account_id}/addresses'))
+
+    async def deposit_from(self, data: dict) -> Dict:
+        return self.decode(await self.messenger.post(
+            '/deposits/coinbase-account', data))
+
+    async def withdraw_to(self, data: dict) -> Dict:
+        return self.decode(await self.messenger.post(
+            '/withdrawals/coinbase-account', data))
+
+
+class Convert(AsyncSubscriber):
+    async def post(self, data: dict) -> Dict:
+        return self.decode(await self.messenger.post('/conversions', data))
+
+    async def get(self, conversion_id: str, data: dict = None) -> Dict:
+        return self.decode(await self.messenger.get(
+            f'/conversions/{conversion_id}', data))
+
+
+class Currency(AsyncSubscriber):
+    async def list(self) -> Dict:
+        return self.decode(await self.messenger.get('/currencies'))
+
+    async def get(self, currency_id: str) -> Dict:
+        return self.decode(await self.messenger.get(
+            f'/currencies/{currency_id}'))
+
+
+class Transfer(AsyncSubscriber):
+    async def deposit_from(self, data: dict) -> Dict:
+        return self.decode(await self.messenger.post(
+            '/deposits/payment-method', data))
+
+    async def methods(self) -> Dict:
+        return self.decode(await self.messenger.get('/payment-methods'))
+
+    async def list(self) -> Dict:
+        return self.decode(await self.messenger.get('/transfers'))
+
+    async def get(self, transfer_id: str) -> Dict:
+        return self.decode(await self.messenger.get(
+            f'/transfers/{transfer_id}'))
+
+    async def withdraw_to_address(self, data: dict) -> Dict:
+        return self.decode(await self.messenger.post(
+            '/withdrawals/crypto', data))
+
+    async def withdraw_estimate(self, data: dict = None) -> Dict:
+        return self.decode(await self.messenger.get(
+            '/withdrawals/fee-estimate', data))
+
+    async def withdraw_to(self, data: dict) -> Dict:
+        return self.decode(await self.messenger.post(
+            '/withdrawals/payment-method', data))
+
+
+class Order(AsyncSubscriber):
+    async def fills(self, data: dict) -> Dict:
+        return self.decode(await self.messenger.get('/fills', data))
+
+    async def list(self, data: dict) -> Dict:
+        return self.decode(await self.messenger.get('/orders', data))
+
+    async def cancel_all(self, data: dict = None) -> Dict:
+        return self.decode(await self.messenger.delete('/orders', data))
+
+    async def post(self, data: dict) -> Dict:
+        return self.decode(await self.messenger.post('/orders', data))
+
+    async def get(self, order_id: str) -> Dict:
+        return self.decode(await self.messenger.get(f'/orders/{order_id}'))
+
+    async def cancel(self, order_id: str, data: dict = None) -> Dict:
+        return self.decode(await self.messenger.delete(
+            f'/orders/{order_id}', data))
+
+
+class Oracle(AsyncSubscriber):
+    async def prices(self) -> Dict:
+        return self.decode(await self.messenger.get('/oracle'))
+
+
+class Product(AsyncSubscriber):
+    async def list(self) -> Dict:
+        return self.decode(await self.messenger.get('/products'))
+
+    async def get(self, product_id: str) -> Dict:
+        return self.decode(await self.messenger.get(f'/products/{product_id}'))
+
+    async def book(self, product_id: str, data: dict = None) -> dict:
+        return self.decode(await self.messenger.get(
+            f'/products/{product_id}/book', data))
+
+    async def ticker(self, product_id: str) -> Dict:
+        return self.decode(await self.messenger.get(
+            f'/products/{product_id}/ticker'))
+
+    async def trades(self, product_id: str, data: dict = None) -> Dict:
+        return self.decode(await self.messenger.get(
+            f'/products/{product_id}/trades', data))
+
+    async def candles(self, product_id: str, data: dict = None) -> Dict:
+        return self.decode(await self.messenger.get(
+            f'/products/{product_id}/candles', data))
+
+    async def stats(self, product_id: str) -> Dict:
+        return self.decode(await self.messenger.get(
+            f'/products/{product_id}/stats'))
+
+
+class Profile(AsyncSubscriber):
+    async def list(self, data: dict = None) -> Dict:
+        return self.decode(await self.messenger.get('/profiles', data))
+
+    async def create(self, data: dict) -> Dict:
+        return self.decode(await self.messenger.post('/profiles', data))
+
+    async def transfer(self, data: dict) -> Dict:
+        return self.decode(await self.messenger.post(
+            '/profiles/transfer', data))
+
+    async def get(self, profile_id: str, data: dict) -> Dict:
+        return self.decode(await self.messenger.get(
+            f'/profiles/{profile_id}', data))
+
+    async def rename(self, profile_id: str, data: dict) -> Dict:
+        return self.decode(await self.messenger.put(
+            f'/profiles/{profile_id}', data))
+
+    async def delete(self, profile_id: str, data: dict) -> Dict:
+        return self.decode(await self.messenger.put(
+            f'/profiles/{profile_id}/deactivate', data))
+
+
+class Report(AsyncSubscriber):
+    async def list(self, data: dict = None) -> Dict:
+        return self.decode(await self.messenger.get('/reports', data))
+
+    async def create(self, data: dict) -> Dict:
+        return self.decode(await self.messenger.post('/reports', data))
+
+    async def get(self, report_id: str) -> Dict:
+        return self.decode(await self.messenger.get(f'/reports/{report_id}'))
+
+
+class User(AsyncSubscriber):
+    async def limits(self, user_id: str) -> Dict:
+        return self.decode(await self.messenger.get(
+            f'/users/{user_id}/exchange-limits'))
+
+
+class Time(AsyncSubscriber):
+    async def get(self) -> Dict:
+        # NOTE: The `epoch` field represents decimal seconds since Unix Epoch
+        return self.decode(await self.messenger.get('/time'))
+
+
+class AsyncClient(AbstractClient):
+    def __init__(self, messenger: AsyncMessenger):
+        self.__messenger = messenger
+
+        self.account = Account(messenger)
+        self.coinbase = Coinbase(messenger)
+        self.convert = Convert(messenger)
+        self.currency = Currency(messenger)
+        self.transfer = Transfer(messenger)
+        self.order = Order(messenger)
+        self.oracle = Oracle(messenger)
+        self.product = Product(messenger)
+        self.profile = Profile(messenger)
+        self.report = Report(messenger)
+        self.user = User(messenger)
+        self.time = Time(messenger)
+
+    @property
+    def label(self):
+        return 'coinbase_pro'
+
+    @property
+    def messenger(self):
+        return self.__messenger
+
+    async def close(self) -> None:
+        await self.messenger.close()
+
+    async def __aenter__(self) -> 'AsyncClient':
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+
+def get_messenger(key: str = None,
+                  secret: str = None,
+                  passphrase: str = None) -> AsyncMessenger:
+
+    return AsyncMessenger(Auth(key, secret, passphrase))
+
+
+def get_client(key: str = None,
+               secret: str = None,
+               passphrase: str = None) -> AsyncClient:
+
+    return AsyncClient(AsyncMessenger(Auth(key, secret, passphrase)))
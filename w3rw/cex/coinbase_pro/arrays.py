@@ -0,0 +1,73 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.arrays import get_array
+from w3rw.cex.arrays import get_epoch
+
+import numpy
+import typing
+
+# NOTE: Candles follow the column order of the REST API
+# https://docs.cloud.coinbase.com/exchange/reference/exchangerestapi_getproductcandles
+CANDLE = numpy.dtype([
+    ('time', 'i8'),
+    ('low', 'f8'),
+    ('high', 'f8'),
+    ('open', 'f8'),
+    ('close', 'f8'),
+    ('volume', 'f8')
+])
+
+TRADE = numpy.dtype([
+    ('trade_id', 'i8'),
+    ('time', 'f8'),
+    ('price', 'f8'),
+    ('size', 'f8'),
+    ('side', 'S4')
+])
+
+# NOTE: Level 1 and 2 books aggregate the orders at each price, while a
+# level 3 book lists every order, so its levels count one order each
+LEVEL = numpy.dtype([
+    ('price', 'f8'),
+    ('size', 'f8'),
+    ('num_orders', 'i8')
+])
+
+
+def get_candles(candles: list) -> numpy.ndarray:
+    return get_array(candles, CANDLE)
+
+
+def get_levels(levels: list, level: int = 2) -> numpy.ndarray:
+    if 3 > level:
+        return get_array(levels, LEVEL)
+    array = get_array(levels, LEVEL, ('price', 'size'))
+    array['num_orders'] = 1
+    return array
+
+
+def get_book(book: dict,
+             level: int = 2) -> typing.Tuple[numpy.ndarray, numpy.ndarray]:
+    return (get_levels(book.get('bids', []), level),
+            get_levels(book.get('asks', []), level))
+
+
+def get_trades(trades: list) -> numpy.ndarray:
+    rows = [(t['trade_id'], t['price'], t['size'], t['side']) for t in trades]
+    array = get_array(rows, TRADE, ('trade_id', 'price', 'size', 'side'))
+    if trades:
+        array['time'] = get_epoch([trade['time'] for trade in trades])
+    return array
@@ -0,0 +1,138 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.coinbase_pro.arrays import get_candles
+
+from w3rw.cex.coinbase_pro.client import Product
+
+from w3rw.cex.pool import __workers__
+from w3rw.cex.pool import Result
+from w3rw.cex.pool import fan_out
+
+import datetime
+import numpy
+import random
+import threading
+import time
+import typing
+
+# NOTE: The candles endpoint returns at most 300 candles per request
+__candles__: int = 300
+
+Range = typing.Tuple[int, int]
+Window = typing.Tuple[str, int, int, int]
+
+
+def get_timestamp(epoch: int) -> str:
+    moment = datetime.datetime.fromtimestamp(epoch, datetime.timezone.utc)
+    return moment.isoformat().replace('+00:00', 'Z')
+
+
+def get_windows(start: int, end: int, granularity: int) -> typing.List[Range]:
+    span = __candles__ * granularity
+    return [(t, min(t + span, end)) for t in range(start, end, span)]
+
+
+def get_merged(rows: typing.List[list]) -> numpy.ndarray:
+    # NOTE: Windows may overlap and arrive in any order, so the rows are
+    # sorted by time and only the first candle for each time is kept
+    candles = get_candles(rows)
+    _, index = numpy.unique(candles['time'], return_index=True)
+    return candles[index]
+
+
+class Backfill(object):
+    # NOTE: Every window is fetched through Product.candles, so the pool
+    # shares the messenger's limiter and never exceeds the public budget.
+    def __init__(self,
+                 product: Product,
+                 workers: int = __workers__,
+                 retries: int = 3,
+                 backoff: float = 1):
+
+        self.__product: Product = product
+        self.__workers: int = workers
+        self.__retries: int = retries
+        self.__backoff: float = backoff
+        self.__lock: threading.Lock = threading.Lock()
+        self.__failed: typing.List[Result] = []
+
+    @property
+    def product(self) -> Product:
+        return self.__product
+
+    @property
+    def failed(self) -> typing.List[Result]:
+        with self.__lock:
+            return list(self.__failed)
+
+    def fetch(self, window: Window) -> list:
+        # NOTE: The API bounds are inclusive, so the window [start, end)
+        # asks for the candles from start to the last one before end, which
+        # need not be a whole granularity before it
+        product_id, start, end, granularity = window
+        last = (end - 1) // granularity * granularity
+        for attempt in range(self.__retries + 1):
+            try:
+                candles = self.__product.candles(product_id, {
+                    'start': get_timestamp(start),
+                    'end': get_timestamp(last),
+                    'granularity': granularity
+                })
+                if not isinstance(candles, list):
+                    raise ValueError(candles.get('message', candles))
+                return [c for c in candles if start <= c[0] < end]
+            except Exception:
+                if attempt == self.__retries:
+                    raise
+                delay = self.__backoff * 2 ** attempt
+                time.sleep(random.uniform(delay / 2, delay))
+
+    def fetch_many(self, windows: typing.List[Window]) -> typing.List[Result]:
+        results = fan_out(self.fetch, windows, self.__workers)
+        with self.__lock:
+            self.__failed = [result for result in results if not result.ok]
+        return results
+
+    def run(self,
+            product_id: str,
+            start: int,
+            end: int,
+            granularity: int) -> numpy.ndarray:
+
+        return self.run_many([product_id], start, end, granularity)[product_id]
+
+    def run_many(self,
+                 product_ids: typing.List[str],
+                 start: int,
+                 end: int,
+                 granularity: int) -> typing.Dict[str, numpy.ndarray]:
+
+        # NOTE: The windows of every product share one pool. Windows that
+        # still fail after retrying are left out and listed in `failed`.
+        start = start - start % granularity
+        windows = [
+            (product_id, lower, upper, granularity)
+            for product_id in product_ids
+            for lower, upper in get_windows(start, end, granularity)
+        ]
+        rows = {product_id: [] for product_id in product_ids}
+        for result in self.fetch_many(windows):
+            if result.ok:
+                rows[result.item[0]].extend(result.value)
+        return {
+            product_id: get_merged(candles)
+            for product_id, candles in rows.items()
+        }
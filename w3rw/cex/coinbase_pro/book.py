@@ -0,0 +1,247 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.book import Ladder
+
+from w3rw.cex.coinbase_pro.client import Product
+from w3rw.cex.coinbase_pro.socket import Stream
+
+import collections
+import time
+import typing
+
+Level = typing.Tuple[float, float]
+
+# NOTE: Sizes are floats, so a level that has been fully consumed may be
+# left with a rounding residue instead of an exact zero.
+__epsilon__: float = 1e-12
+
+# NOTE: Messages are buffered while the book is out of sync, and a
+# snapshot is fetched at most once per `__delay__` seconds
+__backlog__: int = 65536
+__delay__: float = 1.0
+
+
+class OrderBook(object):
+    # NOTE: Follows the documented way of building a level 3 book. Once a
+    # gap is seen, full channel messages are buffered, a single snapshot is
+    # fetched, the buffered messages it already contains are dropped, and
+    # the rest are replayed. A snapshot that lags the buffer can't bridge
+    # the gap, so the messages stay buffered until a later one does.
+    def __init__(self,
+                 product_id: str,
+                 product: Product = None,
+                 backlog: int = __backlog__,
+                 delay: float = __delay__):
+
+        self.__product_id: str = product_id
+        self.__product: Product = product
+        self.__bids: Ladder = Ladder(descending=True)
+        self.__asks: Ladder = Ladder()
+        self.__orders: typing.Dict[str, tuple] = {}
+        self.__sequence: int = -1
+        self.__resyncs: int = 0
+        self.__pending: collections.deque = collections.deque(maxlen=backlog)
+        self.__syncing: bool = False
+        self.__delay: float = delay
+        self.__fetched: float = -delay
+
+    @property
+    def product_id(self) -> str:
+        return self.__product_id
+
+    @property
+    def product(self) -> Product:
+        return self.__product
+
+    @property
+    def bids(self) -> Ladder:
+        return self.__bids
+
+    @property
+    def asks(self) -> Ladder:
+        return self.__asks
+
+    @property
+    def sequence(self) -> int:
+        return self.__sequence
+
+    @property
+    def resyncs(self) -> int:
+        return self.__resyncs
+
+    @property
+    def syncing(self) -> bool:
+        return self.__syncing
+
+    @property
+    def pending(self) -> int:
+        return len(self.__pending)
+
+    def ladder(self, side: str) -> Ladder:
+        return self.__bids if 'buy' == side else self.__asks
+
+    def clear(self) -> None:
+        self.__bids.clear()
+        self.__asks.clear()
+        self.__orders.clear()
+        self.__sequence = -1
+
+    def resync(self) -> bool:
+        # NOTE: Returns True once the book is in sync with the stream
+        self.__fetched = time.monotonic()
+        if self.__product is None:
+            self.clear()
+            return False
+        snapshot = self.__product.book(self.__product_id, {'level': 3})
+        if 'sequence' not in snapshot:
+            return False
+        self.__resyncs += 1
+        return self.seed(snapshot)
+
+    def seed(self, snapshot: dict) -> bool:
+        # NOTE: Expects the response of `Product.book(level=3)`
+        self.clear()
+        for side, key in (('buy', 'bids'), ('sell', 'asks')):
+            for price, size, order_id in snapshot[key]:
+                self.__open(order_id, side, float(price), float(size))
+        self.__sequence = snapshot['sequence']
+        return self.__replay()
+
+    def apply(self, message: dict) -> bool:
+        if message.get('product_id') != self.__product_id:
+            return False
+        kind = message.get('type')
+        if 'l2update' == kind:
+            for side, price, size in message['changes']:
+                self.__level(self.ladder(side), float(price), float(size))
+            return True
+        if 'snapshot' == kind:
+            self.clear()
+            for price, size in message['bids']:
+                self.__bids.set(float(price), float(size))
+            for price, size in message['asks']:
+                self.__asks.set(float(price), float(size))
+            return True
+        if kind not in ('received', 'open', 'done', 'match', 'change'):
+            return False
+        if message['sequence'] <= self.__sequence:
+            return False
+        if self.__syncing or message['sequence'] > self.__sequence + 1:
+            # NOTE: A gap means messages were lost, so the book is stale
+            self.__syncing = True
+            self.__pending.append(message)
+            if time.monotonic() - self.__fetched >= self.__delay:
+                self.resync()
+            return not self.__syncing
+        self.__change(message)
+        return True
+
+    def update(self, stream: Stream) -> dict:
+        message = stream.receive()
+        self.apply(message)
+        return message
+
+    def __replay(self) -> bool:
+        pending = self.__pending
+        while pending and pending[0]['sequence'] <= self.__sequence:
+            pending.popleft()
+        while pending and pending[0]['sequence'] == self.__sequence + 1:
+            self.__change(pending.popleft())
+        self.__syncing = bool(pending)
+        return not self.__syncing
+
+    def __change(self, message: dict) -> None:
+        kind = message['type']
+        self.__sequence = message['sequence']
+        if 'open' == kind:
+            self.__open(
+                message['order_id'],
+                message['side'],
+                float(message['price']),
+                float(message['remaining_size']))
+        elif 'done' == kind:
+            self.__close(message['order_id'])
+        elif 'match' == kind:
+            self.__fill(message['maker_order_id'], float(message['size']))
+        elif 'change' == kind and 'new_size' in message:
+            self.__resize(message['order_id'], float(message['new_size']))
+
+    def __level(self, ladder: Ladder, price: float, size: float) -> None:
+        if size > __epsilon__:
+            ladder.set(price, size)
+        else:
+            ladder.remove(price)
+
+    def __open(self, order_id: str, side: str, price: float, size: float):
+        ladder = self.ladder(side)
+        self.__orders[order_id] = (side, price, size)
+        ladder.set(price, ladder.get(price, 0.0) + size)
+
+    def __reduce(self, order_id: str, size: float) -> None:
+        side, price, remaining = self.__orders[order_id]
+        ladder = self.ladder(side)
+        self.__level(ladder, price, ladder.get(price, 0.0) - size)
+        remaining -= size
+        if remaining > __epsilon__:
+            self.__orders[order_id] = (side, price, remaining)
+        else:
+            del self.__orders[order_id]
+
+    def __close(self, order_id: str) -> None:
+        if order_id in self.__orders:
+            self.__reduce(order_id, self.__orders[order_id][2])
+
+    def __fill(self, order_id: str, size: float) -> None:
+        if order_id in self.__orders:
+            self.__reduce(order_id, size)
+
+    def __resize(self, order_id: str, size: float) -> None:
+        if order_id in self.__orders:
+            self.__reduce(order_id, self.__orders[order_id][2] - size)
+
+    def best_bid(self) -> typing.Optional[Level]:
+        return self.__bids.best()
+
+    def best_ask(self) -> typing.Optional[Level]:
+        return self.__asks.best()
+
+    def spread(self) -> typing.Optional[float]:
+        bid, ask = self.__bids.best(), self.__asks.best()
+        if bid is None or ask is None:
+            return None
+        return ask[0] - bid[0]
+
+    def mid(self) -> typing.Optional[float]:
+        bid, ask = self.__bids.best(), self.__asks.best()
+        if bid is None or ask is None:
+            return None
+        return (ask[0] + bid[0]) / 2
+
+    def depth(self, n: int = 10) -> typing.Dict[str, typing.List[Level]]:
+        return {'bids': self.__bids.top(n), 'asks': self.__asks.top(n)}
+
+    def vwap(self, side: str, size: float) -> typing.Optional[float]:
+        # NOTE: The average price paid to `buy` (or received to `sell`)
+        # `size` units by walking the opposite side of the book
+        ladder = self.__asks if 'buy' == side else self.__bids
+        remaining, notional = size, 0.0
+        for price, available in ladder:
+            taken = available if available < remaining else remaining
+            notional += taken * price
+            remaining -= taken
+            if remaining <= 0:
+                return notional / size
+        return None
@@ -0,0 +1,95 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.candles import __granularities__
+from w3rw.cex.candles import __size__
+from w3rw.cex.candles import Aggregator
+
+from w3rw.cex.coinbase_pro.client import Product
+
+from w3rw.cex.coinbase_pro.models import Match
+
+import calendar
+import functools
+import time
+import typing
+
+# NOTE: The REST candles only come in these granularities
+__candles__: typing.Tuple[int, ...] = (60, 300, 900, 3600, 21600, 86400)
+
+
+@functools.lru_cache(maxsize=1024)
+def get_second(value: str) -> int:
+    return calendar.timegm(time.strptime(value, '%Y-%m-%dT%H:%M:%S'))
+
+
+def get_epoch(value: str) -> float:
+    # NOTE: e.g. '2021-10-18T12:34:56.123456Z'. Trades arrive in order, so
+    # each whole second is parsed once and only the fraction is added.
+    fraction = value[19:].rstrip('Z')
+    return get_second(value[:19]) + (float(fraction) if fraction else 0.0)
+
+
+class Candles(Aggregator):
+    # NOTE: Builds the bars of a single product from its `match` and
+    # `last_match` messages, as dicts or Match records
+    def __init__(self,
+                 product_id: str,
+                 granularities: typing.Iterable[int] = __granularities__,
+                 size: int = __size__):
+
+        super().__init__(granularities, size)
+        self.__product_id: str = product_id
+
+    @property
+    def product_id(self) -> str:
+        return self.__product_id
+
+    def apply(self, message: object) -> bool:
+        if isinstance(message, Match):
+            product_id = message.product_id
+            moment, price, size = message.time, message.price, message.size
+        elif isinstance(message, dict) and message.get('type') in (
+                'match', 'last_match'):
+            product_id = message.get('product_id')
+            moment = message['time']
+            price, size = message['price'], message['size']
+        else:
+            return False
+        if product_id != self.__product_id:
+            return False
+        return self.update(get_epoch(moment), float(price), float(size))
+
+    def seed(self, granularity: int, candles: typing.List[list]) -> int:
+        # NOTE: Each candle is [time, low, high, open, close, volume]
+        series = self[granularity]
+        return sum(
+            series.seed(row[0], row[3], row[2], row[1], row[4], row[5])
+            for row in candles
+        )
+
+    def fetch(self, product: Product) -> int:
+        # NOTE: Seeds every granularity the REST candles support. Finer
+        # ones, such as 1s, are only built from the stream.
+        seeded = 0
+        for granularity in self.granularities:
+            if granularity not in __candles__:
+                continue
+            candles = product.candles(
+                self.__product_id, {'granularity': granularity})
+            if not isinstance(candles, list):
+                raise ValueError(candles)
+            seeded += self.seed(granularity, candles)
+        return seeded
@@ -21,100 +21,170 @@ from w3rw.cex.coinbase_pro.messenger import Auth
 from w3rw.cex.coinbase_pro.messenger import Messenger
 from w3rw.cex.coinbase_pro.messenger import Subscriber
 
+from w3rw.cex.coinbase_pro.models import Candle
+from w3rw.cex.coinbase_pro.models import Fill
+
+from w3rw.cex.page import Page
+from w3rw.cex.page import read_ahead
+
+from w3rw.cex.pool import __workers__
+from w3rw.cex.pool import Result
+from w3rw.cex.pool import fan_out
+
+from w3rw.cex.registry import Levels
+from w3rw.cex.registry import Quote
+
+from dateutil.parser import isoparse
+
+import requests
+import typing
+import uuid
+
+# NOTE: The array helpers require the optional numpy dependency
+try:
+    from w3rw.cex.coinbase_pro import arrays
+except ImportError:
+    arrays = None
+
+
+def get_checked(subscriber: Subscriber, endpoint: str) -> Dict:
+    # NOTE: Raises on an error status instead of decoding the error body,
+    # so a failed request of a fan out lands in `Result.error`
+    response = subscriber.messenger.get(endpoint)
+    if not 200 <= response.status_code < 300:
+        raise requests.HTTPError(response.text, response=response)
+    return subscriber.decode(response)
+
 
 class Account(Subscriber):
     def list(self) -> Dict:
-        return self.messenger.get('/accounts').json()
+        return self.decode(self.messenger.get('/accounts'))
 
     def get(self, account_id: str) -> Dict:
-        return self.messenger.get(f'/accounts/{account_id}').json()
+        return self.decode(self.messenger.get(f'/accounts/{account_id}'))
+
+    def get_many(self,
+                 account_ids: typing.Iterable[str],
+                 workers: int = __workers__) -> typing.List[Result]:
+        return fan_out(
+            lambda account_id: get_checked(self, f'/accounts/{account_id}'),
+            account_ids, workers)
 
     def holds(self, account_id: str, data: dict = None) -> Dict:
-        return self.messenger.get(
-            f'/accounts/{account_id}/holds', data).json()
+        return self.decode(self.messenger.get(
+            f'/accounts/{account_id}/holds', data))
 
     def ledger(self, account_id: str, data: dict = None) -> Dict:
-        return self.messenger.get(
-            f'/accounts/{account_id}/ledger', data).json()
+        return self.decode(self.messenger.get(
+            f'/accounts/{account_id}/ledger', data))
+
+    def iter_ledger(self,
+                    account_id: str,
+                    data: dict = None,
+                    cursor: str = None,
+                    prefetch: int = 0) -> typing.Iterator[Page]:
+
+        pages = self.messenger.iter_pages(
+            f'/accounts/{account_id}/ledger', data, cursor)
+        return read_ahead(pages, prefetch) if prefetch else pages
 
     def transfers(self, account_id: str, data: dict = None) -> Dict:
-        return self.messenger.get(
-            f'/accounts/{account_id}/transfers', data).json()
+        return self.decode(self.messenger.get(
+            f'/accounts/{account_id}/transfers', data))
 
 
 class Coinbase(Subscriber):
     def wallets(self) -> Dict:
-        return self.messenger.get('/coinbase-accounts').json()
+        return self.decode(self.messenger.get('/coinbase-accounts'))
 
     def generate_address(self, account_id: str) -> Dict:
-        return self.messenger.post(
-            f'/coinbase-accounts/{account_id}/addresses').json()
+        return self.decode(self.messenger.post(
+            f'/coinbase-accounts/{account_id}/addresses'))
 
     def deposit_from(self, data: dict) -> Dict:
-        return self.messenger.post('/deposits/coinbase-account', data).json()
+        return self.decode(self.messenger.post(
+            '/deposits/coinbase-account', data))
 
     def withdraw_to(self, data: dict) -> Dict:
-        return self.messenger.post('/withdrawals/coinbase-account', data).json()
+        return self.decode(self.messenger.post(
+            '/withdrawals/coinbase-account', data))
 
 
 class Convert(Subscriber):
     def post(self, data: dict) -> Dict:
-        return self.messenger.post('/conversions', data).json()
+        return self.decode(self.messenger.post('/conversions', data))
 
     def get(self, conversion_id: str, data: dict = None) -> Dict:
-        return self.messenger.get(
-            f'/conversions/{conversion_id}', data).json()
+        return self.decode(self.messenger.get(
+            f'/conversions/{conversion_id}', data))
 
 
 class Currency(Subscriber):
     def list(self) -> Dict:
-        return self.messenger.get('/currencies').json()
+        return self.decode(self.messenger.get('/currencies'))
 
     def get(self, currency_id: str) -> Dict:
-        return self.messenger.get(f'/currencies/{currency_id}').json()
+        return self.decode(self.messenger.get(f'/currencies/{currency_id}'))
 
 
 class Transfer(Subscriber):
     def deposit_from(self, data: dict) -> Dict:
-        return self.messenger.post('/deposits/payment-method', data).json()
+        return self.decode(self.messenger.post(
+            '/deposits/payment-method', data))
 
     def methods(self) -> Dict:
-        return self.messenger.get('/payment-methods').json()
+        return self.decode(self.messenger.get('/payment-methods'))
 
     def list(self) -> Dict:
-        return self.messenger.get('/transfers').json()
+        return self.decode(self.messenger.get('/transfers'))
 
     def get(self, transfer_id: str) -> Dict:
-        return self.messenger.get(f'/transfers/{transfer_id}').json()
+        return self.decode(self.messenger.get(f'/transfers/{transfer_id}'))
 
     def withdraw_to_address(self, data: dict) -> Dict:
         return self.messenger.post('/withdrawals/crypto', data)
 
     def withdraw_estimate(self, data: dict = None) -> Dict:
-        return self.messenger.get('/withdrawals/fee-estimate', data).json()
+        return self.decode(self.messenger.get(
+            '/withdrawals/fee-estimate', data))
 
     def withdraw_to(self, data: dict) -> Dict:
-        return self.messenger.post('/withdrawals/payment-method', data).json()
+        return self.decode(self.messenger.post(
+            '/withdrawals/payment-method', data))
 
 
 class Order(Subscriber):
-    def fills(self, data: dict) -> Dict:
-        return self.messenger.get('/fills', data).json()
+    def fills(self, data: dict, typed: bool = False) -> Dict:
+        fills = self.decode(self.messenger.get('/fills', data))
+        if typed and isinstance(fills, list):
+            return [Fill.from_message(fill) for fill in fills]
+        return fills
+
+    def iter_fills(self,
+                   data: dict,
+                   cursor: str = None,
+                   prefetch: int = 0) -> typing.Iterator[Page]:
+
+        pages = self.messenger.iter_pages('/fills', data, cursor)
+        return read_ahead(pages, prefetch) if prefetch else pages
 
     def list(self, data: dict) -> Dict:
-        return self.messenger.get('/orders', data).json()
+        return self.decode(self.messenger.get('/orders', data))
 
     def cancel_all(self, data: dict = None) -> Dict:
-        return self.messenger.delete('/orders', data).json()
+        return self.decode(self.messenger.delete('/orders', data))
 
     def post(self, data: dict) -> Dict:
-        return self.messenger.post('/orders', data).json()
+        # NOTE: The `client_oid` lets a retried submission find an order
+        # that was already placed instead of placing it twice
+        data = {'client_oid': str(uuid.uuid4()), **data}
+        return self.decode(self.messenger.post('/orders', data))
 
     def get(self, order_id: str) -> Dict:
-        return self.messenger.get(f'/orders/{order_id}').json()
+        return self.decode(self.messenger.get(f'/orders/{order_id}'))
 
     def cancel(self, order_id: str, data: dict = None) -> Dict:
-        return self.messenger.delete(f'/orders/{order_id}', data).json()
+        return self.decode(self.messenger.delete(f'/orders/{order_id}', data))
 
 
 class Oracle(Subscriber):
@@ -124,71 +194,135 @@ class Oracle(Subscriber):
 
 class Product(Subscriber):
     def list(self) -> Dict:
-        return self.messenger.get('/products').json()
+        return self.decode(self.messenger.get('/products'))
 
     def get(self, product_id: str) -> Dict:
-        return self.messenger.get(f'/products/{product_id}').json()
+        return self.decode(self.messenger.get(f'/products/{product_id}'))
+
+    def get_many(self,
+                 product_ids: typing.Iterable[str],
+                 workers: int = __workers__) -> typing.List[Result]:
+        return fan_out(
+            lambda product_id: get_checked(self, f'/products/{product_id}'),
+            product_ids, workers)
 
     def book(self, product_id: str, data: dict = None) -> dict:
-        return self.messenger.get(
-            f'/products/{product_id}/book', data).json()
+        return self.decode(self.messenger.get(
+            f'/products/{product_id}/book', data))
 
     def ticker(self, product_id: str) -> Dict:
-        return self.messenger.get(f'/products/{product_id}/ticker').json()
+        return self.decode(self.messenger.get(
+            f'/products/{product_id}/ticker'))
 
-    def trades(self, product_id: str, data: dict = None) -> Dict:
-        return self.messenger.get(
-            f'/products/{product_id}/trades', data).json()
+    def tickers(self,
+                product_ids: typing.Iterable[str],
+                workers: int = __workers__) -> typing.List[Result]:
+        return fan_out(
+            lambda product_id: get_checked(
+                self, f'/products/{product_id}/ticker'),
+            product_ids, workers)
 
-    def candles(self, product_id: str, data: dict = None) -> Dict:
-        return self.messenger.get(
-            f'/products/{product_id}/candles', data).json()
+    def trades(self, product_id: str, data: dict = None) -> Dict:
+        return self.decode(self.messenger.get(
+            f'/products/{product_id}/trades', data))
+
+    def iter_trades(self,
+                    product_id: str,
+                    data: dict = None,
+                    cursor: str = None,
+                    prefetch: int = 0) -> typing.Iterator[Page]:
+
+        pages = self.messenger.iter_pages(
+            f'/products/{product_id}/trades', data, cursor)
+        return read_ahead(pages, prefetch) if prefetch else pages
+
+    def candles(self,
+                product_id: str,
+                data: dict = None,
+                typed: bool = False) -> Dict:
+
+        candles = self.decode(self.messenger.get(
+            f'/products/{product_id}/candles', data))
+        if typed and isinstance(candles, list):
+            return [Candle.from_message(candle) for candle in candles]
+        return candles
+
+    def __arrays(self, payload: Dict) -> Dict:
+        if arrays is None:
+            raise ImportError('numpy is required for arrays')
+        if not isinstance(payload, (list, dict)) or 'message' in payload:
+            raise ValueError(payload)
+        return payload
+
+    def candle_array(self, product_id: str, data: dict = None) -> object:
+        candles = self.__arrays(self.candles(product_id, data))
+        return arrays.get_candles(candles)
+
+    def book_array(self,
+                   product_id: str,
+                   data: dict = None) -> typing.Tuple[object, object]:
+
+        book = self.__arrays(self.book(product_id, data))
+        return arrays.get_book(book, int((data or {}).get('level', 1)))
+
+    def trade_array(self, product_id: str, data: dict = None) -> object:
+        trades = self.__arrays(self.trades(product_id, data))
+        return arrays.get_trades(trades)
 
     def stats(self, product_id: str) -> Dict:
-        return self.messenger.get(f'/products/{product_id}/stats').json()
+        return self.decode(self.messenger.get(f'/products/{product_id}/stats'))
+
+    def stats_many(self,
+                   product_ids: typing.Iterable[str],
+                   workers: int = __workers__) -> typing.List[Result]:
+        return fan_out(
+            lambda product_id: get_checked(
+                self, f'/products/{product_id}/stats'),
+            product_ids, workers)
 
 
 class Profile(Subscriber):
     def list(self, data: dict = None) -> Dict:
-        return self.messenger.get('/profiles', data).json()
+        return self.decode(self.messenger.get('/profiles', data))
 
     def create(self, data: dict) -> Dict:
-        return self.messenger.post('/profiles', data).json()
+        return self.decode(self.messenger.post('/profiles', data))
 
     def transfer(self, data: dict) -> Dict:
-        return self.messenger.post('/profiles/transfer', data).json()
+        return self.decode(self.messenger.post('/profiles/transfer', data))
 
     def get(self, profile_id: str, data: dict) -> Dict:
-        return self.messenger.get(f'/profiles/{profile_id}', data).json()
+        return self.decode(self.messenger.get(f'/profiles/{profile_id}', data))
 
     def rename(self, profile_id: str, data: dict) -> Dict:
-        return self.messenger.put(f'/profiles/{profile_id}', data).json()
+        return self.decode(self.messenger.put(f'/profiles/{profile_id}', data))
 
     def delete(self, profile_id: str, data: dict) -> Dict:
-        return self.messenger.put(
-            f'/profiles/{profile_id}/deactivate', data).json()
+        return self.decode(self.messenger.put(
+            f'/profiles/{profile_id}/deactivate', data))
 
 
 class Report(Subscriber):
     def list(self, data: dict = None) -> Dict:
-        return self.messenger.get('/reports', data).json()
+        return self.decode(self.messenger.get('/reports', data))
 
     def create(self, data: dict) -> Dict:
-        return self.messenger.post('/reports', data).json()
+        return self.decode(self.messenger.post('/reports', data))
 
     def get(self, report_id: str) -> Dict:
-        return self.messenger.get(f'/reports/{report_id}').json()
+        return self.decode(self.messenger.get(f'/reports/{report_id}'))
 
 
 class User(Subscriber):
     def limits(self, user_id: str) -> Dict:
-        return self.messenger.get(f'/users/{user_id}/exchange-limits').json()
+        return self.decode(self.messenger.get(
+            f'/users/{user_id}/exchange-limits'))
 
 
 class Time(Subscriber):
     def get(self) -> Dict:
         # NOTE: The `epoch` field represents decimal seconds since Unix Epoch
-        return self.messenger.get('/time').json()
+        return self.decode(self.messenger.get('/time'))
 
 
 class Client(AbstractClient):
@@ -216,6 +350,43 @@ class Client(AbstractClient):
     def messenger(self):
         return self.__messenger
 
+    def markets(self) -> typing.Dict[str, typing.Tuple[str, str]]:
+        products = self.product.list()
+        if not isinstance(products, list):
+            raise ValueError(products)
+        return {
+            p['id']: (p['base_currency'], p['quote_currency'])
+            for p in products
+        }
+
+    def quote(self, product_id: str) -> Quote:
+        ticker = self.product.ticker(product_id)
+        if not isinstance(ticker, dict) or 'message' in ticker:
+            raise ValueError(ticker)
+        moment = ticker.get('time')
+        return Quote(
+            self.label,
+            product_id,
+            float(ticker['bid']),
+            float(ticker['ask']),
+            float(ticker['price']),
+            isoparse(moment).timestamp() if moment else None)
+
+    def balances(self) -> typing.Dict[str, float]:
+        accounts = self.account.list()
+        if not isinstance(accounts, list):
+            raise ValueError(accounts)
+        return {a['currency']: float(a['balance']) for a in accounts}
+
+    def levels(self, product_id: str, depth: int = 10) -> Levels:
+        book = self.product.book(product_id, {'level': 2})
+        if not isinstance(book, dict) or 'message' in book:
+            raise ValueError(book)
+        return {
+            side: [(float(p), float(s)) for p, s, *_ in book[side][:depth]]
+            for side in ('bids', 'asks')
+        }
+
 
 def get_messenger(key: str = None,
                   secret: str = None,
@@ -16,7 +16,7 @@
 from w3rw import __agent__
 from w3rw import __source__
 from w3rw import __version__
-from w3rw import __timeout__
+from w3rw import Dict
 from w3rw import Response
 
 from w3rw.cex.abstract import AbstractAPI
@@ -24,15 +24,36 @@ from w3rw.cex.abstract import AbstractAuth
 from w3rw.cex.abstract import AbstractMessenger
 from w3rw.cex.abstract import AbstractSubscriber
 
+from w3rw.cex.cache import Cache
+
+from w3rw.cex.decoder import Decoder
+
+from w3rw.cex.limiter import Bucket
+from w3rw.cex.limiter import Limiter
+
+from w3rw.cex.metrics import Metrics
+
+from w3rw.cex.page import Page
+
+from w3rw.cex.retry import Retry
+
+from w3rw.cex.session import __timeout__
+from w3rw.cex.session import Timeout
+from w3rw.cex.session import get_connections
+from w3rw.cex.session import get_session
+
 from requests.auth import AuthBase
 from requests.models import PreparedRequest
 
 import base64
 import dataclasses
+import functools
 import hmac
 import hashlib
 import requests
 import time
+import typing
+import urllib
 
 
 @dataclasses.dataclass
@@ -61,6 +82,9 @@ class API(AbstractAPI):
 
 
 class Auth(AbstractAuth, AuthBase):
+    # NOTE: The secret is decoded once and keyed into an HMAC that is only
+    # ever copied, never updated, so signing is safe across threads. The
+    # headers that never change are built once as well.
     def __init__(self,
                  key: str = None,
                  secret: str = None,
@@ -69,6 +93,14 @@ class Auth(AbstractAuth, AuthBase):
         self.__key = key if key else ''
         self.__secret = secret if secret else ''
         self.__passphrase = passphrase if passphrase else ''
+        self.__hmac = hmac.new(
+            base64.b64decode(self.__secret), digestmod=hashlib.sha256)
+        self.__headers = {
+            'Content-Type': 'application/json',
+            'User-Agent': f'{__agent__}/{__version__} {__source__}',
+            'CB-ACCESS-KEY': self.__key,
+            'CB-ACCESS-PASSPHRASE': self.__passphrase
+        }
 
     def __call__(self, request: PreparedRequest) -> PreparedRequest:
         timestamp = str(time.time())
@@ -79,30 +111,76 @@ class Auth(AbstractAuth, AuthBase):
         return request
 
     def signature(self, message: str) -> bytes:
-        key = base64.b64decode(self.__secret)
-        msg = message.encode('ascii')
-        sig = hmac.new(key, msg, hashlib.sha256)
+        sig = self.__hmac.copy()
+        sig.update(message.encode('ascii'))
         digest = sig.digest()
         b64signature = base64.b64encode(digest)
         return b64signature.decode('utf-8')
 
     def headers(self, timestamp: str, message: str) -> dict:
         return {
-            'Content-Type': 'application/json',
-            'User-Agent': f'{__agent__}/{__version__} {__source__}',
+            **self.__headers,
             'CB-ACCESS-TIMESTAMP': timestamp,
-            'CB-ACCESS-KEY': self.__key,
-            'CB-ACCESS-SIGN': self.signature(message),
-            'CB-ACCESS-PASSPHRASE': self.__passphrase
+            'CB-ACCESS-SIGN': self.signature(message)
         }
 
 
+def get_scope(method: str, endpoint: str) -> str:
+    # NOTE: https://docs.cloud.coinbase.com/exchange/docs/rate-limits
+    if endpoint.startswith(('/products', '/currencies', '/time')):
+        return 'public'
+    if endpoint.startswith('/orders') and method in ('POST', 'DELETE'):
+        return 'order'
+    return 'private'
+
+
+def get_limiter() -> Limiter:
+    # NOTE: Private requests are capped at 15 per second with bursts of 30.
+    # Orders get a dedicated share of that budget so that account and
+    # history queries can never starve order placement or cancellation.
+    return Limiter({
+        'public': Bucket(10, 15),
+        'private': Bucket(10, 20),
+        'order': Bucket(5, 10)
+    })
+
+
+def get_cache() -> Cache:
+    # NOTE: Reference data rarely changes, so it is cached per endpoint
+    return Cache({
+        r'/products': 300,
+        r'/products/[^/]+': 300,
+        r'/currencies': 3600,
+        r'/currencies/[^/]+': 3600,
+        r'/time': 1
+    })
+
+
+def get_retry() -> Retry:
+    return Retry()
+
+
 class Messenger(AbstractMessenger):
-    def __init__(self, auth: AbstractAuth = None):
+    def __init__(self,
+                 auth: AbstractAuth = None,
+                 limiter: Limiter = None,
+                 decoder: Decoder = None,
+                 cache: Cache = None,
+                 retry: Retry = None,
+                 session: requests.Session = None,
+                 timeout: Timeout = None,
+                 metrics: Metrics = None):
+
         self.__auth: AbstractAuth = auth
         self.__api: AbstractAPI = API()
-        self.__session: requests.Session = requests.Session()
-        self.__timeout: int = 30
+        self.__session: requests.Session = (
+            session if session else get_session())
+        self.__limiter: Limiter = limiter if limiter else get_limiter()
+        self.__decoder: Decoder = decoder if decoder else Decoder()
+        self.__cache: Cache = cache if cache else get_cache()
+        self.__retry: Retry = retry if retry else get_retry()
+        self.__timeout: Timeout = timeout if timeout else __timeout__
+        self.__metrics: Metrics = metrics
 
     @property
     def auth(self) -> AbstractAuth:
@@ -113,48 +191,126 @@ class Messenger(AbstractMessenger):
         return self.__api
 
     @property
-    def timeout(self) -> int:
+    def timeout(self) -> Timeout:
         return self.__timeout
 
     @property
     def session(self) -> requests.Session:
         return self.__session
 
+    @property
+    def limiter(self) -> Limiter:
+        return self.__limiter
+
+    @property
+    def decoder(self) -> Decoder:
+        return self.__decoder
+
+    @property
+    def cache(self) -> Cache:
+        return self.__cache
+
+    @property
+    def retry(self) -> Retry:
+        return self.__retry
+
+    @property
+    def metrics(self) -> Metrics:
+        return self.__metrics
+
+    def throttle(self, method: str, endpoint: str) -> float:
+        scope = get_scope(method, self.api.endpoint(endpoint))
+        return self.limiter.acquire(scope)
+
     def get(self, endpoint: str, data: dict = None) -> Response:
-        time.sleep(__timeout__)
-        return self.session.get(
+        endpoint = self.api.endpoint(endpoint)
+        if 'public' == get_scope('GET', endpoint):
+            return self.cache.fetch(
+                endpoint, data, lambda headers: self.__get(
+                    endpoint, data, headers))
+        return self.__get(endpoint, data)
+
+    def __get(self,
+              endpoint: str,
+              data: dict = None,
+              headers: dict = None) -> Response:
+
+        return self.retry.call(
+            'GET', endpoint, lambda: self.__send(
+                'GET', endpoint, params=data, headers=headers))
+
+    def __send(self, method: str, endpoint: str, **kwargs) -> Response:
+        if self.metrics is not None:
+            return self.__measure(method, endpoint, **kwargs)
+        self.throttle(method, endpoint)
+        return self.session.request(
+            method,
             self.api.path(endpoint),
-            params=data,
             auth=self.auth,
-            timeout=self.timeout
+            timeout=self.timeout,
+            **kwargs
         )
 
+    def __measure(self, method: str, endpoint: str, **kwargs) -> Response:
+        # NOTE: The same request as __send, prepared and signed in separate
+        # steps so that each phase can be timed
+        self.metrics.before(
+            method, endpoint, kwargs.get('params', kwargs.get('json')))
+        response = None
+        start = time.perf_counter()
+        self.throttle(method, endpoint)
+        waited = signed = time.perf_counter()
+        try:
+            request = self.session.prepare_request(requests.Request(
+                method, self.api.path(endpoint), **kwargs))
+            if self.auth:
+                request = self.auth(request)
+            signed = time.perf_counter()
+            settings = self.session.merge_environment_settings(
+                request.url, {}, None, None, None)
+            response = self.session.send(
+                request, timeout=self.timeout, **settings)
+            return response
+        finally:
+            end = time.perf_counter()
+            self.metrics.after(method, endpoint, response, {
+                'wait': waited - start,
+                'sign': signed - waited,
+                'network': end - signed,
+                'total': end - start
+            })
+
+    def __recover(self, client_oid: str) -> typing.Optional[Response]:
+        response = self.__send('GET', f'/orders/client:{client_oid}')
+        if 200 == response.status_code:
+            return response
+        if 404 == response.status_code:
+            return None
+        raise requests.HTTPError(response.text, response=response)
+
     def post(self, endpoint: str, data: dict = None) -> Response:
-        time.sleep(__timeout__)
-        return self.session.post(
-            self.api.path(endpoint),
-            json=data,
-            auth=self.auth,
-            timeout=self.timeout
-        )
+        # NOTE: An order with a `client_oid` is looked up before it is sent
+        # again, so a retried submission never places a second order
+        endpoint = self.api.endpoint(endpoint)
+        scope = get_scope('POST', endpoint)
+        recover = None
+        if 'order' == scope and data and data.get('client_oid'):
+            recover = functools.partial(self.__recover, data['client_oid'])
+        return self.retry.call(
+            'POST', endpoint, lambda: self.__send(
+                'POST', endpoint, json=data), recover)
 
     def put(self, endpoint: str, data: dict = None) -> Response:
-        time.sleep(__timeout__)
-        return self.session.put(
-            self.api.path(endpoint),
-            json=data,
-            auth=self.auth,
-            timeout=self.timeout
-        )
+        endpoint = self.api.endpoint(endpoint)
+        return self.retry.call(
+            'PUT', endpoint, lambda: self.__send(
+                'PUT', endpoint, json=data))
 
     def delete(self, endpoint: str, data: dict = None) -> Response:
-        time.sleep(__timeout__)
-        return self.session.delete(
-            self.api.path(endpoint),
-            json=data,
-            auth=self.auth,
-            timeout=self.timeout
-        )
+        endpoint = self.api.endpoint(endpoint)
+        return self.retry.call(
+            'DELETE', endpoint, lambda: self.__send(
+                'DELETE', endpoint, json=data))
 
     def page(self, endpoint: str, data: dict = None) -> Response:
         responses = []
@@ -172,6 +328,48 @@ class Messenger(AbstractMessenger):
             data['after'] = response.headers.get('CB-AFTER')
         return responses
 
+    def iter_pages(self,
+                   endpoint: str,
+                   data: dict = None,
+                   cursor: str = None) -> typing.Iterator[Page]:
+
+        data = dict(data) if data else {}
+        if cursor:
+            data['after'] = cursor
+        while True:
+            response = self.get(endpoint, data)
+            if 200 != response.status_code:
+                raise requests.HTTPError(response.text, response=response)
+            items = self.decode(response)
+            if not items:
+                break
+            cursor = response.headers.get('CB-AFTER')
+            yield Page(items, cursor)
+            if not cursor:
+                break
+            data['after'] = cursor
+
+    def iter_items(self,
+                   endpoint: str,
+                   data: dict = None,
+                   cursor: str = None) -> typing.Iterator[dict]:
+
+        for page in self.iter_pages(endpoint, data, cursor):
+            yield from page.items
+
+    def decode(self, response: Response) -> object:
+        if self.metrics is None:
+            return self.decoder.decode(response.content)
+        start = time.perf_counter()
+        payload = self.decoder.decode(response.content)
+        self.metrics.decode(
+            urllib.parse.urlsplit(response.url).path,
+            time.perf_counter() - start)
+        return payload
+
+    def connections(self) -> typing.Dict[str, dict]:
+        return get_connections(self.session)
+
     def close(self):
         self.session.close()
 
@@ -184,5 +382,8 @@ class Subscriber(AbstractSubscriber):
     def messenger(self) -> AbstractMessenger:
         return self.__messenger
 
+    def decode(self, response: Response) -> Dict:
+        return self.messenger.decode(response)
+
     def error(self, response: requests.Response) -> bool:
         return 200 != response.status_code
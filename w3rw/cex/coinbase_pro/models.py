@@ -0,0 +1,117 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import typing
+
+# NOTE: Records are tuples, so they carry no per instance __dict__ and
+# their fields are read through index based descriptors instead of hashed
+# keys. Prices and sizes keep the strings the exchange sent and missing
+# fields are None.
+
+
+class Ticker(typing.NamedTuple):
+    type: str
+    sequence: int
+    product_id: str
+    price: str
+    open_24h: str
+    volume_24h: str
+    low_24h: str
+    high_24h: str
+    volume_30d: str
+    best_bid: str
+    best_ask: str
+    side: str
+    time: str
+    trade_id: int
+    last_size: str
+
+    @classmethod
+    def from_message(cls, message: dict) -> 'Ticker':
+        return cls._make(map(message.get, cls._fields))
+
+
+class Match(typing.NamedTuple):
+    type: str
+    trade_id: int
+    maker_order_id: str
+    taker_order_id: str
+    side: str
+    size: str
+    price: str
+    product_id: str
+    sequence: int
+    time: str
+
+    @classmethod
+    def from_message(cls, message: dict) -> 'Match':
+        return cls._make(map(message.get, cls._fields))
+
+
+class L2Update(typing.NamedTuple):
+    type: str
+    product_id: str
+    time: str
+    changes: list
+
+    @classmethod
+    def from_message(cls, message: dict) -> 'L2Update':
+        return cls._make(map(message.get, cls._fields))
+
+
+class Fill(typing.NamedTuple):
+    created_at: str
+    trade_id: int
+    product_id: str
+    order_id: str
+    user_id: str
+    profile_id: str
+    liquidity: str
+    price: str
+    size: str
+    fee: str
+    side: str
+    settled: bool
+    usd_volume: str
+
+    @classmethod
+    def from_message(cls, message: dict) -> 'Fill':
+        return cls._make(map(message.get, cls._fields))
+
+
+class Candle(typing.NamedTuple):
+    time: int
+    low: float
+    high: float
+    open: float
+    close: float
+    volume: float
+
+    @classmethod
+    def from_message(cls, message: list) -> 'Candle':
+        return cls._make(message)
+
+
+__models__: typing.Dict[str, typing.Type[typing.NamedTuple]] = {
+    'ticker': Ticker,
+    'match': Match,
+    'last_match': Match,
+    'l2update': L2Update
+}
+
+
+def get_record(message: dict) -> object:
+    model = __models__.get(message.get('type'))
+    return message if model is None else model.from_message(message)
@@ -0,0 +1,31 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.coinbase_pro.models import get_record
+
+from w3rw.cex.router import Key
+from w3rw.cex.router import Router as BaseRouter
+
+
+class Router(BaseRouter):
+    # NOTE: Messages are keyed by their `type` and `product_id`, e.g.
+    # ('match', 'BTC-USD'). Heartbeats and errors carry no product.
+    def key(self, message: object) -> Key:
+        if not isinstance(message, dict):
+            return None, None
+        return message.get('type'), message.get('product_id')
+
+    def record(self, message: object) -> object:
+        return get_record(message)
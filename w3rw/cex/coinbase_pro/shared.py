@@ -0,0 +1,113 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.coinbase_pro.book import OrderBook
+from w3rw.cex.coinbase_pro.candles import get_epoch
+from w3rw.cex.coinbase_pro.client import Product
+from w3rw.cex.coinbase_pro.router import Router
+from w3rw.cex.coinbase_pro.socket import Stream
+
+from w3rw.cex.shared import __depth__
+from w3rw.cex.shared import __prefix__
+from w3rw.cex.shared import __trades__
+from w3rw.cex.shared import Publisher
+from w3rw.cex.shared import get_name
+
+import threading
+import typing
+
+
+class Ingest(object):
+    # NOTE: Owns the stream and the book of every product, and publishes
+    # each book and its trades to shared memory as they change. Any number
+    # of reader processes on the host can then follow them with a Reader,
+    # without a socket of their own and without pickling a single message.
+    def __init__(self,
+                 stream: Stream,
+                 product_ids: typing.List[str],
+                 product: Product,
+                 depth: int = __depth__,
+                 trades: int = __trades__,
+                 prefix: str = __prefix__):
+
+        self.__stream: Stream = stream
+        self.__depth: int = depth
+        self.__router: Router = Router()
+        self.__books: typing.Dict[str, OrderBook] = {}
+        self.__publishers: typing.Dict[str, Publisher] = {}
+        self.__levels: typing.Dict[str, dict] = {}
+        for product_id in product_ids:
+            self.__books[product_id] = OrderBook(product_id, product)
+            self.__publishers[product_id] = Publisher(
+                get_name(product_id, prefix), depth, trades)
+            self.__router.add(self.apply, None, product_id)
+
+    @property
+    def stream(self) -> Stream:
+        return self.__stream
+
+    @property
+    def books(self) -> typing.Dict[str, OrderBook]:
+        return dict(self.__books)
+
+    @property
+    def publishers(self) -> typing.Dict[str, Publisher]:
+        return dict(self.__publishers)
+
+    def subscribe(self) -> None:
+        # NOTE: The first message of each book is a gap, which seeds it
+        # from a level 3 snapshot
+        self.__stream.send({
+            'type': 'subscribe',
+            'product_ids': list(self.__books),
+            'channels': ['full']
+        })
+
+    def apply(self, message: dict) -> bool:
+        # NOTE: Trades are published apart from the book, so matches that
+        # arrive while the book is resyncing are never lost. The book is
+        # only published when its best `depth` levels have changed, e.g.
+        # never for a `received` message or a `done` deep in the book.
+        product_id = message.get('product_id')
+        book = self.__books.get(product_id)
+        if book is None:
+            return False
+        publisher = self.__publishers[product_id]
+        kind = message.get('type')
+        if 'match' == kind and message['sequence'] > book.sequence:
+            # NOTE: The side of a match is the maker's, so a sell is a
+            # buy by the taker, which is the side Kraken reports
+            publisher.trade(
+                get_epoch(message['time']),
+                float(message['price']),
+                float(message['size']),
+                'buy' if 'sell' == message['side'] else 'sell')
+        if not book.apply(message) or 'received' == kind:
+            return False
+        levels = book.depth(self.__depth)
+        if levels == self.__levels.get(product_id):
+            return False
+        self.__levels[product_id] = levels
+        publisher.publish(levels)
+        return True
+
+    def run(self, stop: threading.Event = None) -> None:
+        while self.__stream.connected and not (stop and stop.is_set()):
+            self.__router.route(self.__stream, timeout=1)
+
+    def close(self) -> None:
+        for publisher in self.__publishers.values():
+            publisher.close()
+            publisher.unlink()
@@ -13,11 +13,24 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.decoder import Decoder
+
+from w3rw.cex.coinbase_pro.models import get_record
+
+from w3rw.cex.metrics import Metrics
+
+from w3rw.cex.receiver import __size__
+from w3rw.cex.receiver import Receiver
+
+from dateutil.parser import isoparse
+
 import base64
+import copy
 import hashlib
 import hmac
 import json
 import time
+import typing
 import websocket
 
 
@@ -35,11 +48,21 @@ def get_message(value: dict = None) -> dict:
     return value
 
 
+def get_time(message: object) -> float:
+    # NOTE: Returns the epoch seconds a message was sent at, if it has one
+    moment = message.get('time') if isinstance(message, dict) else None
+    return isoparse(moment).timestamp() if moment else None
+
+
 class Token(object):
+    # NOTE: The secret is decoded and keyed into an HMAC once, and the
+    # HMAC is only ever copied, so tokens can be signed from any thread
     def __init__(self, key: str, secret: str, passphrase: str):
         self.__key = key
         self.__secret = secret
         self.__passphrase = passphrase
+        self.__hmac = hmac.new(
+            base64.b64decode(secret), digestmod=hashlib.sha256)
 
     def __call__(self) -> dict:
         timestamp = str(time.time())
@@ -52,43 +75,135 @@ class Token(object):
         }
 
     def signature(self, message: str) -> bytes:
-        key = base64.b64decode(self.__secret)
-        msg = message.encode('ascii')
-        sig = hmac.new(key, msg, hashlib.sha256)
+        sig = self.__hmac.copy()
+        sig.update(message.encode('ascii'))
         digest = sig.digest()
         b64signature = base64.b64encode(digest)
         return b64signature.decode('utf-8')
 
 
 class Stream(object):
-    def __init__(self, auth: Token = None, url: str = None, trace: bool = False):
+    def __init__(self,
+                 auth: Token = None,
+                 url: str = None,
+                 trace: bool = False,
+                 decoder: Decoder = None,
+                 metrics: Metrics = None):
+
         self.auth: Token = auth
         self.url: str = url if url else 'wss://ws-feed.pro.coinbase.com'
         self.trace: bool = trace
+        self.decoder: Decoder = decoder if decoder else Decoder()
+        self.metrics: Metrics = metrics
         self.timeout: int = 30
         self.socket: websocket.WebSocket = None
+        self.receiver: Receiver = None
+        self.subscriptions: list = []
 
     @property
     def connected(self) -> bool:
         return False if self.socket is None else self.socket.connected
 
+    def fileno(self) -> int:
+        return self.socket.fileno()
+
     def connect(self) -> bool:
         header = None if self.auth is None else self.auth()
         websocket.enableTrace(self.trace)
         self.socket = websocket.create_connection(url=self.url, header=header)
+        if self.receiver is not None:
+            self.receiver.start()
         return self.connected
 
-    def send(self, message: dict) -> None:
+    def send(self, message: dict, record: bool = True) -> None:
+        # NOTE: Subscription changes are recorded so that they can be
+        # replayed in order when the connection is re-established.
+        if record and message.get('type') in ('subscribe', 'unsubscribe'):
+            self.subscriptions.append(copy.deepcopy(message))
         if self.connected:
             self.socket.send(json.dumps(message))
 
-    def receive(self) -> dict:
+    def reconnect(self) -> bool:
+        self.disconnect()
+        if self.connect():
+            for message in self.subscriptions:
+                self.socket.send(json.dumps(message))
+        return self.connected
+
+    def start(self, size: int = __size__, policy: str = 'drop') -> Receiver:
+        # NOTE: Hands the socket to a receiver thread. From here on every
+        # read goes through its buffer, so never mix this with a Manager.
+        if self.receiver is None:
+            self.receiver = Receiver(self.__recv, size, policy)
+        if self.connected:
+            self.receiver.start()
+        return self.receiver
+
+    def stop(self) -> None:
+        # NOTE: The receiver thread is blocked reading the socket, and only
+        # closing it lets the read return, so the stream is disconnected
+        if self.receiver is not None:
+            self.disconnect()
+            self.receiver = None
+
+    def receive(self, typed: bool = False) -> dict:
+        if self.receiver is not None:
+            messages = self.receive_many(1, typed)
+            return messages[0][1] if messages else dict()
         if self.connected:
-            payload = self.socket.recv()
-            if payload:
-                return json.loads(payload)
+            message = self.decode(self.socket.recv(), typed)
+            if message is not None:
+                return message
         return dict()
 
+    def receive_many(self,
+                     count: int,
+                     typed: bool = False,
+                     timeout: float = None) -> typing.List[tuple]:
+
+        # NOTE: Returns up to `count` (received, message) pairs, where
+        # received is the epoch time the frame was read off the socket.
+        # Without a receiver this blocks until all of them have arrived.
+        if self.receiver is not None:
+            frames = self.receiver.get_many(count, timeout)
+        elif self.connected:
+            frames = [(time.time(), self.socket.recv()) for _ in range(count)]
+        else:
+            frames = []
+        messages = []
+        for received, payload in frames:
+            message = self.decode(payload, typed, received)
+            if message is not None:
+                messages.append((received, message))
+        return messages
+
+    def decode(self,
+               payload: object,
+               typed: bool = False,
+               received: float = None) -> object:
+
+        message = self.decoder.decode(payload)
+        if self.metrics is not None:
+            self.observe(payload, message, received)
+        if message is not None and typed:
+            return get_record(message)
+        return message
+
+    def __recv(self) -> object:
+        return self.socket.recv()
+
+    def observe(self,
+                payload: object,
+                message: object,
+                received: float = None) -> None:
+
+        # NOTE: Lag is the time from when the exchange sent the message
+        # until it was read off the socket
+        sent = get_time(message)
+        if sent is not None:
+            sent = (received or time.time()) - sent
+        self.metrics.message(self.decoder.peek(payload), len(payload), sent)
+
     def ping(self) -> None:
         payload = 'keepalive'
         while self.connected:
@@ -98,5 +213,11 @@ class Stream(object):
             time.sleep(self.timeout)
 
     def disconnect(self) -> None:
+        # NOTE: The receiver keeps its buffered frames, and resumes reading
+        # once the stream connects again
+        if self.receiver is not None:
+            self.receiver.stop()
         if self.connected:
             self.socket.close()
+        if self.receiver is not None:
+            self.receiver.join()
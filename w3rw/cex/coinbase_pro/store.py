@@ -0,0 +1,258 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.coinbase_pro.arrays import CANDLE
+from w3rw.cex.coinbase_pro.arrays import TRADE
+
+from w3rw.cex.coinbase_pro.backfill import Backfill
+from w3rw.cex.coinbase_pro.backfill import Range
+from w3rw.cex.coinbase_pro.backfill import get_windows
+
+from w3rw.cex.coinbase_pro.client import Product
+
+from w3rw.cex.pool import __workers__
+
+from dateutil.parser import isoparse
+
+import numpy
+import sqlite3
+import threading
+import time
+import typing
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS candles (
+    product_id TEXT NOT NULL,
+    granularity INTEGER NOT NULL,
+    time INTEGER NOT NULL,
+    low REAL, high REAL, open REAL, close REAL, volume REAL,
+    PRIMARY KEY (product_id, granularity, time)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coverage (
+    product_id TEXT NOT NULL,
+    granularity INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    PRIMARY KEY (product_id, granularity, start)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS trades (
+    product_id TEXT NOT NULL,
+    trade_id INTEGER NOT NULL,
+    time REAL, price REAL, size REAL, side TEXT,
+    PRIMARY KEY (product_id, trade_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS trades_time ON trades (product_id, time);
+'''
+
+
+def get_gaps(start: int, end: int, covered: typing.List[Range]) -> list:
+    # NOTE: `covered` must be sorted by start
+    gaps, cursor = [], start
+    for lower, upper in covered:
+        if upper <= cursor:
+            continue
+        if lower >= end:
+            break
+        if lower > cursor:
+            gaps.append((cursor, lower))
+        cursor = max(cursor, upper)
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+class Store(object):
+    # NOTE: History is kept in SQLite. Candle syncs record the ranges that
+    # have been downloaded, so later syncs only request what is missing
+    # even when the exchange returned no candles for a quiet period.
+    def __init__(self,
+                 path: str,
+                 product: Product,
+                 workers: int = __workers__):
+
+        self.__product: Product = product
+        self.__backfill: Backfill = Backfill(product, workers)
+        self.__lock: threading.Lock = threading.Lock()
+        self.__connection: sqlite3.Connection = sqlite3.connect(
+            path, check_same_thread=False)
+        self.__connection.executescript(SCHEMA)
+
+    @property
+    def product(self) -> Product:
+        return self.__product
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        return self.__connection
+
+    @property
+    def backfill(self) -> Backfill:
+        return self.__backfill
+
+    def close(self) -> None:
+        self.__connection.close()
+
+    def coverage(self, product_id: str, granularity: int) -> list:
+        with self.__lock:
+            return self.__connection.execute(
+                'SELECT start, end FROM coverage '
+                'WHERE product_id = ? AND granularity = ? ORDER BY start',
+                (product_id, granularity)
+            ).fetchall()
+
+    def missing(self,
+                product_id: str,
+                start: int,
+                end: int,
+                granularity: int) -> typing.List[Range]:
+
+        start = start - start % granularity
+        end = end + (-end) % granularity
+        return get_gaps(start, end, self.coverage(product_id, granularity))
+
+    def insert(self,
+               product_id: str,
+               granularity: int,
+               window: Range,
+               candles: list) -> int:
+
+        # NOTE: The current candle is still forming, so the range is only
+        # recorded up to the last completed candle
+        completed = int(time.time()) // granularity * granularity
+        covered = (window[0], min(window[1], completed))
+        with self.__lock, self.__connection:
+            self.__connection.executemany(
+                'INSERT OR REPLACE INTO candles '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(product_id, granularity, *candle) for candle in candles])
+            if covered[0] < covered[1]:
+                self.__cover(product_id, granularity, covered)
+        return len(candles)
+
+    def __cover(self, product_id: str, granularity: int, window: Range):
+        start, end = window
+        rows = self.__connection.execute(
+            'SELECT start, end FROM coverage WHERE product_id = ? AND '
+            'granularity = ? AND start <= ? AND end >= ?',
+            (product_id, granularity, end, start)).fetchall()
+        for lower, upper in rows:
+            start, end = min(start, lower), max(end, upper)
+        self.__connection.execute(
+            'DELETE FROM coverage WHERE product_id = ? AND granularity = ? '
+            'AND start <= ? AND end >= ?',
+            (product_id, granularity, end, start))
+        self.__connection.execute(
+            'INSERT INTO coverage VALUES (?, ?, ?, ?)',
+            (product_id, granularity, start, end))
+
+    def sync_candles(self,
+                     product_id: str,
+                     start: int,
+                     end: int,
+                     granularity: int) -> int:
+
+        # NOTE: Missing windows are fetched concurrently by the Backfill.
+        # Windows that fail are not recorded as synced and are requested
+        # again by the next sync.
+        windows = [
+            (product_id, *window, granularity)
+            for gap in self.missing(product_id, start, end, granularity)
+            for window in get_windows(*gap, granularity)
+        ]
+        count = 0
+        for result in self.__backfill.fetch_many(windows):
+            if result.ok:
+                count += self.insert(
+                    product_id, granularity, result.item[1:3], result.value)
+        return count
+
+    def candles(self,
+                product_id: str,
+                start: int,
+                end: int,
+                granularity: int) -> numpy.ndarray:
+
+        with self.__lock:
+            cursor = self.__connection.execute(
+                'SELECT time, low, high, open, close, volume FROM candles '
+                'WHERE product_id = ? AND granularity = ? '
+                'AND time >= ? AND time < ? ORDER BY time',
+                (product_id, granularity, start, end))
+            return numpy.fromiter(cursor, dtype=CANDLE)
+
+    def sync_trades(self, product_id: str, pages: int = None) -> int:
+        # NOTE: Trades are listed newest first. New trades are fetched down
+        # to the newest stored trade and committed at once, so a failed
+        # sync never leaves a hole. An empty store is seeded with the most
+        # recent page. Only when `pages` is given is the history extended
+        # further back from the oldest stored trade, by at most that many
+        # pages, since the full history is hundreds of thousands of them.
+        newest, _ = self.__bounds(product_id)
+        count = 0
+        rows = []
+        for page in self.__product.iter_trades(product_id):
+            if newest is None:
+                rows.extend(page.items)
+                break
+            rows.extend(t for t in page.items if t['trade_id'] > newest)
+            if not page.items or page.items[-1]['trade_id'] <= newest:
+                break
+        count += self.__trades(product_id, rows)
+        if not pages:
+            return count
+        _, oldest = self.__bounds(product_id)
+        cursor = None if oldest is None else str(oldest)
+        for index, page in enumerate(
+            self.__product.iter_trades(product_id, cursor=cursor)
+        ):
+            if index >= pages:
+                break
+            count += self.__trades(product_id, page.items)
+        return count
+
+    def __bounds(self, product_id: str) -> typing.Tuple[int, int]:
+        with self.__lock:
+            return self.__connection.execute(
+                'SELECT MAX(trade_id), MIN(trade_id) FROM trades '
+                'WHERE product_id = ?', (product_id,)).fetchone()
+
+    def __trades(self, product_id: str, trades: list) -> int:
+        rows = [(
+            product_id,
+            trade['trade_id'],
+            isoparse(trade['time']).timestamp(),
+            float(trade['price']),
+            float(trade['size']),
+            trade['side']
+        ) for trade in trades]
+        with self.__lock, self.__connection:
+            self.__connection.executemany(
+                'INSERT OR IGNORE INTO trades VALUES (?, ?, ?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def trades(self,
+               product_id: str,
+               start: float,
+               end: float) -> numpy.ndarray:
+
+        with self.__lock:
+            cursor = self.__connection.execute(
+                'SELECT trade_id, time, price, size, side FROM trades '
+                'WHERE product_id = ? AND time >= ? AND time < ? '
+                'ORDER BY time, trade_id',
+                (product_id, start, end))
+            return numpy.fromiter(
+                ((i, t, p, s, d.encode()) for i, t, p, s, d in cursor),
+                dtype=TRADE)
@@ -0,0 +1,101 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import decimal
+import functools
+import json
+import re
+import typing
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+Payload = typing.Union[str, bytes, bytearray, memoryview]
+
+# NOTE: Kraken channel messages are arrays that end with the channel name
+# and the pair, e.g. [42, {...}, "book-10", "XBT/USD"]
+__channel__ = re.compile(rb'"([^"]*)"\s*,\s*"[^"]*"\s*\]\s*$')
+
+
+@functools.lru_cache(maxsize=None)
+def get_pattern(key: str) -> typing.Pattern:
+    return re.compile(rb'"' + re.escape(key.encode()) + rb'"\s*:\s*"([^"]*)"')
+
+
+class Decoder(object):
+    # NOTE: Prices and sizes are sent as JSON strings by every exchange and
+    # are never touched here, so they stay exact. Setting `decimal` parses
+    # the remaining JSON numbers as Decimal. That requires the standard
+    # library parser because orjson has no parse_float hook.
+    def __init__(self,
+                 decimal: bool = False,
+                 ignore: typing.Iterable[str] = None,
+                 key: str = 'type',
+                 backend: str = None):
+
+        if backend is None:
+            backend = 'orjson' if orjson and not decimal else 'json'
+        if 'orjson' == backend and (orjson is None or decimal):
+            raise ValueError('orjson is unavailable or decimal is set')
+        self.__decimal: bool = decimal
+        self.__backend: str = backend
+        self.__key: str = key
+        self.__ignore: typing.FrozenSet[str] = frozenset(ignore or ())
+        self.__loads: typing.Callable = self.__get_loads()
+
+    @property
+    def backend(self) -> str:
+        return self.__backend
+
+    @property
+    def decimal(self) -> bool:
+        return self.__decimal
+
+    @property
+    def key(self) -> str:
+        return self.__key
+
+    @property
+    def ignore(self) -> typing.FrozenSet[str]:
+        return self.__ignore
+
+    def __get_loads(self) -> typing.Callable:
+        if 'orjson' == self.__backend:
+            return orjson.loads
+        if self.__decimal:
+            return functools.partial(json.loads, parse_float=decimal.Decimal)
+        return json.loads
+
+    def peek(self, payload: Payload, key: str = None) -> typing.Optional[str]:
+        # NOTE: Finds the first "key": "value" pair without decoding the
+        # payload. Kraken arrays yield their channel name instead.
+        if isinstance(payload, str):
+            payload = payload.encode()
+        if payload[:1] == b'[':
+            match = __channel__.search(payload)
+        else:
+            match = get_pattern(key or self.__key).search(payload)
+        return match.group(1).decode() if match else None
+
+    def decode(self, payload: Payload) -> object:
+        if not payload:
+            return None
+        if self.__ignore and self.peek(payload) in self.__ignore:
+            return None
+        if isinstance(payload, memoryview) and 'json' == self.__backend:
+            payload = payload.tobytes()
+        return self.__loads(payload)
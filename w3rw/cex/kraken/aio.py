@@ -0,0 +1,176 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw import __offset__
+from w3rw import __limit__
+
+from w3rw.cex.abstract import AbstractAPI
+from w3rw.cex.abstract import AbstractAuth
+from w3rw.cex.abstract import AbstractMessenger
+
+from w3rw.cex.kraken.messenger import API
+from w3rw.cex.kraken.messenger import get_cost
+from w3rw.cex.kraken.messenger import get_limiter
+from w3rw.cex.kraken.messenger import get_scope
+
+from w3rw.cex.decoder import Decoder
+
+from w3rw.cex.limiter import Limiter
+
+from w3rw.cex.page import Page
+
+import asyncio
+import httpx
+import typing
+
+
+class AsyncMessenger(AbstractMessenger):
+    def __init__(self,
+                 auth: AbstractAuth,
+                 limiter: Limiter = None,
+                 decoder: Decoder = None,
+                 connections: int = 100):
+
+        self.__auth: AbstractAuth = auth
+        self.__api: AbstractAPI = API()
+        self.__timeout: int = 30
+        self.__limiter: Limiter = limiter if limiter else get_limiter()
+        self.__decoder: Decoder = decoder if decoder else Decoder()
+        self.__session: httpx.AsyncClient = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=connections,
+                max_keepalive_connections=connections
+            ),
+            timeout=self.__timeout
+        )
+
+    @property
+    def auth(self) -> AbstractAuth:
+        return self.__auth
+
+    @property
+    def api(self) -> AbstractAPI:
+        return self.__api
+
+    @property
+    def timeout(self) -> int:
+        return self.__timeout
+
+    @property
+    def session(self) -> httpx.AsyncClient:
+        return self.__session
+
+    @property
+    def limiter(self) -> Limiter:
+        return self.__limiter
+
+    @property
+    def decoder(self) -> Decoder:
+        return self.__decoder
+
+    async def throttle(self, method: str, endpoint: str) -> float:
+        endpoint = self.api.endpoint(endpoint)
+        scope = get_scope(method, endpoint)
+        delay = self.limiter.reserve(scope, get_cost(endpoint))
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    async def get(self, endpoint: str, data: dict = None) -> httpx.Response:
+        await self.throttle('GET', endpoint)
+        endpoint = self.api.endpoint(endpoint)
+        if not data:
+            data = {}
+        data['nonce'] = self.auth.nonce
+        return await self.session.get(
+            self.api.path(endpoint),
+            params=data,
+            headers=self.auth(endpoint, data)
+        )
+
+    async def post(self, endpoint: str, data: dict = None) -> httpx.Response:
+        await self.throttle('POST', endpoint)
+        endpoint = self.api.endpoint(endpoint)
+        if not data:
+            data = {}
+        data['nonce'] = self.auth.nonce
+        return await self.session.post(
+            self.api.path(endpoint),
+            data=data,
+            headers=self.auth(endpoint, data)
+        )
+
+    async def page(self, endpoint: str, data: dict = None) -> list:
+        responses = []
+        if not data:
+            data = {}
+        data['ofs'] = 0
+        while data['ofs'] < __limit__:
+            response = await self.post(endpoint, data)
+            ok = 200 == response.status_code
+            error = response.json().get('error')
+            if not ok or error:
+                return [response]
+            if not response.json().get('result'):
+                break
+            responses.append(response)
+            data['ofs'] += __offset__
+        return responses
+
+    async def iter_pages(self,
+                         endpoint: str,
+                         data: dict = None,
+                         cursor: int = None) -> typing.AsyncIterator[Page]:
+
+        data = dict(data) if data else {}
+        data['ofs'] = cursor if cursor else 0
+        while True:
+            response = await self.post(endpoint, data)
+            if 200 != response.status_code:
+                raise httpx.HTTPStatusError(
+                    response.text, request=response.request, response=response)
+            payload = self.decoder.decode(response.content)
+            if payload.get('error'):
+                raise ValueError(', '.join(payload['error']))
+            result = payload.get('result')
+            records = next(
+                (v for v in result.values() if isinstance(v, dict)), None
+            ) if result else None
+            if not records:
+                break
+            cursor = data['ofs'] + len(records)
+            done = cursor >= result.get('count', 0)
+            yield Page(list(records.items()), None if done else cursor)
+            if done:
+                break
+            data['ofs'] = cursor
+
+    async def iter_items(self,
+                         endpoint: str,
+                         data: dict = None,
+                         cursor: int = None) -> typing.AsyncIterator[tuple]:
+
+        async for page in self.iter_pages(endpoint, data, cursor):
+            for item in page.items:
+                yield item
+
+    async def close(self) -> None:
+        await self.session.aclose()
+
+    async def __aenter__(self) -> 'AsyncMessenger':
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
@@ -0,0 +1,64 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.arrays import get_array
+
+import numpy
+import typing
+
+# NOTE: Fields follow the column order of the REST API
+# https://docs.kraken.com/rest/#tag/Market-Data
+OHLC = numpy.dtype([
+    ('time', 'i8'),
+    ('open', 'f8'),
+    ('high', 'f8'),
+    ('low', 'f8'),
+    ('close', 'f8'),
+    ('vwap', 'f8'),
+    ('volume', 'f8'),
+    ('count', 'i8')
+])
+
+LEVEL = numpy.dtype([
+    ('price', 'f8'),
+    ('volume', 'f8'),
+    ('time', 'f8')
+])
+
+TRADE = numpy.dtype([
+    ('price', 'f8'),
+    ('volume', 'f8'),
+    ('time', 'f8'),
+    ('side', 'S1'),
+    ('type', 'S1')
+])
+
+
+def get_ohlc(ohlc: list) -> numpy.ndarray:
+    return get_array(ohlc, OHLC)
+
+
+def get_levels(levels: list) -> numpy.ndarray:
+    return get_array(levels, LEVEL)
+
+
+def get_book(book: dict) -> typing.Tuple[numpy.ndarray, numpy.ndarray]:
+    return (get_levels(book.get('bids', [])),
+            get_levels(book.get('asks', [])))
+
+
+def get_trades(trades: list) -> numpy.ndarray:
+    # NOTE: The trailing misc and trade id columns are not kept
+    return get_array([trade[:5] for trade in trades], TRADE)
@@ -0,0 +1,183 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.book import Ladder
+
+from w3rw.cex.kraken.socket import Stream
+
+import typing
+import zlib
+
+Level = typing.Tuple[float, float]
+
+
+def get_fragment(price: str, volume: str) -> bytes:
+    # NOTE: https://docs.kraken.com/websockets/#book-checksum
+    price = price.replace('.', '').lstrip('0')
+    volume = volume.replace('.', '').lstrip('0')
+    return f'{price}{volume}'.encode()
+
+
+class OrderBook(object):
+    # NOTE: Each level stores (volume, fragment) where the fragment is the
+    # level's contribution to the checksum string. It is built once when
+    # the level changes, so verifying a message only feeds the best 10
+    # fragments of each side to crc32 instead of formatting the book.
+    def __init__(self, pair: str, depth: int = 10):
+        self.__pair: str = pair
+        self.__depth: int = depth
+        self.__bids: Ladder = Ladder(descending=True)
+        self.__asks: Ladder = Ladder()
+        self.__ready: bool = False
+        self.__mismatches: int = 0
+
+    @property
+    def pair(self) -> str:
+        return self.__pair
+
+    @property
+    def depth(self) -> int:
+        return self.__depth
+
+    @property
+    def bids(self) -> Ladder:
+        return self.__bids
+
+    @property
+    def asks(self) -> Ladder:
+        return self.__asks
+
+    @property
+    def ready(self) -> bool:
+        return self.__ready
+
+    @property
+    def mismatches(self) -> int:
+        return self.__mismatches
+
+    def clear(self) -> None:
+        self.__bids.clear()
+        self.__asks.clear()
+        self.__ready = False
+
+    def checksum(self) -> int:
+        crc = 0
+        for _, (_, fragment) in self.__asks.top(10):
+            crc = zlib.crc32(fragment, crc)
+        for _, (_, fragment) in self.__bids.top(10):
+            crc = zlib.crc32(fragment, crc)
+        return crc
+
+    def apply(self, message: list) -> bool:
+        # NOTE: [channelID, {...}, ({...},) channelName, pair]
+        checksum = None
+        for payload in message[1:-2]:
+            if 'as' in payload or 'bs' in payload:
+                self.clear()
+                self.__update(self.__asks, payload.get('as', []))
+                self.__update(self.__bids, payload.get('bs', []))
+                self.__ready = True
+                continue
+            if not self.__ready:
+                return False
+            self.__update(self.__asks, payload.get('a', []))
+            self.__update(self.__bids, payload.get('b', []))
+            checksum = payload.get('c', checksum)
+        self.__asks.truncate(self.__depth)
+        self.__bids.truncate(self.__depth)
+        if checksum is not None and int(checksum) != self.checksum():
+            self.__mismatches += 1
+            self.clear()
+            return False
+        return True
+
+    def __update(self, ladder: Ladder, levels: list) -> None:
+        for level in levels:
+            price, volume = level[0], level[1]
+            size = float(volume)
+            if size:
+                ladder.set(float(price), (size, get_fragment(price, volume)))
+            else:
+                ladder.remove(float(price))
+
+    def best_bid(self) -> typing.Optional[Level]:
+        best = self.__bids.best()
+        return None if best is None else (best[0], best[1][0])
+
+    def best_ask(self) -> typing.Optional[Level]:
+        best = self.__asks.best()
+        return None if best is None else (best[0], best[1][0])
+
+    def top(self, n: int = 10) -> typing.Dict[str, typing.List[Level]]:
+        return {
+            'bids': [(p, v[0]) for p, v in self.__bids.top(n)],
+            'asks': [(p, v[0]) for p, v in self.__asks.top(n)]
+        }
+
+
+class OrderBooks(object):
+    def __init__(self, stream: Stream, depth: int = 10):
+        self.__stream: Stream = stream
+        self.__depth: int = depth
+        self.__books: typing.Dict[str, OrderBook] = {}
+
+    @property
+    def stream(self) -> Stream:
+        return self.__stream
+
+    @property
+    def depth(self) -> int:
+        return self.__depth
+
+    def __getitem__(self, pair: str) -> OrderBook:
+        return self.__books[pair]
+
+    def __contains__(self, pair: str) -> bool:
+        return pair in self.__books
+
+    def message(self, event: str, pairs: typing.List[str]) -> dict:
+        return {
+            'event': event,
+            'pair': list(pairs),
+            'subscription': {'name': 'book', 'depth': self.__depth}
+        }
+
+    def subscribe(self, pairs: typing.List[str]) -> bool:
+        for pair in pairs:
+            self.__books.setdefault(pair, OrderBook(pair, self.__depth))
+        return self.__stream.send(self.message('subscribe', pairs))
+
+    def resubscribe(self, pair: str) -> bool:
+        # NOTE: Kraken sends a fresh snapshot for every new subscription.
+        # The pair stays subscribed, so neither message is recorded for
+        # the stream to replay when it reconnects.
+        self.__books[pair].clear()
+        self.__stream.send(self.message('unsubscribe', [pair]), False)
+        return self.__stream.send(self.message('subscribe', [pair]), False)
+
+    def apply(self, message: object) -> typing.Optional[OrderBook]:
+        if not isinstance(message, list) or len(message) < 4:
+            return None
+        name, pair = message[-2], message[-1]
+        if not name.startswith('book') or pair not in self.__books:
+            return None
+        book = self.__books[pair]
+        mismatches = book.mismatches
+        if not book.apply(message) and book.mismatches != mismatches:
+            self.resubscribe(pair)
+        return book
+
+    def update(self) -> typing.Optional[OrderBook]:
+        return self.apply(self.__stream.receive())
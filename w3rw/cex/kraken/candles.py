@@ -0,0 +1,91 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.candles import __granularities__
+from w3rw.cex.candles import __size__
+from w3rw.cex.candles import Aggregator
+
+from w3rw.cex.kraken.client import Market
+
+from w3rw.cex.kraken.models import Trade
+
+import typing
+
+# NOTE: The REST OHLC intervals in minutes
+__intervals__: typing.Tuple[int, ...] = (
+    1, 5, 15, 30, 60, 240, 1440, 10080, 21600
+)
+
+
+class Candles(Aggregator):
+    # NOTE: Builds the bars of a single pair from its `trade` messages, as
+    # positional arrays or lists of Trade records
+    def __init__(self,
+                 pair: str,
+                 granularities: typing.Iterable[int] = __granularities__,
+                 size: int = __size__):
+
+        super().__init__(granularities, size)
+        self.__pair: str = pair
+
+    @property
+    def pair(self) -> str:
+        return self.__pair
+
+    def apply(self, message: object) -> bool:
+        # NOTE: Trades and Trade records both start with price, volume, time
+        if not isinstance(message, list) or not message:
+            return False
+        if isinstance(message[0], Trade):
+            trades = [t for t in message if t.pair == self.__pair]
+        elif len(message) >= 4 and 'trade' == message[-2]:
+            trades = message[1] if message[-1] == self.__pair else []
+        else:
+            return False
+        updated = False
+        for trade in trades:
+            updated = self.update(
+                float(trade[2]), float(trade[0]), float(trade[1])) or updated
+        return updated
+
+    def seed(self, granularity: int, ohlc: typing.List[list]) -> int:
+        # NOTE: Each row is [time, open, high, low, close, vwap, volume,
+        # count], and the last row is the bar that is still open
+        series = self[granularity]
+        return sum(
+            series.seed(
+                row[0], float(row[1]), float(row[2]), float(row[3]),
+                float(row[4]), float(row[6]), int(row[7]))
+            for row in ohlc
+        )
+
+    def fetch(self, market: Market) -> int:
+        # NOTE: Seeds every granularity the REST OHLC supports. Finer
+        # ones, such as 1s, are only built from the stream.
+        seeded = 0
+        for granularity in self.granularities:
+            interval, remainder = divmod(granularity, 60)
+            if remainder or interval not in __intervals__:
+                continue
+            response = market.ohlc({
+                'pair': self.__pair.replace('/', ''),
+                'interval': interval
+            })
+            if not isinstance(response, dict) or response.get('error'):
+                raise ValueError(response)
+            for key, ohlc in response['result'].items():
+                if 'last' != key:
+                    seeded += self.seed(granularity, ohlc)
+        return seeded
@@ -0,0 +1,158 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw import Dict
+
+from w3rw.cex.abstract import AbstractClient
+
+from w3rw.cex.kraken.messenger import Auth
+from w3rw.cex.kraken.messenger import Messenger
+from w3rw.cex.kraken.messenger import Subscriber
+
+from w3rw.cex.registry import Levels
+from w3rw.cex.registry import Quote
+
+import typing
+
+# NOTE: The array helpers require the optional numpy dependency
+try:
+    from w3rw.cex.kraken import arrays
+except ImportError:
+    arrays = None
+
+
+class Market(Subscriber):
+    def time(self) -> Dict:
+        return self.decode(self.messenger.get('/public/Time'))
+
+    def assets(self, data: dict = None) -> Dict:
+        return self.decode(self.messenger.get('/public/Assets', data))
+
+    def pairs(self, data: dict = None) -> Dict:
+        return self.decode(self.messenger.get('/public/AssetPairs', data))
+
+    def ticker(self, data: dict) -> Dict:
+        return self.decode(self.messenger.get('/public/Ticker', data))
+
+    def ohlc(self, data: dict) -> Dict:
+        return self.decode(self.messenger.get('/public/OHLC', data))
+
+    def depth(self, data: dict) -> Dict:
+        return self.decode(self.messenger.get('/public/Depth', data))
+
+    def trades(self, data: dict) -> Dict:
+        return self.decode(self.messenger.get('/public/Trades', data))
+
+    def spread(self, data: dict) -> Dict:
+        return self.decode(self.messenger.get('/public/Spread', data))
+
+    def __result(self, payload: dict) -> dict:
+        if arrays is None:
+            raise ImportError('numpy is required for arrays')
+        if payload.get('error'):
+            raise ValueError(', '.join(payload['error']))
+        # NOTE: `last` is the cursor for the next request, not a pair
+        return {
+            k: v for k, v in payload['result'].items() if 'last' != k
+        }
+
+    def ohlc_array(self, data: dict) -> typing.Dict[str, object]:
+        result = self.__result(self.ohlc(data))
+        return {pair: arrays.get_ohlc(v) for pair, v in result.items()}
+
+    def depth_array(self, data: dict) -> typing.Dict[str, tuple]:
+        result = self.__result(self.depth(data))
+        return {pair: arrays.get_book(v) for pair, v in result.items()}
+
+    def trade_array(self, data: dict) -> typing.Dict[str, object]:
+        result = self.__result(self.trades(data))
+        return {pair: arrays.get_trades(v) for pair, v in result.items()}
+
+
+class User(Subscriber):
+    def balance(self) -> Dict:
+        return self.decode(self.messenger.post('/private/Balance'))
+
+    def trade_balance(self, data: dict = None) -> Dict:
+        return self.decode(self.messenger.post(
+            '/private/TradeBalance', data))
+
+    def open_orders(self, data: dict = None) -> Dict:
+        return self.decode(self.messenger.post('/private/OpenOrders', data))
+
+
+def get_result(payload: Dict) -> dict:
+    if not isinstance(payload, dict) or payload.get('error'):
+        raise ValueError(payload)
+    return payload['result']
+
+
+class Client(AbstractClient):
+    def __init__(self, messenger: Messenger):
+        self.__messenger = messenger
+
+        self.market = Market(messenger)
+        self.user = User(messenger)
+
+    @property
+    def label(self):
+        return 'kraken'
+
+    @property
+    def messenger(self):
+        return self.__messenger
+
+    def markets(self) -> typing.Dict[str, typing.Tuple[str, str]]:
+        # NOTE: Each pair is known by its key, e.g. XXBTZUSD, its altname,
+        # e.g. XBTUSD, and its websocket name, e.g. XBT/USD
+        markets = {}
+        for key, pair in get_result(self.market.pairs()).items():
+            assets = pair['base'], pair['quote']
+            markets[key] = assets
+            for name in ('altname', 'wsname'):
+                if pair.get(name):
+                    markets[pair[name]] = assets
+        return markets
+
+    def quote(self, pair: str) -> Quote:
+        result = get_result(self.market.ticker({'pair': pair}))
+        ticker = next(iter(result.values()))
+        return Quote(
+            self.label,
+            pair,
+            float(ticker['b'][0]),
+            float(ticker['a'][0]),
+            float(ticker['c'][0]),
+            None)
+
+    def balances(self) -> typing.Dict[str, float]:
+        result = get_result(self.user.balance())
+        return {asset: float(amount) for asset, amount in result.items()}
+
+    def levels(self, pair: str, depth: int = 10) -> Levels:
+        result = get_result(self.market.depth({'pair': pair, 'count': depth}))
+        book = next(iter(result.values()))
+        return {
+            side: [(float(p), float(v)) for p, v, *_ in book[side][:depth]]
+            for side in ('bids', 'asks')
+        }
+
+
+def get_messenger(key: str = None, secret: str = None) -> Messenger:
+    return Messenger(Auth(key, secret))
+
+
+def get_client(key: str = None, secret: str = None) -> Client:
+    return Client(Messenger(Auth(key, secret)))
@@ -18,7 +18,7 @@ from w3rw import __source__
 from w3rw import __version__
 from w3rw import __offset__
 from w3rw import __limit__
-from w3rw import __timeout__
+from w3rw import Dict
 from w3rw import Response
 
 from w3rw.cex.abstract import AbstractAPI
@@ -26,12 +26,35 @@ from w3rw.cex.abstract import AbstractAuth
 from w3rw.cex.abstract import AbstractMessenger
 from w3rw.cex.abstract import AbstractSubscriber
 
+from w3rw.cex.cache import Cache
+
+from w3rw.cex.decoder import Decoder
+
+from w3rw.cex.kraken.nonce import Nonce
+from w3rw.cex.kraken.nonce import get_nonce
+
+from w3rw.cex.limiter import Bucket
+from w3rw.cex.limiter import Counter
+from w3rw.cex.limiter import Limiter
+
+from w3rw.cex.metrics import Metrics
+
+from w3rw.cex.page import Page
+
+from w3rw.cex.retry import Retry
+
+from w3rw.cex.session import __timeout__
+from w3rw.cex.session import Timeout
+from w3rw.cex.session import get_connections
+from w3rw.cex.session import get_session
+
 import base64
 import dataclasses
 import hashlib
 import hmac
 import requests
 import time
+import typing
 import urllib
 
 
@@ -62,37 +85,127 @@ class API(AbstractAPI):
 
 
 class Auth(AbstractAuth):
-    def __init__(self, key: str = None, secret: str = None):
-        self.__key = key
-        self.__secret = secret
+    # NOTE: The secret is decoded once and keyed into an HMAC that is only
+    # ever copied, never updated, so signing is safe across threads. The
+    # headers that never change are built once as well.
+    def __init__(self,
+                 key: str = None,
+                 secret: str = None,
+                 nonce: Nonce = None):
 
-    def __call__(self, endpoint: str, data: dict) -> dict:
-        return {
+        self.__key = key if key else ''
+        self.__secret = secret if secret else ''
+        self.__nonce = nonce if nonce else get_nonce()
+        self.__hmac = hmac.new(
+            base64.b64decode(self.__secret), digestmod=hashlib.sha512)
+        self.__headers = {
             'User-Agent': f'{__agent__}/{__version__} {__source__}',
-            'API-Key': self.__key,
-            'API-Sign': self.signature(endpoint, data)
+            'API-Key': self.__key
         }
 
+    def __call__(self, endpoint: str, data: dict) -> dict:
+        return {**self.__headers, 'API-Sign': self.signature(endpoint, data)}
+
     @property
     def nonce(self) -> str:
-        return str(int(1000 * time.time()))
+        return str(self.__nonce())
 
     def signature(self, endpoint: str, data: dict) -> bytes:
-        key = base64.b64decode(self.__secret)
         post = urllib.parse.urlencode(data)
         encoded = (str(data['nonce']) + post).encode()
         message = endpoint.encode() + hashlib.sha256(encoded).digest()
-        mac = hmac.new(key, message, hashlib.sha512)
+        mac = self.__hmac.copy()
+        mac.update(message)
         signature = base64.b64encode(mac.digest())
         return signature.decode()
 
 
+def get_scope(method: str, endpoint: str) -> str:
+    # NOTE: https://docs.kraken.com/rest/#section/Rate-Limits
+    name = endpoint.rsplit('/', 1)[-1]
+    if '/public/' in endpoint:
+        return 'public'
+    if name in ('AddOrder', 'AddOrderBatch', 'EditOrder',
+                'CancelOrder', 'CancelOrderBatch', 'CancelAll'):
+        return 'order'
+    return 'private'
+
+
+def get_cost(endpoint: str) -> int:
+    # NOTE: Ledger and trade history queries increase the counter by 2
+    name = endpoint.rsplit('/', 1)[-1]
+    if name in ('Ledgers', 'QueryLedgers', 'TradesHistory', 'QueryTrades'):
+        return 2
+    return 1
+
+
+def get_limiter() -> Limiter:
+    # NOTE: The private counter defaults to the Starter tier (max 15,
+    # decaying by 0.33 per second). Orders are metered by the matching
+    # engine instead and do not affect the REST counter.
+    return Limiter({
+        'public': Bucket(1, 1),
+        'private': Counter(15, 0.33),
+        'order': Counter(60, 1)
+    })
+
+
+def get_cache() -> Cache:
+    # NOTE: Reference data rarely changes, so it is cached per endpoint
+    return Cache({
+        r'/0/public/Assets': 3600,
+        r'/0/public/AssetPairs': 3600,
+        r'/0/public/Time': 1
+    })
+
+
+def is_refused(response: requests.Response) -> bool:
+    # NOTE: Kraken reports these with a 200 status, and none of them are
+    # processed, so even an order can safely be sent again. The errors are
+    # listed first in every payload, so only its head is searched.
+    head = response.content[:128]
+    return any(error in head for error in (
+        b'EAPI:Invalid nonce',
+        b'EAPI:Rate limit exceeded',
+        b'EOrder:Rate limit exceeded',
+        b'EService:Unavailable'
+    ))
+
+
+def get_retry() -> Retry:
+    # NOTE: Every private request is a POST, but queries and cancellations
+    # change nothing when they are sent twice, unlike orders or withdrawals
+    return Retry(refused=is_refused, idempotent=(
+        r'/0/private/(Balance|BalanceEx|TradeBalance|TradeVolume)',
+        r'/0/private/(OpenOrders|ClosedOrders|QueryOrders|CancelOrder)',
+        r'/0/private/(TradesHistory|QueryTrades|OpenPositions)',
+        r'/0/private/(Ledgers|QueryLedgers|GetWebSocketsToken)',
+        r'/0/private/(DepositMethods|DepositStatus)',
+        r'/0/private/(WithdrawInfo|WithdrawStatus|ExportStatus)'
+    ))
+
+
 class Messenger(AbstractMessenger):
-    def __init__(self, auth: AbstractAuth):
+    def __init__(self,
+                 auth: AbstractAuth,
+                 limiter: Limiter = None,
+                 decoder: Decoder = None,
+                 cache: Cache = None,
+                 retry: Retry = None,
+                 session: requests.Session = None,
+                 timeout: Timeout = None,
+                 metrics: Metrics = None):
+
         self.__auth: AbstractAuth = auth
         self.__api: AbstractAPI = API()
-        self.__session: requests.Session = requests.Session()
-        self.__timeout: int = 30
+        self.__session: requests.Session = (
+            session if session else get_session())
+        self.__limiter: Limiter = limiter if limiter else get_limiter()
+        self.__decoder: Decoder = decoder if decoder else Decoder()
+        self.__cache: Cache = cache if cache else get_cache()
+        self.__retry: Retry = retry if retry else get_retry()
+        self.__timeout: Timeout = timeout if timeout else __timeout__
+        self.__metrics: Metrics = metrics
 
     @property
     def auth(self) -> AbstractAuth:
@@ -103,38 +216,117 @@ class Messenger(AbstractMessenger):
         return self.__api
 
     @property
-    def timeout(self) -> int:
+    def timeout(self) -> Timeout:
         return self.__timeout
 
     @property
     def session(self) -> requests.Session:
         return self.__session
 
+    @property
+    def limiter(self) -> Limiter:
+        return self.__limiter
+
+    @property
+    def decoder(self) -> Decoder:
+        return self.__decoder
+
+    @property
+    def cache(self) -> Cache:
+        return self.__cache
+
+    @property
+    def retry(self) -> Retry:
+        return self.__retry
+
+    @property
+    def metrics(self) -> Metrics:
+        return self.__metrics
+
+    def throttle(self, method: str, endpoint: str) -> float:
+        endpoint = self.api.endpoint(endpoint)
+        scope = get_scope(method, endpoint)
+        return self.limiter.acquire(scope, get_cost(endpoint))
+
     def get(self, endpoint: str, data: dict = None) -> Response:
-        time.sleep(__timeout__)
         endpoint = self.api.endpoint(endpoint)
+        if 'public' == get_scope('GET', endpoint):
+            return self.cache.fetch(
+                endpoint, data, lambda headers: self.__get(
+                    endpoint, data, headers))
+        return self.__get(endpoint, data)
+
+    def __get(self,
+              endpoint: str,
+              data: dict = None,
+              headers: dict = None) -> Response:
+
         if not data:
             data = {}
+        return self.retry.call(
+            'GET', endpoint, lambda: self.__send(
+                'GET', endpoint, data, headers))
+
+    def __send(self,
+               method: str,
+               endpoint: str,
+               data: dict,
+               headers: dict = None) -> Response:
+
+        # NOTE: Every attempt is signed with a fresh nonce
+        if self.metrics is not None:
+            return self.__measure(method, endpoint, data, headers)
+        self.throttle(method, endpoint)
         data['nonce'] = self.auth.nonce
-        return self.session.get(
+        payload = 'params' if 'GET' == method else 'data'
+        return self.session.request(
+            method,
             self.api.path(endpoint),
-            params=data,
-            headers=self.auth(endpoint, data),
-            timeout=self.timeout
+            headers={**self.auth(endpoint, data), **(headers or {})},
+            timeout=self.timeout,
+            **{payload: data}
         )
 
+    def __measure(self,
+                  method: str,
+                  endpoint: str,
+                  data: dict,
+                  headers: dict = None) -> Response:
+
+        self.metrics.before(method, endpoint, data)
+        response = None
+        start = time.perf_counter()
+        self.throttle(method, endpoint)
+        waited = signed = time.perf_counter()
+        try:
+            data['nonce'] = self.auth.nonce
+            headers = {**self.auth(endpoint, data), **(headers or {})}
+            signed = time.perf_counter()
+            payload = 'params' if 'GET' == method else 'data'
+            response = self.session.request(
+                method,
+                self.api.path(endpoint),
+                headers=headers,
+                timeout=self.timeout,
+                **{payload: data}
+            )
+            return response
+        finally:
+            end = time.perf_counter()
+            self.metrics.after(method, endpoint, response, {
+                'wait': waited - start,
+                'sign': signed - waited,
+                'network': end - signed,
+                'total': end - start
+            })
+
     def post(self, endpoint: str, data: dict = None) -> Response:
-        time.sleep(__timeout__)
         endpoint = self.api.endpoint(endpoint)
         if not data:
             data = {}
-        data['nonce'] = self.auth.nonce
-        return self.session.post(
-            self.api.path(endpoint),
-            data=data,
-            headers=self.auth(endpoint, data),
-            timeout=self.timeout
-        )
+        return self.retry.call(
+            'POST', endpoint, lambda: self.__send(
+                'POST', endpoint, data))
 
     def page(self, endpoint: str, data: dict = None) -> Response:
         responses = []
@@ -153,6 +345,54 @@ class Messenger(AbstractMessenger):
             data['ofs'] += __offset__
         return responses
 
+    def iter_pages(self,
+                   endpoint: str,
+                   data: dict = None,
+                   cursor: int = None) -> typing.Iterator[Page]:
+
+        data = dict(data) if data else {}
+        data['ofs'] = cursor if cursor else 0
+        while True:
+            response = self.post(endpoint, data)
+            if 200 != response.status_code:
+                raise requests.HTTPError(response.text, response=response)
+            payload = self.decode(response)
+            if payload.get('error'):
+                raise ValueError(', '.join(payload['error']))
+            result = payload.get('result')
+            records = next(
+                (v for v in result.values() if isinstance(v, dict)), None
+            ) if result else None
+            if not records:
+                break
+            cursor = data['ofs'] + len(records)
+            done = cursor >= result.get('count', 0)
+            yield Page(list(records.items()), None if done else cursor)
+            if done:
+                break
+            data['ofs'] = cursor
+
+    def iter_items(self,
+                   endpoint: str,
+                   data: dict = None,
+                   cursor: int = None) -> typing.Iterator[tuple]:
+
+        for page in self.iter_pages(endpoint, data, cursor):
+            yield from page.items
+
+    def decode(self, response: Response) -> object:
+        if self.metrics is None:
+            return self.decoder.decode(response.content)
+        start = time.perf_counter()
+        payload = self.decoder.decode(response.content)
+        self.metrics.decode(
+            urllib.parse.urlsplit(response.url).path,
+            time.perf_counter() - start)
+        return payload
+
+    def connections(self) -> typing.Dict[str, dict]:
+        return get_connections(self.session)
+
     def close(self) -> None:
         self.session.close()
 
@@ -165,5 +405,8 @@ class Subscriber(AbstractSubscriber):
     def messenger(self) -> AbstractMessenger:
         return self.__messenger
 
+    def decode(self, response: Response) -> Dict:
+        return self.messenger.decode(response)
+
     def error(self, response: requests.Response) -> bool:
         return not response.json()['error']
@@ -0,0 +1,58 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import typing
+
+# NOTE: Kraken channel messages are positional arrays,
+# e.g. [channelID, [[price, volume, time, ...], ...], "trade", "XBT/USD"]
+# https://docs.kraken.com/websockets/#message-trade
+
+
+class Trade(typing.NamedTuple):
+    price: str
+    volume: str
+    time: str
+    side: str
+    type: str
+    misc: str
+    pair: str
+
+    @classmethod
+    def from_message(cls, message: list) -> typing.List['Trade']:
+        pair = message[-1]
+        return [cls(*trade[:6], pair) for trade in message[1]]
+
+
+class Spread(typing.NamedTuple):
+    bid: str
+    ask: str
+    time: str
+    bid_volume: str
+    ask_volume: str
+    pair: str
+
+    @classmethod
+    def from_message(cls, message: list) -> 'Spread':
+        return cls(*message[1][:5], message[-1])
+
+
+def get_record(message: object) -> object:
+    if not isinstance(message, list) or len(message) < 4:
+        return message
+    if 'trade' == message[-2]:
+        return Trade.from_message(message)
+    if 'spread' == message[-2]:
+        return Spread.from_message(message)
+    return message
@@ -0,0 +1,83 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import threading
+import time
+import typing
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# NOTE: The shared counter is stored as a fixed width decimal, so it can
+# be rewritten in place without truncating the file
+__width__: int = 20
+
+__nonces__: typing.Dict[typing.Optional[str], 'Nonce'] = {}
+__lock__: threading.Lock = threading.Lock()
+
+
+class Nonce(object):
+    # NOTE: Kraken rejects any nonce that is not greater than the last one
+    # it saw for a key. Values are microseconds since the Unix Epoch and
+    # always exceed the previous value, even when the clock stalls or
+    # steps back. Setting `path` shares the counter with every process
+    # that uses the same file, which is locked while the counter advances.
+    def __init__(self, path: str = None):
+        if path is not None and fcntl is None:
+            raise ValueError('a shared nonce requires fcntl')
+        self.__path: typing.Optional[str] = path
+        self.__lock: threading.Lock = threading.Lock()
+        self.__last: int = 0
+
+    @property
+    def path(self) -> typing.Optional[str]:
+        return self.__path
+
+    @property
+    def last(self) -> int:
+        return self.__last
+
+    def __call__(self) -> int:
+        with self.__lock:
+            value = max(time.time_ns() // 1000, self.__last + 1)
+            if self.__path is not None:
+                value = self.__share(value)
+            self.__last = value
+            return value
+
+    def __share(self, value: int) -> int:
+        # NOTE: The file is opened on every call, so a forked process never
+        # shares a lock with its parent through an inherited descriptor
+        fd = os.open(self.__path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            stored = os.pread(fd, __width__, 0).strip()
+            value = max(value, int(stored or 0) + 1)
+            os.pwrite(fd, str(value).rjust(__width__).encode(), 0)
+            return value
+        finally:
+            os.close(fd)
+
+
+def get_nonce(path: str = None) -> Nonce:
+    # NOTE: Every Auth in a process shares one Nonce for each path, so two
+    # messengers using the same key can never send the same value
+    with __lock__:
+        if path not in __nonces__:
+            __nonces__[path] = Nonce(path)
+        return __nonces__[path]
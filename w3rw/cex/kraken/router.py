@@ -0,0 +1,66 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.kraken.models import get_record
+
+from w3rw.cex.router import Key
+from w3rw.cex.router import Router as BaseRouter
+
+import typing
+
+
+class Router(BaseRouter):
+    # NOTE: Channel messages are keyed by the subscription name and pair,
+    # e.g. ('book', 'XBT/USD') for a 'book-10' message, and events by
+    # their `event`, e.g. ('heartbeat', None). The channelID of each
+    # subscriptionStatus is mapped to its key once, so public messages
+    # are routed by their leading channelID alone.
+    def __init__(self, typed: bool = False):
+        super().__init__(typed)
+        self.__channels: typing.Dict[int, Key] = {}
+
+    @property
+    def channels(self) -> typing.Dict[int, Key]:
+        return dict(self.__channels)
+
+    def key(self, message: object) -> Key:
+        if isinstance(message, list) and message:
+            if isinstance(message[0], int):
+                key = self.__channels.get(message[0])
+                if key is None:
+                    key = message[-2].split('-')[0], message[-1]
+                return key
+            # NOTE: Private channels carry no channelID or pair, e.g.
+            # [[{...}], "ownTrades", {"sequence": 1}]
+            return message[1], None
+        if isinstance(message, dict):
+            event = message.get('event')
+            if 'subscriptionStatus' == event:
+                self.status(message)
+            return event, message.get('pair')
+        return None, None
+
+    def status(self, message: dict) -> None:
+        channel_id = message.get('channelID')
+        if channel_id is None:
+            return
+        if 'subscribed' == message.get('status'):
+            name = message.get('subscription', {}).get('name')
+            self.__channels[channel_id] = name, message.get('pair')
+        else:
+            self.__channels.pop(channel_id, None)
+
+    def record(self, message: object) -> object:
+        return get_record(message)
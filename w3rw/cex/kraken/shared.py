@@ -0,0 +1,98 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.kraken.book import OrderBooks
+from w3rw.cex.kraken.router import Router
+from w3rw.cex.kraken.socket import Stream
+
+from w3rw.cex.shared import __depth__
+from w3rw.cex.shared import __prefix__
+from w3rw.cex.shared import __trades__
+from w3rw.cex.shared import Publisher
+from w3rw.cex.shared import get_name
+
+import threading
+import typing
+
+
+class Ingest(object):
+    # NOTE: Owns the stream and the book of every pair, and publishes each
+    # book and its trades to shared memory as they change. See the
+    # Coinbase Pro Ingest.
+    def __init__(self,
+                 stream: Stream,
+                 pairs: typing.List[str],
+                 depth: int = __depth__,
+                 trades: int = __trades__,
+                 prefix: str = __prefix__):
+
+        self.__stream: Stream = stream
+        self.__pairs: typing.List[str] = list(pairs)
+        self.__depth: int = depth
+        self.__books: OrderBooks = OrderBooks(stream, depth)
+        self.__router: Router = Router()
+        self.__publishers: typing.Dict[str, Publisher] = {}
+        for pair in self.__pairs:
+            self.__publishers[pair] = Publisher(
+                get_name(pair, prefix), depth, trades)
+            self.__router.add(self.apply, 'book', pair)
+            self.__router.add(self.apply, 'trade', pair)
+
+    @property
+    def stream(self) -> Stream:
+        return self.__stream
+
+    @property
+    def books(self) -> OrderBooks:
+        return self.__books
+
+    @property
+    def publishers(self) -> typing.Dict[str, Publisher]:
+        return dict(self.__publishers)
+
+    def subscribe(self) -> None:
+        self.__books.subscribe(self.__pairs)
+        self.__stream.send({
+            'event': 'subscribe',
+            'pair': list(self.__pairs),
+            'subscription': {'name': 'trade'}
+        })
+
+    def apply(self, message: list) -> bool:
+        publisher = self.__publishers.get(message[-1])
+        if publisher is None:
+            return False
+        if 'trade' == message[-2]:
+            for price, volume, moment, side, *_ in message[1]:
+                publisher.trade(
+                    float(moment),
+                    float(price),
+                    float(volume),
+                    'buy' if 'b' == side else 'sell')
+            return True
+        book = self.__books.apply(message)
+        if book is None or not book.ready:
+            return False
+        publisher.publish(book.top(self.__depth))
+        return True
+
+    def run(self, stop: threading.Event = None) -> None:
+        while self.__stream.connected and not (stop and stop.is_set()):
+            self.__router.route(self.__stream, timeout=1)
+
+    def close(self) -> None:
+        for publisher in self.__publishers.values():
+            publisher.close()
+            publisher.unlink()
@@ -1,9 +1,20 @@
+from w3rw.cex.decoder import Decoder
+
+from w3rw.cex.kraken.models import get_record
+
 from w3rw.cex.kraken.messenger import Auth
 from w3rw.cex.kraken.messenger import Messenger
 
+from w3rw.cex.metrics import Metrics
+
+from w3rw.cex.receiver import __size__
+from w3rw.cex.receiver import Receiver
+
+import copy
 import json
 import websocket
 import time
+import typing
 
 
 # Array of currency pairs.
@@ -26,6 +37,18 @@ def get_message(value: dict = None) -> dict:
     return value
 
 
+def get_time(message: object) -> float:
+    # NOTE: Only trades and spreads carry the time they happened at, e.g.
+    # [channelID, [[price, volume, time, ...]], "trade", "XBT/USD"]
+    if not isinstance(message, list) or len(message) < 4:
+        return None
+    if 'trade' == message[-2] and message[1]:
+        return float(message[1][-1][2])
+    if 'spread' == message[-2]:
+        return float(message[1][2])
+    return None
+
+
 class Token(object):
     def __init__(self, key: str, secret: str):
         self.__messenger = Messenger(Auth(key, secret))
@@ -52,23 +75,44 @@ class Token(object):
 
 
 class Stream(object):
-    def __init__(self, auth: Token = None, url: str = None, trace: bool = False):
+    def __init__(self,
+                 auth: Token = None,
+                 url: str = None,
+                 trace: bool = False,
+                 decoder: Decoder = None,
+                 metrics: Metrics = None):
+
         self.auth: Token = auth
         self.url: str = url if url else 'wss://ws.kraken.com'
         self.trace: bool = trace
+        self.decoder: Decoder = decoder if decoder else Decoder(key='event')
+        self.metrics: Metrics = metrics
         self.timeout: int = 30
         self.socket: websocket.WebSocket = None
+        self.receiver: Receiver = None
+        self.subscriptions: list = []
 
     @property
     def connected(self) -> bool:
         return False if self.socket is None else self.socket.connected
 
+    def fileno(self) -> int:
+        return self.socket.fileno()
+
     def connect(self) -> bool:
         websocket.enableTrace(self.trace)
         self.socket = websocket.create_connection(self.url)
+        if self.receiver is not None:
+            self.receiver.start()
         return self.connected
 
-    def send(self, params: dict) -> bool:
+    def send(self, params: dict, record: bool = True) -> bool:
+        # NOTE: Subscription changes are recorded before the token is
+        # added so that a replay after reconnecting requests a fresh one.
+        # A change that leaves the subscriptions as they were, such as an
+        # unsubscribe followed by the same subscribe, need not be recorded.
+        if record and params.get('event') in ('subscribe', 'unsubscribe'):
+            self.subscriptions.append(copy.deepcopy(params))
         if self.connected:
             if self.auth and 'subscription' in params:
                 params['subscription'].update({'token': self.auth()})
@@ -77,12 +121,90 @@ class Stream(object):
             return True
         return False
 
-    def receive(self) -> dict:
+    def reconnect(self) -> bool:
+        self.disconnect()
+        if self.connect():
+            for params in self.subscriptions:
+                params = copy.deepcopy(params)
+                if self.auth and 'subscription' in params:
+                    params['subscription'].update({'token': self.auth()})
+                self.socket.send(json.dumps(params))
+        return self.connected
+
+    def start(self, size: int = __size__, policy: str = 'drop') -> Receiver:
+        # NOTE: Hands the socket to a receiver thread. From here on every
+        # read goes through its buffer, so never mix this with a Manager.
+        if self.receiver is None:
+            self.receiver = Receiver(self.__recv, size, policy)
         if self.connected:
-            payload = self.socket.recv()
-            return json.loads(payload)
+            self.receiver.start()
+        return self.receiver
+
+    def stop(self) -> None:
+        # NOTE: The receiver thread is blocked reading the socket, and only
+        # closing it lets the read return, so the stream is disconnected
+        if self.receiver is not None:
+            self.disconnect()
+            self.receiver = None
+
+    def receive(self, typed: bool = False) -> dict:
+        if self.receiver is not None:
+            messages = self.receive_many(1, typed)
+            return messages[0][1] if messages else dict()
+        if self.connected:
+            message = self.decode(self.socket.recv(), typed)
+            if message is not None:
+                return message
         return dict()
 
+    def receive_many(self,
+                     count: int,
+                     typed: bool = False,
+                     timeout: float = None) -> typing.List[tuple]:
+
+        # NOTE: Returns up to `count` (received, message) pairs, where
+        # received is the epoch time the frame was read off the socket.
+        # Without a receiver this blocks until all of them have arrived.
+        if self.receiver is not None:
+            frames = self.receiver.get_many(count, timeout)
+        elif self.connected:
+            frames = [(time.time(), self.socket.recv()) for _ in range(count)]
+        else:
+            frames = []
+        messages = []
+        for received, payload in frames:
+            message = self.decode(payload, typed, received)
+            if message is not None:
+                messages.append((received, message))
+        return messages
+
+    def decode(self,
+               payload: object,
+               typed: bool = False,
+               received: float = None) -> object:
+
+        message = self.decoder.decode(payload)
+        if self.metrics is not None:
+            self.observe(payload, message, received)
+        if message is not None and typed:
+            return get_record(message)
+        return message
+
+    def __recv(self) -> object:
+        return self.socket.recv()
+
+    def observe(self,
+                payload: object,
+                message: object,
+                received: float = None) -> None:
+
+        # NOTE: Lag is the time from when the exchange sent the message
+        # until it was read off the socket
+        sent = get_time(message)
+        if sent is not None:
+            sent = (received or time.time()) - sent
+        self.metrics.message(self.decoder.peek(payload), len(payload), sent)
+
     def ping(self) -> None:
         payload = 'keepalive'
         while self.connected:
@@ -92,7 +214,13 @@ class Stream(object):
             time.sleep(self.timeout)
 
     def disconnect(self) -> bool:
-        if self.connected:
+        # NOTE: The receiver keeps its buffered frames, and resumes reading
+        # once the stream connects again
+        if self.receiver is not None:
+            self.receiver.stop()
+        closed = self.connected
+        if closed:
             self.socket.close()
-            return True
-        return False
+        if self.receiver is not None:
+            self.receiver.join()
+        return closed
@@ -0,0 +1,110 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import threading
+import time
+import typing
+
+
+class Bucket(object):
+    def __init__(self, rate: float, capacity: float):
+        self.__rate: float = float(rate)
+        self.__capacity: float = float(capacity)
+        self.__tokens: float = float(capacity)
+        self.__stamp: float = time.monotonic()
+        self.__lock: threading.Lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self.__rate
+
+    @property
+    def capacity(self) -> float:
+        return self.__capacity
+
+    @property
+    def tokens(self) -> float:
+        with self.__lock:
+            self.__refill(time.monotonic())
+            return self.__tokens
+
+    def __refill(self, now: float) -> None:
+        elapsed = now - self.__stamp
+        if elapsed > 0:
+            self.__tokens = min(
+                self.__capacity, self.__tokens + elapsed * self.__rate)
+            self.__stamp = now
+
+    def reserve(self, cost: float = 1.0) -> float:
+        # NOTE: Tokens are taken up front and may go negative. The caller
+        # owns the returned delay, which keeps waiters in FIFO order and
+        # lets the lock be released before anyone sleeps.
+        with self.__lock:
+            self.__refill(time.monotonic())
+            self.__tokens -= cost
+            if self.__tokens >= 0:
+                return 0.0
+            return -self.__tokens / self.__rate
+
+    def acquire(self, cost: float = 1.0) -> float:
+        delay = self.reserve(cost)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class Counter(Bucket):
+    # NOTE: Kraken models its limits as a call counter that increases
+    # with every request and decays over time. That is a token bucket
+    # viewed from the other side, so only the vocabulary changes here.
+    # https://docs.kraken.com/rest/#section/Rate-Limits
+    def __init__(self, limit: float, decay: float):
+        super(Counter, self).__init__(decay, limit)
+
+    @property
+    def limit(self) -> float:
+        return self.capacity
+
+    @property
+    def decay(self) -> float:
+        return self.rate
+
+    @property
+    def counter(self) -> float:
+        return self.capacity - self.tokens
+
+
+class Limiter(object):
+    def __init__(self, buckets: typing.Dict[str, Bucket]):
+        self.__buckets: typing.Dict[str, Bucket] = dict(buckets)
+
+    @property
+    def buckets(self) -> typing.Dict[str, Bucket]:
+        return dict(self.__buckets)
+
+    def bucket(self, scope: str) -> Bucket:
+        return self.__buckets.get(scope)
+
+    def reserve(self, scope: str, cost: float = 1.0) -> float:
+        bucket = self.__buckets.get(scope)
+        if bucket is None:
+            return 0.0
+        return bucket.reserve(cost)
+
+    def acquire(self, scope: str, cost: float = 1.0) -> float:
+        delay = self.reserve(scope, cost)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
@@ -0,0 +1,189 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import copy
+import random
+import selectors
+import time
+import typing
+
+# NOTE: The field that lists the products of a subscription message
+# differs between Coinbase Pro ('product_ids') and Kraken ('pair').
+__keys__: typing.Tuple[str, ...] = ('product_ids', 'pair')
+
+
+class Manager(object):
+    # NOTE: Multiplexes a small pool of Stream objects on one thread. A
+    # selector waits on every socket at once, heartbeats are sent from the
+    # same loop, and dropped streams are reconnected with jittered
+    # exponential backoff, replaying their recorded subscriptions.
+    def __init__(self,
+                 factory: typing.Callable[[], object],
+                 size: int = 1,
+                 interval: float = 30,
+                 backoff: float = 1,
+                 limit: float = 60):
+
+        self.__streams: list = [factory() for _ in range(max(1, size))]
+        self.__interval: float = interval
+        self.__backoff: float = backoff
+        self.__limit: float = limit
+        self.__selector: selectors.BaseSelector = selectors.DefaultSelector()
+        self.__attempts: typing.Dict[int, int] = {}
+        self.__pending: typing.Dict[int, float] = {}
+        self.__heartbeat: float = time.monotonic() + interval
+        self.__reconnects: int = 0
+
+    @property
+    def streams(self) -> list:
+        return list(self.__streams)
+
+    @property
+    def reconnects(self) -> int:
+        return self.__reconnects
+
+    @property
+    def connected(self) -> bool:
+        return all(stream.connected for stream in self.__streams)
+
+    def connect(self) -> bool:
+        for index, stream in enumerate(self.__streams):
+            try:
+                stream.connect()
+                self.__register(index)
+            except Exception:
+                self.__schedule(index)
+        return self.connected
+
+    def disconnect(self) -> None:
+        for index, stream in enumerate(self.__streams):
+            self.__unregister(index)
+            stream.disconnect()
+        self.__pending.clear()
+
+    def subscribe(self, message: dict) -> None:
+        # NOTE: The products are dealt across the pool round robin, so each
+        # socket carries an even share of the subscription.
+        key = next((k for k in __keys__ if k in message), None)
+        if key is None:
+            self.__streams[0].send(message)
+            return
+        products = list(message[key])
+        size = len(self.__streams)
+        for index, stream in enumerate(self.__streams):
+            share = products[index::size]
+            if share:
+                part = copy.deepcopy(message)
+                part[key] = share
+                stream.send(part)
+
+    def unsubscribe(self, message: dict) -> None:
+        for stream in self.__streams:
+            stream.send(copy.deepcopy(message))
+
+    def receive(self, timeout: float = None) -> typing.Optional[object]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self.__maintain()
+            ready = self.__buffered()
+            if not ready:
+                wait = self.__wait(deadline)
+                if wait is not None and wait <= 0:
+                    return None
+                if not self.__selector.get_map():
+                    time.sleep(wait if wait is not None else self.__backoff)
+                    continue
+                ready = [
+                    key.data for key, _ in self.__selector.select(wait)
+                ]
+            for index in ready:
+                stream = self.__streams[index]
+                try:
+                    message = stream.receive()
+                except Exception:
+                    self.__schedule(index)
+                    continue
+                if not stream.connected:
+                    self.__schedule(index)
+                elif message:
+                    return message
+
+    def __iter__(self) -> typing.Iterator[object]:
+        while True:
+            yield self.receive()
+
+    def __buffered(self) -> typing.List[int]:
+        # NOTE: TLS sockets may hold decrypted bytes that select() can't see
+        ready = []
+        for index, stream in enumerate(self.__streams):
+            sock = getattr(stream.socket, 'sock', None)
+            pending = getattr(sock, 'pending', None)
+            if stream.connected and pending and pending():
+                ready.append(index)
+        return ready
+
+    def __wait(self, deadline: float = None) -> typing.Optional[float]:
+        now = time.monotonic()
+        events = [self.__heartbeat] + list(self.__pending.values())
+        wait = max(0.0, min(events) - now)
+        if deadline is not None:
+            return min(wait, deadline - now)
+        return wait
+
+    def __maintain(self) -> None:
+        now = time.monotonic()
+        for index, when in list(self.__pending.items()):
+            if when <= now:
+                self.__reconnect(index)
+        if self.__heartbeat <= now:
+            self.__heartbeat = now + self.__interval
+            for index, stream in enumerate(self.__streams):
+                if not stream.connected:
+                    continue
+                try:
+                    stream.socket.ping('keepalive')
+                except Exception:
+                    self.__schedule(index)
+
+    def __reconnect(self, index: int) -> None:
+        del self.__pending[index]
+        try:
+            if self.__streams[index].reconnect():
+                self.__reconnects += 1
+                self.__attempts.pop(index, None)
+                self.__register(index)
+                return
+        except Exception:
+            pass
+        self.__schedule(index)
+
+    def __schedule(self, index: int) -> None:
+        self.__unregister(index)
+        attempt = self.__attempts.get(index, 0)
+        self.__attempts[index] = attempt + 1
+        delay = min(self.__limit, self.__backoff * 2 ** attempt)
+        self.__pending[index] = time.monotonic() + random.uniform(
+            delay / 2, delay)
+
+    def __register(self, index: int) -> None:
+        self.__unregister(index)
+        self.__selector.register(
+            self.__streams[index], selectors.EVENT_READ, index)
+
+    def __unregister(self, index: int) -> None:
+        try:
+            self.__selector.unregister(self.__streams[index])
+        except (KeyError, ValueError):
+            pass
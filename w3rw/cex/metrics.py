@@ -0,0 +1,286 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import collections
+import functools
+import re
+import threading
+import time
+import typing
+
+# NOTE: Each power of two is split into 2 ** __bits__ sub-buckets, which
+# bounds the error of any recorded value to about 3%
+__bits__: int = 5
+
+__quantiles__: typing.Tuple[float, ...] = (0.5, 0.9, 0.99, 0.999)
+
+# NOTE: The request phases, in the order they happen
+__phases__: typing.Tuple[str, ...] = (
+    'wait', 'sign', 'network', 'decode', 'total'
+)
+
+# NOTE: Path segments that hold an id, e.g. a UUID or a number, are folded
+# together so that every order or account shares one route. Versions such
+# as /0/ and /v2/ are too short to match.
+__id__ = re.compile(r'(?<=/)(?=[^/]*\d)[^/]{4,}(?=/|$)')
+
+Hook = typing.Callable[..., None]
+
+
+@functools.lru_cache(maxsize=1024)
+def get_route(endpoint: str) -> str:
+    # NOTE: Product ids have no digits, so they are kept, e.g. BTC-USD
+    return __id__.sub(':id', endpoint.split('?', 1)[0])
+
+
+def get_index(value: int) -> int:
+    # NOTE: Values below 2 ** (__bits__ + 1) are exact. Every larger value
+    # keeps only its __bits__ + 1 most significant bits.
+    size = 1 << __bits__
+    if value < 2 * size:
+        return value
+    shift = value.bit_length() - __bits__ - 1
+    return shift * size + (value >> shift)
+
+
+def get_value(index: int) -> int:
+    # NOTE: Returns the upper bound of the bucket
+    size = 1 << __bits__
+    if index < 2 * size:
+        return index
+    shift = index // size - 1
+    return ((index - shift * size + 1) << shift) - 1
+
+
+class Histogram(object):
+    # NOTE: An HDR-style histogram over microseconds. Recording only
+    # increments one counter of a log-linear bucket, so it costs the same
+    # for any value and never stores the samples themselves.
+    def __init__(self):
+        self.__lock: threading.Lock = threading.Lock()
+        self.__counts: typing.Dict[int, int] = collections.defaultdict(int)
+        self.__count: int = 0
+        self.__total: int = 0
+        self.__min: int = 0
+        self.__max: int = 0
+
+    @property
+    def count(self) -> int:
+        return self.__count
+
+    @property
+    def total(self) -> float:
+        return self.__total / 1e6
+
+    @property
+    def min(self) -> float:
+        return self.__min / 1e6
+
+    @property
+    def max(self) -> float:
+        return self.__max / 1e6
+
+    @property
+    def mean(self) -> float:
+        return self.__total / self.__count / 1e6 if self.__count else 0.0
+
+    def record(self, seconds: float) -> None:
+        value = max(0, int(seconds * 1e6))
+        with self.__lock:
+            self.__counts[get_index(value)] += 1
+            if not self.__count or value < self.__min:
+                self.__min = value
+            if value > self.__max:
+                self.__max = value
+            self.__count += 1
+            self.__total += value
+
+    def quantile(self, q: float) -> float:
+        with self.__lock:
+            rank = q * self.__count
+            seen = 0
+            for index in sorted(self.__counts):
+                seen += self.__counts[index]
+                if seen >= rank:
+                    return min(get_value(index), self.__max) / 1e6
+        return 0.0
+
+    def as_dict(self) -> dict:
+        result = {
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.mean
+        }
+        for q in __quantiles__:
+            result[f'p{q * 100:g}'] = self.quantile(q)
+        return result
+
+
+class Metrics(object):
+    # NOTE: Messengers and Streams only report to a Metrics instance when
+    # one is given, so instrumentation costs nothing by default. Latency
+    # is kept per route and phase, counters per route and per channel.
+    def __init__(self):
+        self.__lock: threading.Lock = threading.Lock()
+        self.__latency: typing.Dict[tuple, Histogram] = {}
+        self.__lag: typing.Dict[str, Histogram] = {}
+        self.__requests: typing.Dict[tuple, int] = collections.Counter()
+        self.__bytes: typing.Dict[str, int] = collections.Counter()
+        self.__messages: typing.Dict[str, int] = collections.Counter()
+        self.__received: typing.Dict[str, int] = collections.Counter()
+        self.__started: float = time.monotonic()
+        self.__before: typing.List[Hook] = []
+        self.__after: typing.List[Hook] = []
+
+    def on_request(self, hook: Hook) -> Hook:
+        # NOTE: Called as hook(method, endpoint, data) before each attempt
+        self.__before.append(hook)
+        return hook
+
+    def on_response(self, hook: Hook) -> Hook:
+        # NOTE: Called as hook(method, endpoint, response, timings) after
+        # each attempt, where timings maps each phase to seconds
+        self.__after.append(hook)
+        return hook
+
+    def before(self, method: str, endpoint: str, data: dict = None) -> None:
+        for hook in self.__before:
+            hook(method, endpoint, data)
+
+    def after(self,
+              method: str,
+              endpoint: str,
+              response: object,
+              timings: typing.Dict[str, float]) -> None:
+
+        route = get_route(endpoint)
+        status = getattr(response, 'status_code', 0)
+        for phase, seconds in timings.items():
+            self.histogram(route, phase).record(seconds)
+        with self.__lock:
+            self.__requests[(method, route, status)] += 1
+            if response is not None:
+                self.__bytes[route] += len(response.content)
+        for hook in self.__after:
+            hook(method, endpoint, response, timings)
+
+    def histogram(self, route: str, phase: str) -> Histogram:
+        key = (route, phase)
+        histogram = self.__latency.get(key)
+        if histogram is None:
+            with self.__lock:
+                histogram = self.__latency.setdefault(key, Histogram())
+        return histogram
+
+    def decode(self, endpoint: str, seconds: float) -> None:
+        self.histogram(get_route(endpoint), 'decode').record(seconds)
+
+    def message(self,
+                channel: str,
+                size: int,
+                lag: float = None) -> None:
+
+        channel = channel if channel else 'unknown'
+        with self.__lock:
+            self.__messages[channel] += 1
+            self.__received[channel] += size
+            histogram = self.__lag.get(channel)
+            if lag is not None and histogram is None:
+                histogram = self.__lag[channel] = Histogram()
+        if lag is not None:
+            histogram.record(lag)
+
+    def as_dict(self) -> dict:
+        elapsed = max(time.monotonic() - self.__started, 1e-9)
+        with self.__lock:
+            latency = dict(self.__latency)
+            lag = dict(self.__lag)
+            requests = dict(self.__requests)
+            sizes = dict(self.__bytes)
+            messages = dict(self.__messages)
+            received = dict(self.__received)
+        routes = {}
+        for (route, phase), histogram in latency.items():
+            entry = routes.setdefault(route, {'bytes': sizes.get(route, 0)})
+            entry[phase] = histogram.as_dict()
+        return {
+            'requests': [
+                {'method': m, 'route': r, 'status': s, 'count': c}
+                for (m, r, s), c in requests.items()
+            ],
+            'routes': routes,
+            'streams': {
+                channel: {
+                    'messages': count,
+                    'bytes': received.get(channel, 0),
+                    'rate': count / elapsed,
+                    'lag': lag[channel].as_dict() if channel in lag else None
+                } for channel, count in messages.items()
+            }
+        }
+
+    def as_prometheus(self, prefix: str = 'w3rw') -> str:
+        # NOTE: The text format requires every sample of a metric to follow
+        # its TYPE line in one group, so each family is built on its own
+        result = self.as_dict()
+        requests, seconds, sizes = [], [], []
+        messages, received, lag = [], [], []
+        for entry in result['requests']:
+            labels = (f'method="{entry["method"]}",route="{entry["route"]}",'
+                      f'status="{entry["status"]}"')
+            requests.append(
+                f'{prefix}_requests_total{{{labels}}} {entry["count"]}')
+        for route, phases in result['routes'].items():
+            sizes.append(
+                f'{prefix}_response_bytes_total{{route="{route}"}} '
+                f'{phases["bytes"]}')
+            for phase in __phases__:
+                if phase in phases:
+                    seconds.extend(get_summary(
+                        f'{prefix}_request_seconds',
+                        f'route="{route}",phase="{phase}"',
+                        phases[phase]))
+        for channel, entry in result['streams'].items():
+            labels = f'channel="{channel}"'
+            messages.append(
+                f'{prefix}_messages_total{{{labels}}} {entry["messages"]}')
+            received.append(
+                f'{prefix}_message_bytes_total{{{labels}}} {entry["bytes"]}')
+            if entry['lag']:
+                lag.extend(get_summary(
+                    f'{prefix}_message_lag_seconds', labels, entry['lag']))
+        lines = []
+        for name, kind, samples in (
+                ('requests_total', 'counter', requests),
+                ('request_seconds', 'summary', seconds),
+                ('response_bytes_total', 'counter', sizes),
+                ('messages_total', 'counter', messages),
+                ('message_bytes_total', 'counter', received),
+                ('message_lag_seconds', 'summary', lag)):
+            lines.append(f'# TYPE {prefix}_{name} {kind}')
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+def get_summary(name: str, labels: str, histogram: dict) -> typing.List[str]:
+    lines = [
+        f'{name}{{{labels},quantile="{q:g}"}} {histogram[f"p{q * 100:g}"]}'
+        for q in __quantiles__
+    ]
+    lines.append(f'{name}_sum{{{labels}}} {histogram["total"]}')
+    lines.append(f'{name}_count{{{labels}}} {histogram["count"]}')
+    return lines
@@ -0,0 +1,74 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import dataclasses
+import queue
+import threading
+import typing
+
+
+@dataclasses.dataclass
+class Page:
+    # NOTE: `cursor` resumes the listing right after this page and is None
+    # once the last page has been reached. Kraken items are (id, record)
+    # pairs because its history endpoints are keyed by transaction id.
+    items: list
+    cursor: typing.Union[str, int, None] = None
+
+
+def read_ahead(pages: typing.Iterator[Page],
+               depth: int = 1) -> typing.Iterator[Page]:
+
+    # NOTE: A worker thread fetches up to `depth` pages ahead of the
+    # consumer. The bounded queue keeps memory flat and the fetches still
+    # go through the messenger's limiter, so prefetching never outruns the
+    # rate limit.
+    buffer = queue.Queue(maxsize=max(1, depth))
+    stop = threading.Event()
+    done = object()
+
+    def put(item: object) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for page in pages:
+                if not put(page):
+                    break
+        except Exception as error:
+            put(error)
+        finally:
+            if hasattr(pages, 'close'):
+                pages.close()
+            put(done)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
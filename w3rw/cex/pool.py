@@ -0,0 +1,52 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from concurrent.futures import ThreadPoolExecutor
+
+import dataclasses
+import typing
+
+# NOTE: requests.Session keeps 10 pooled connections per host by default
+__workers__: int = 8
+
+
+@dataclasses.dataclass
+class Result:
+    item: object
+    value: object = None
+    error: Exception = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def fan_out(function: typing.Callable,
+            items: typing.Iterable,
+            workers: int = __workers__) -> typing.List[Result]:
+
+    # NOTE: Every call still goes through Messenger.throttle(), so the pool
+    # only overlaps network round trips and never exceeds the rate limit.
+    def call(item: object) -> Result:
+        try:
+            return Result(item, function(item))
+        except Exception as error:
+            return Result(item, error=error)
+
+    items = list(items)
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        return list(pool.map(call, items))
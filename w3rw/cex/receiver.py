@@ -0,0 +1,192 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import array
+import threading
+import time
+import typing
+
+__size__: int = 4096
+
+# NOTE: 'drop' overwrites the oldest frame when the buffer is full, which
+# keeps the socket drained at the cost of a gap. 'block' stops reading
+# until the consumer catches up, which leaves the backlog to the kernel.
+__policies__: typing.Tuple[str, ...] = ('drop', 'block')
+
+# NOTE: A frame is the time it was read off the socket and its payload
+Frame = typing.Tuple[float, object]
+
+
+class Receiver(object):
+    # NOTE: Drains a socket on its own thread into a bounded ring buffer
+    # that is allocated once up front. Slow consumers read in batches and
+    # never hold up the socket, or, under 'block', the other way around.
+    def __init__(self,
+                 read: typing.Callable[[], object],
+                 size: int = __size__,
+                 policy: str = 'drop'):
+
+        if policy not in __policies__:
+            raise ValueError(f'unknown policy: {policy}')
+        self.__read: typing.Callable[[], object] = read
+        self.__size: int = max(1, size)
+        self.__policy: str = policy
+        self.__times: array.array = array.array('d', [0.0]) * self.__size
+        self.__frames: list = [None] * self.__size
+        self.__head: int = 0
+        self.__depth: int = 0
+        self.__lock: threading.Lock = threading.Lock()
+        self.__readable: threading.Condition = threading.Condition(
+            self.__lock)
+        self.__writable: threading.Condition = threading.Condition(
+            self.__lock)
+        self.__thread: threading.Thread = None
+        self.__running: bool = False
+        self.__error: Exception = None
+        self.__received: int = 0
+        self.__dropped: int = 0
+        self.__blocked: int = 0
+        self.__peak: int = 0
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @property
+    def policy(self) -> str:
+        return self.__policy
+
+    @property
+    def running(self) -> bool:
+        return self.__running
+
+    @property
+    def error(self) -> typing.Optional[Exception]:
+        return self.__error
+
+    @property
+    def depth(self) -> int:
+        with self.__lock:
+            return self.__depth
+
+    @property
+    def stats(self) -> typing.Dict[str, int]:
+        with self.__lock:
+            return {
+                'size': self.__size,
+                'depth': self.__depth,
+                'peak': self.__peak,
+                'received': self.__received,
+                'dropped': self.__dropped,
+                'blocked': self.__blocked
+            }
+
+    def start(self) -> None:
+        # NOTE: A thread that was stopped is joined first, so there is
+        # never more than one of them reading the socket
+        if self.__running:
+            return
+        self.join()
+        self.__running = True
+        self.__error = None
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        # NOTE: A blocking read only returns once the socket is closed, so
+        # the owner closes it after calling stop and then joins the thread.
+        # A read that fails after stop is not recorded as an error.
+        with self.__lock:
+            self.__running = False
+            self.__readable.notify_all()
+            self.__writable.notify_all()
+
+    def join(self, timeout: float = None) -> None:
+        thread = self.__thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def clear(self) -> None:
+        with self.__lock:
+            for index in range(self.__size):
+                self.__frames[index] = None
+            self.__head = 0
+            self.__depth = 0
+            self.__writable.notify_all()
+
+    def put(self, payload: object) -> bool:
+        received = time.time()
+        with self.__lock:
+            if self.__depth == self.__size:
+                if 'block' == self.__policy:
+                    self.__blocked += 1
+                    while self.__running and self.__depth == self.__size:
+                        self.__writable.wait()
+                    if self.__depth == self.__size:
+                        return False
+                else:
+                    self.__head = (self.__head + 1) % self.__size
+                    self.__depth -= 1
+                    self.__dropped += 1
+            tail = (self.__head + self.__depth) % self.__size
+            self.__times[tail] = received
+            self.__frames[tail] = payload
+            self.__depth += 1
+            self.__received += 1
+            if self.__depth > self.__peak:
+                self.__peak = self.__depth
+            self.__readable.notify()
+        return True
+
+    def get_many(self,
+                 count: int,
+                 timeout: float = None) -> typing.List[Frame]:
+
+        # NOTE: Waits for at least one frame and returns up to `count`
+        # of them, oldest first. Returns an empty list on timeout or once
+        # the receiver has stopped and the buffer has been drained.
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.__lock:
+            while not self.__depth and self.__running:
+                wait = None
+                if deadline is not None:
+                    wait = deadline - time.monotonic()
+                    if wait <= 0:
+                        break
+                self.__readable.wait(wait)
+            frames = []
+            for _ in range(min(count, self.__depth)):
+                head = self.__head
+                frames.append((self.__times[head], self.__frames[head]))
+                self.__frames[head] = None
+                self.__head = (head + 1) % self.__size
+            self.__depth -= len(frames)
+            if frames:
+                self.__writable.notify_all()
+            return frames
+
+    def __run(self) -> None:
+        while self.__running:
+            try:
+                payload = self.__read()
+            except Exception as error:
+                if self.__running:
+                    self.__error = error
+                break
+            if not self.put(payload):
+                break
+        with self.__lock:
+            self.__running = False
+            self.__readable.notify_all()
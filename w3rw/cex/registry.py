@@ -0,0 +1,158 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from w3rw.cex.abstract import AbstractClient
+
+from w3rw.cex.pool import __workers__
+from w3rw.cex.pool import Result
+from w3rw.cex.pool import fan_out
+
+from w3rw.cex.symbols import Symbols
+from w3rw.cex.symbols import get_asset
+
+import threading
+import typing
+
+Level = typing.Tuple[float, float]
+Levels = typing.Dict[str, typing.List[Level]]
+
+
+class Quote(typing.NamedTuple):
+    exchange: str
+    symbol: str
+    bid: typing.Optional[float]
+    ask: typing.Optional[float]
+    price: typing.Optional[float]
+    time: typing.Optional[float]
+
+
+class Registry(object):
+    # NOTE: Queries every registered client at once and merges the results
+    # under canonical symbols and asset codes, so a lookup across venues
+    # costs one round trip instead of one per venue. A client takes part in
+    # a query when it has the method for it, e.g. `Client.quote`.
+    def __init__(self,
+                 clients: typing.Iterable[AbstractClient] = (),
+                 symbols: Symbols = None,
+                 workers: int = __workers__):
+
+        self.__clients: typing.Dict[str, AbstractClient] = {}
+        self.__symbols: Symbols = (
+            symbols if symbols is not None else Symbols())
+        self.__workers: int = workers
+        self.__failed: typing.List[Result] = []
+        self.__lock: threading.Lock = threading.Lock()
+        for client in clients:
+            self.register(client)
+
+    def __getitem__(self, label: str) -> AbstractClient:
+        return self.__clients[label]
+
+    def __contains__(self, label: str) -> bool:
+        return label in self.__clients
+
+    @property
+    def clients(self) -> typing.Dict[str, AbstractClient]:
+        return dict(self.__clients)
+
+    @property
+    def symbols(self) -> Symbols:
+        return self.__symbols
+
+    @property
+    def failed(self) -> typing.List[Result]:
+        # NOTE: The failures of the most recent query, one per client
+        with self.__lock:
+            return list(self.__failed)
+
+    def register(self, client: AbstractClient) -> None:
+        self.__clients[client.label] = client
+
+    def unregister(self, label: str) -> None:
+        self.__clients.pop(label, None)
+
+    def call(self,
+             method: str,
+             function: typing.Callable[[AbstractClient], object],
+             labels: typing.Iterable[str] = None) -> typing.Dict[str, Result]:
+
+        clients = [
+            client for label, client in self.__clients.items()
+            if (labels is None or label in labels) and hasattr(client, method)
+        ]
+        results = fan_out(function, clients, self.__workers)
+        with self.__lock:
+            self.__failed = [result for result in results if not result.ok]
+        return {result.item.label: result for result in results}
+
+    def load(self, labels: typing.Iterable[str] = None) -> int:
+        # NOTE: Loads the native names of every market, so each symbol is
+        # mapped once instead of being guessed
+        results = self.call('markets', lambda c: c.markets(), labels)
+        return sum(
+            self.__symbols.load(label, result.value)
+            for label, result in results.items() if result.ok
+        )
+
+    def quotes(self,
+               symbol: str,
+               labels: typing.Iterable[str] = None) -> typing.Dict[str, Quote]:
+
+        def quote(client: AbstractClient) -> Quote:
+            native = self.__symbols.native(client.label, symbol)
+            return client.quote(native)._replace(symbol=symbol)
+
+        results = self.call('quote', quote, labels)
+        return {k: v.value for k, v in results.items() if v.ok}
+
+    def best(self,
+             symbol: str,
+             labels: typing.Iterable[str] = None) -> typing.Dict[str, Quote]:
+
+        # NOTE: The highest bid and the lowest ask across every venue
+        quotes = self.quotes(symbol, labels).values()
+        bids = [quote for quote in quotes if quote.bid is not None]
+        asks = [quote for quote in quotes if quote.ask is not None]
+        return {
+            'bid': max(bids, key=lambda q: q.bid) if bids else None,
+            'ask': min(asks, key=lambda q: q.ask) if asks else None
+        }
+
+    def balances(
+            self,
+            labels: typing.Iterable[str] = None
+    ) -> typing.Dict[str, typing.Dict[str, float]]:
+
+        def balances(client: AbstractClient) -> typing.Dict[str, float]:
+            merged = {}
+            for code, amount in client.balances().items():
+                asset = get_asset(code)
+                merged[asset] = merged.get(asset, 0.0) + amount
+            return merged
+
+        results = self.call('balances', balances, labels)
+        return {k: v.value for k, v in results.items() if v.ok}
+
+    def books(self,
+              symbol: str,
+              depth: int = 10,
+              labels: typing.Iterable[str] = None) -> typing.Dict[str, Levels]:
+
+        def book(client: AbstractClient) -> Levels:
+            native = self.__symbols.native(client.label, symbol)
+            return client.levels(native, depth)
+
+        results = self.call('levels', book, labels)
+        return {k: v.value for k, v in results.items() if v.ok}
@@ -0,0 +1,155 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import email.utils
+import random
+import re
+import requests
+import threading
+import time
+import typing
+
+# NOTE: 429 means the request was refused before it was processed. The
+# 5xx statuses are transient, but the request may have been processed.
+__statuses__: typing.FrozenSet[int] = frozenset((429, 500, 502, 503, 504))
+
+__errors__: typing.Tuple[type, ...] = (
+    requests.ConnectionError,
+    requests.Timeout
+)
+
+
+def get_retry_after(response: requests.Response) -> typing.Optional[float]:
+    # NOTE: A Response is falsy for any error status, e.g. 429 or 503
+    value = (
+        response.headers.get('Retry-After') if response is not None else None)
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, moment.timestamp() - time.time())
+
+
+class Retry(object):
+    # NOTE: GET, PUT, and DELETE are idempotent and are retried on any
+    # transient failure. A POST is not, e.g. an order or a withdrawal, so
+    # it is only retried once the exchange has refused it, or after
+    # `recover` has confirmed that an ambiguous attempt was never
+    # processed. POSTs to endpoints matching one of the `idempotent`
+    # patterns, e.g. Kraken's private queries, are retried like a GET.
+    def __init__(self,
+                 attempts: int = 3,
+                 backoff: float = 0.5,
+                 limit: float = 30,
+                 statuses: typing.Iterable[int] = None,
+                 refused: typing.Callable[[requests.Response], bool] = None,
+                 idempotent: typing.Iterable[str] = ()):
+
+        self.__attempts: int = attempts
+        self.__backoff: float = backoff
+        self.__limit: float = limit
+        self.__statuses: typing.FrozenSet[int] = frozenset(
+            statuses if statuses else __statuses__)
+        self.__refused: typing.Callable = refused
+        self.__idempotent: typing.List[typing.Pattern] = [
+            re.compile(pattern) for pattern in idempotent
+        ]
+        self.__lock: threading.Lock = threading.Lock()
+        self.__retries: int = 0
+
+    @property
+    def attempts(self) -> int:
+        return self.__attempts
+
+    @property
+    def retries(self) -> int:
+        return self.__retries
+
+    def delay(self,
+              attempt: int,
+              response: requests.Response = None) -> float:
+
+        after = get_retry_after(response)
+        if after is not None:
+            return min(self.__limit, after)
+        delay = min(self.__limit, self.__backoff * 2 ** attempt)
+        return random.uniform(delay / 2, delay)
+
+    def refused(self, response: requests.Response = None) -> bool:
+        if response is None:
+            return False
+        if 429 == response.status_code:
+            return True
+        return bool(self.__refused and self.__refused(response))
+
+    def transient(self, response: requests.Response = None) -> bool:
+        if response is None:
+            return True
+        return response.status_code in self.__statuses or self.refused(
+            response)
+
+    def idempotent(self, method: str, endpoint: str) -> bool:
+        if 'POST' != method:
+            return True
+        return any(
+            pattern.fullmatch(endpoint) for pattern in self.__idempotent)
+
+    def ambiguous(self,
+                  method: str,
+                  endpoint: str,
+                  response: requests.Response = None) -> bool:
+
+        # NOTE: A POST that failed without being refused may have been
+        # processed anyway, e.g. the connection dropped after it was sent
+        return not self.idempotent(method, endpoint) and not self.refused(
+            response)
+
+    def call(self,
+             method: str,
+             endpoint: str,
+             send: typing.Callable[[], requests.Response],
+             recover: typing.Callable[[], requests.Response] = None
+             ) -> requests.Response:
+
+        # NOTE: `recover` returns the response for an order that already
+        # exists, None when it does not, and raises when it can't tell.
+        # Ambiguous requests are never sent again without it.
+        response, error, ambiguous = None, None, False
+        for attempt in range(self.__attempts + 1):
+            if attempt:
+                with self.__lock:
+                    self.__retries += 1
+                time.sleep(self.delay(attempt - 1, response))
+                if ambiguous:
+                    recovered = recover()
+                    if recovered is not None:
+                        return recovered
+            response, error = None, None
+            try:
+                response = send()
+            except __errors__ as exception:
+                error = exception
+            if not self.transient(response):
+                return response
+            ambiguous = self.ambiguous(method.upper(), endpoint, response)
+            if ambiguous and recover is None:
+                break
+        if error:
+            raise error
+        return response
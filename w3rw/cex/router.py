@@ -0,0 +1,128 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import abc
+import threading
+import typing
+
+# NOTE: A key is the (channel, product) a message belongs to. A handler
+# registered with None for either part matches any channel or product.
+Key = typing.Tuple[typing.Optional[str], typing.Optional[str]]
+Handler = typing.Callable[[object], object]
+
+
+class Router(abc.ABC):
+    # NOTE: Each message is decoded once by the Stream and then handed to
+    # every handler registered for its key. The handlers for a key are
+    # resolved once, wildcards included, and kept in a lookup table, so
+    # dispatching is a dict lookup no matter how many products there are.
+    # Registering a handler swaps in a new table instead of locking it.
+    def __init__(self, typed: bool = False):
+        self.__typed: bool = typed
+        self.__routes: typing.Dict[Key, typing.List[Handler]] = {}
+        self.__table: typing.Dict[Key, typing.Tuple[Handler, ...]] = {}
+        self.__lock: threading.Lock = threading.Lock()
+        self.__dispatched: int = 0
+        self.__unrouted: int = 0
+
+    @property
+    def typed(self) -> bool:
+        return self.__typed
+
+    @property
+    def stats(self) -> typing.Dict[str, int]:
+        return {
+            'routes': len(self.__routes),
+            'keys': len(self.__table),
+            'dispatched': self.__dispatched,
+            'unrouted': self.__unrouted
+        }
+
+    @abc.abstractmethod
+    def key(self, message: object) -> Key:
+        pass
+
+    def record(self, message: object) -> object:
+        return message
+
+    def add(self,
+            handler: Handler,
+            channel: str = None,
+            product: str = None) -> None:
+
+        with self.__lock:
+            handlers = self.__routes.setdefault((channel, product), [])
+            if handler not in handlers:
+                handlers.append(handler)
+            self.__table = {}
+
+    def remove(self,
+               handler: Handler,
+               channel: str = None,
+               product: str = None) -> None:
+
+        with self.__lock:
+            handlers = self.__routes.get((channel, product), [])
+            if handler in handlers:
+                handlers.remove(handler)
+            if not handlers:
+                self.__routes.pop((channel, product), None)
+            self.__table = {}
+
+    def handlers(self, key: Key) -> typing.Tuple[Handler, ...]:
+        handlers = self.__table.get(key)
+        if handlers is None:
+            handlers = self.__resolve(key)
+        return handlers
+
+    def dispatch(self, message: object) -> int:
+        handlers = self.handlers(self.key(message))
+        if not handlers:
+            self.__unrouted += 1
+            return 0
+        if self.__typed:
+            message = self.record(message)
+        for handler in handlers:
+            handler(message)
+        self.__dispatched += 1
+        return len(handlers)
+
+    def route(self,
+              stream: object,
+              count: int = 256,
+              timeout: float = None) -> int:
+
+        # NOTE: Reads one batch of messages from the stream and dispatches
+        # them. Without a Receiver the batch is a single message.
+        if stream.receiver is None:
+            count = 1
+        messages = stream.receive_many(count, timeout=timeout)
+        for _, message in messages:
+            self.dispatch(message)
+        return len(messages)
+
+    def __resolve(self, key: Key) -> typing.Tuple[Handler, ...]:
+        channel, product = key
+        with self.__lock:
+            handlers = []
+            for route in ((channel, product), (channel, None),
+                          (None, product), (None, None)):
+                for handler in self.__routes.get(route, ()):
+                    if handler not in handlers:
+                        handlers.append(handler)
+            table = dict(self.__table)
+            table[key] = tuple(handlers)
+            self.__table = table
+        return table[key]
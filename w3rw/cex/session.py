@@ -0,0 +1,71 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from requests.adapters import HTTPAdapter
+
+import requests
+import typing
+
+# NOTE: Enough connections for the default thread pool with room to spare
+__connections__: int = 16
+
+# NOTE: Seconds to wait for a connection and then for each response read
+__timeout__: typing.Tuple[float, float] = (10, 30)
+
+Timeout = typing.Union[float, typing.Tuple[float, float]]
+
+
+def get_session(connections: int = __connections__,
+                block: bool = False,
+                hosts: int = 10) -> requests.Session:
+
+    # NOTE: `connections` is the number of connections kept alive for each
+    # host and `hosts` is the number of hosts that get their own pool.
+    # Requests beyond `connections` open a throwaway connection unless
+    # `block` is set, in which case they wait for a pooled one.
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=hosts,
+        pool_maxsize=connections,
+        pool_block=block
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_connections(session: requests.Session) -> typing.Dict[str, dict]:
+    # NOTE: Reads the urllib3 pools behind each adapter. Idle connections
+    # wait in the pool queue, which is filled with None placeholders, so
+    # every slot missing from the queue is a connection that is in use.
+    connections = {}
+    for adapter in set(session.adapters.values()):
+        manager = getattr(adapter, 'poolmanager', None)
+        if manager is None:
+            continue
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None or pool.pool is None:
+                continue
+            queue = list(pool.pool.queue)
+            idle = sum(1 for conn in queue if conn is not None)
+            connections[f'{pool.scheme}://{pool.host}:{pool.port}'] = {
+                'size': pool.pool.maxsize,
+                'idle': idle,
+                'in_use': pool.pool.maxsize - len(queue),
+                'opened': pool.num_connections,
+                'requests': pool.num_requests
+            }
+    return connections
@@ -0,0 +1,296 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from multiprocessing import resource_tracker
+from multiprocessing import shared_memory
+
+import struct
+import time
+import typing
+
+__prefix__: str = 'w3rw-'
+__depth__: int = 10
+__trades__: int = 1024
+
+# NOTE: The block is laid out as
+#   header  magic, depth, trade capacity
+#   book    sequence, time, bid count, ask count, bids, asks
+#   trades  count, then a ring of (time, price, size, side)
+# Sides are stored as 1.0 for buy and -1.0 for sell. Every counter is
+# aligned to 8 bytes, so it is read and written in a single access.
+__magic__: bytes = b'w3rw'
+__header__: struct.Struct = struct.Struct('<4sII4x')
+__book__: struct.Struct = struct.Struct('<QdII')
+__count__: struct.Struct = struct.Struct('<Q')
+__tick__: struct.Struct = struct.Struct('<4d')
+
+Level = typing.Tuple[float, float]
+
+
+class Snapshot(typing.NamedTuple):
+    sequence: int
+    time: float
+    bids: typing.List[Level]
+    asks: typing.List[Level]
+
+
+class Tick(typing.NamedTuple):
+    time: float
+    price: float
+    size: float
+    side: str
+
+
+def get_name(product: str, prefix: str = __prefix__) -> str:
+    # NOTE: Shared memory names can't contain a slash, e.g. 'XBT/USD'
+    return prefix + product.replace('/', '-')
+
+
+class Layout(typing.NamedTuple):
+    depth: int
+    capacity: int
+    levels: struct.Struct
+    book: int
+    count: int
+    ticks: int
+    size: int
+
+
+def get_layout(depth: int, trades: int) -> Layout:
+    levels = struct.Struct(f'<{4 * depth}d')
+    book = __header__.size
+    count = book + __book__.size + levels.size
+    ticks = count + __count__.size
+    return Layout(
+        depth, trades, levels, book, count, ticks,
+        ticks + __tick__.size * trades)
+
+
+def get_levels(values: tuple, count: int) -> typing.List[Level]:
+    return [(values[i], values[i + 1]) for i in range(0, 2 * count, 2)]
+
+
+class Publisher(object):
+    # NOTE: There must be a single writer per board. The book is guarded by
+    # a seqlock: its sequence is odd while a snapshot is being written and
+    # even once it is complete, so readers never need a lock or a pipe.
+    def __init__(self,
+                 name: str,
+                 depth: int = __depth__,
+                 trades: int = __trades__):
+
+        self.__layout: Layout = get_layout(depth, trades)
+        self.__memory: shared_memory.SharedMemory = (
+            shared_memory.SharedMemory(
+                name, create=True, size=self.__layout.size))
+        __header__.pack_into(self.__memory.buf, 0, __magic__, depth, trades)
+        self.__values: typing.List[float] = [0.0] * (4 * depth)
+        self.__sequence: int = 0
+        self.__count: int = 0
+
+    @property
+    def name(self) -> str:
+        return self.__memory.name
+
+    @property
+    def depth(self) -> int:
+        return self.__layout.depth
+
+    @property
+    def capacity(self) -> int:
+        return self.__layout.capacity
+
+    @property
+    def sequence(self) -> int:
+        return self.__sequence
+
+    @property
+    def count(self) -> int:
+        return self.__count
+
+    def publish(self,
+                levels: typing.Dict[str, typing.List[Level]],
+                moment: float = None) -> int:
+
+        # NOTE: Takes the shape of `OrderBook.depth` or `OrderBook.top`
+        layout = self.__layout
+        bids = levels['bids'][:layout.depth]
+        asks = levels['asks'][:layout.depth]
+        values = self.__values
+        offset = 2 * layout.depth
+        for index, (price, size) in enumerate(bids):
+            values[2 * index] = price
+            values[2 * index + 1] = size
+        for index, (price, size) in enumerate(asks):
+            values[offset + 2 * index] = price
+            values[offset + 2 * index + 1] = size
+        buf = self.__memory.buf
+        __book__.pack_into(
+            buf, layout.book, self.__sequence + 1,
+            time.time() if moment is None else moment,
+            len(bids), len(asks))
+        layout.levels.pack_into(buf, layout.book + __book__.size, *values)
+        self.__sequence += 2
+        __count__.pack_into(buf, layout.book, self.__sequence)
+        return self.__sequence
+
+    def trade(self,
+              moment: float,
+              price: float,
+              size: float,
+              side: str) -> int:
+
+        # NOTE: The tick is written before the count is raised, so a
+        # reader never sees a slot that hasn't been filled yet
+        layout = self.__layout
+        slot = layout.ticks + (
+            self.__count % layout.capacity) * __tick__.size
+        __tick__.pack_into(
+            self.__memory.buf, slot, moment, price, size,
+            1.0 if 'buy' == side else -1.0)
+        self.__count += 1
+        __count__.pack_into(self.__memory.buf, layout.count, self.__count)
+        return self.__count
+
+    def close(self) -> None:
+        self.__memory.close()
+
+    def unlink(self) -> None:
+        self.__memory.unlink()
+
+    def __enter__(self) -> 'Publisher':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+        self.unlink()
+
+
+class Reader(object):
+    def __init__(self, name: str, spins: int = 1000):
+        # NOTE: Only the Publisher owns the block. A reader must not be
+        # tracked, or its resource tracker would unlink the block when the
+        # reader exits. Python 3.13 added `track` for this.
+        try:
+            self.__memory: shared_memory.SharedMemory = (
+                shared_memory.SharedMemory(name, track=False))
+        except TypeError:
+            self.__memory = shared_memory.SharedMemory(name)
+            resource_tracker.unregister(
+                self.__memory._name, 'shared_memory')
+        magic, depth, trades = __header__.unpack_from(self.__memory.buf, 0)
+        if __magic__ != magic:
+            self.__memory.close()
+            raise ValueError(f'not a w3rw board: {name}')
+        self.__layout: Layout = get_layout(depth, trades)
+        self.__spins: int = spins
+        self.__retries: int = 0
+        self.__missed: int = 0
+
+    @property
+    def name(self) -> str:
+        return self.__memory.name
+
+    @property
+    def depth(self) -> int:
+        return self.__layout.depth
+
+    @property
+    def capacity(self) -> int:
+        return self.__layout.capacity
+
+    @property
+    def sequence(self) -> int:
+        return __count__.unpack_from(
+            self.__memory.buf, self.__layout.book)[0]
+
+    @property
+    def count(self) -> int:
+        return __count__.unpack_from(
+            self.__memory.buf, self.__layout.count)[0]
+
+    @property
+    def retries(self) -> int:
+        return self.__retries
+
+    @property
+    def missed(self) -> int:
+        return self.__missed
+
+    def book(self) -> typing.Optional[Snapshot]:
+        # NOTE: Retries while the Publisher is writing, and returns None if
+        # no consistent snapshot could be read within `spins` attempts
+        layout = self.__layout
+        buf = self.__memory.buf
+        for _ in range(self.__spins):
+            sequence, moment, bids, asks = __book__.unpack_from(
+                buf, layout.book)
+            if sequence & 1:
+                self.__retries += 1
+                continue
+            values = layout.levels.unpack_from(
+                buf, layout.book + __book__.size)
+            if sequence != self.sequence:
+                self.__retries += 1
+                continue
+            return Snapshot(
+                sequence,
+                moment,
+                get_levels(values, bids),
+                get_levels(values[2 * layout.depth:], asks))
+        return None
+
+    def top(self) -> typing.Tuple[typing.Optional[Level], ...]:
+        snapshot = self.book()
+        if snapshot is None:
+            return None, None
+        bid = snapshot.bids[0] if snapshot.bids else None
+        ask = snapshot.asks[0] if snapshot.asks else None
+        return bid, ask
+
+    def trades(self,
+               since: int = 0) -> typing.Tuple[int, typing.List[Tick]]:
+
+        # NOTE: Returns the count to pass as `since` next time along with
+        # every tick after `since`. Ticks that were overwritten before
+        # they could be read are skipped and counted in `missed`. The
+        # oldest slot is the next one the Publisher writes, so it may be
+        # half written and is skipped as well.
+        layout = self.__layout
+        buf = self.__memory.buf
+        count = self.count
+        first = max(since, count - layout.capacity + 1)
+        ticks = []
+        for index in range(first, count):
+            slot = layout.ticks + (index % layout.capacity) * __tick__.size
+            ticks.append(__tick__.unpack_from(buf, slot))
+        lapped = self.count - layout.capacity + 1
+        if lapped > first:
+            ticks = ticks[lapped - first:]
+            first = min(lapped, count)
+        self.__missed += first - since
+        return count, [
+            Tick(t, p, s, 'buy' if side > 0 else 'sell')
+            for t, p, s, side in ticks
+        ]
+
+    def close(self) -> None:
+        self.__memory.close()
+
+    def __enter__(self) -> 'Reader':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,139 @@
+# w3rw - A Wrapper for Cryptocurrency Interfaces
+# Copyright (C) 2021 teleprint.me
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import re
+import threading
+import typing
+
+# NOTE: Symbols are normalized to 'BASE-QUOTE', e.g. 'BTC-USD', using the
+# asset codes of Coinbase. Kraken names a few assets differently and
+# prefixes its older ones with X (crypto) or Z (fiat), e.g. XXBTZUSD.
+__aliases__: typing.Dict[str, str] = {
+    'XBT': 'BTC',
+    'XDG': 'DOGE'
+}
+
+__legacy__: typing.Dict[str, str] = {
+    'XETC': 'ETC',
+    'XETH': 'ETH',
+    'XLTC': 'LTC',
+    'XMLN': 'MLN',
+    'XREP': 'REP',
+    'XXBT': 'BTC',
+    'XXDG': 'DOGE',
+    'XXLM': 'XLM',
+    'XXMR': 'XMR',
+    'XXRP': 'XRP',
+    'XZEC': 'ZEC',
+    'ZAUD': 'AUD',
+    'ZCAD': 'CAD',
+    'ZEUR': 'EUR',
+    'ZGBP': 'GBP',
+    'ZJPY': 'JPY',
+    'ZUSD': 'USD'
+}
+
+# NOTE: The native form used for a symbol that was never loaded
+__formats__: typing.Dict[str, str] = {
+    'coinbase': '{base}-{quote}',
+    'coinbase_pro': '{base}-{quote}',
+    'kraken': '{base}{quote}'
+}
+
+__separator__: typing.Pattern = re.compile(r'[-/_]')
+
+# NOTE: Maps a canonical asset back to the code an exchange expects
+__natives__: typing.Dict[str, typing.Dict[str, str]] = {
+    'kraken': {'BTC': 'XBT', 'DOGE': 'XDG'}
+}
+
+
+def get_asset(code: str) -> str:
+    code = code.upper()
+    code = __legacy__.get(code, code)
+    return __aliases__.get(code, code)
+
+
+def get_symbol(base: str, quote: str) -> str:
+    return f'{get_asset(base)}-{get_asset(quote)}'
+
+
+def parse_symbol(value: str) -> typing.Optional[str]:
+    # NOTE: e.g. 'BTC-USD', 'XBT/USD', 'XXBTZUSD', or 'XBTUSD'. A name
+    # without a separator is only split where both halves are known.
+    parts = __separator__.split(value.upper())
+    if 2 == len(parts):
+        return get_symbol(*parts)
+    value = parts[0]
+    if 8 == len(value) and value[:4] in __legacy__:
+        return get_symbol(value[:4], value[4:])
+    if 6 == len(value):
+        return get_symbol(value[:3], value[3:])
+    return None
+
+
+class Symbols(object):
+    # NOTE: A bidirectional map between the canonical symbols and the
+    # names each exchange uses. Every native name of a market, e.g.
+    # XXBTZUSD, XBTUSD, and XBT/USD on Kraken, maps to one symbol, and each
+    # symbol maps back to the first name it was loaded with. Lookups are a
+    # single dict access, and a name seen for the first time is parsed once
+    # and kept.
+    def __init__(self):
+        self.__symbols: typing.Dict[typing.Tuple[str, str], str] = {}
+        self.__natives: typing.Dict[typing.Tuple[str, str], str] = {}
+        self.__guesses: typing.Dict[typing.Tuple[str, str], str] = {}
+        self.__lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.__natives)
+
+    def add(self, exchange: str, native: str, symbol: str) -> None:
+        with self.__lock:
+            self.__symbols[(exchange, native)] = symbol
+            self.__natives.setdefault((exchange, symbol), native)
+
+    def load(self,
+             exchange: str,
+             markets: typing.Dict[str, typing.Tuple[str, str]]) -> int:
+
+        # NOTE: Takes each native name with its (base, quote) asset codes
+        for native, (base, quote) in markets.items():
+            self.add(exchange, native, get_symbol(base, quote))
+        return len(markets)
+
+    def symbol(self, exchange: str, native: str) -> typing.Optional[str]:
+        symbol = self.__symbols.get((exchange, native))
+        if symbol is None:
+            symbol = parse_symbol(native)
+            if symbol is not None:
+                with self.__lock:
+                    self.__symbols[(exchange, native)] = symbol
+        return symbol
+
+    def native(self, exchange: str, symbol: str) -> str:
+        # NOTE: A symbol that was never loaded gets the exchange's usual
+        # form, which is kept apart so that loading it later still wins
+        key = exchange, symbol
+        native = self.__natives.get(key) or self.__guesses.get(key)
+        if native is None:
+            base, quote = symbol.split('-')
+            codes = __natives__.get(exchange, {})
+            native = __formats__.get(exchange, '{base}-{quote}').format(
+                base=codes.get(base, base), quote=codes.get(quote, quote))
+            with self.__lock:
+                self.__guesses[key] = native
+                self.__symbols.setdefault((exchange, native), symbol)
+        return native